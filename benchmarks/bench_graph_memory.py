@@ -0,0 +1,83 @@
+"""
+Compares the memory held by the cleaned scripts as a list of dicts (plus the visualizer's
+scripts_dict copy) with the same data as an interned ScriptGraph.
+
+    python benchmarks/bench_graph_memory.py --programs 100000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from script_data import get_scripts
+from script_graph import ScriptGraph
+from synthetic_dat import add_generator_arguments, generator_options, write_synthetic_dat
+
+
+def build_scripts_dict(scripts):
+    """
+    The visualizer's former per-script copy of the parsed data.
+    """
+    return {
+        script["name"]: {
+            "da2_jobs": script.get("da2_jobs") or [],
+            "ops_jobs": script.get("ops_jobs") or [],
+            "calls": script.get("calls", [])
+        }
+        for script in scripts
+    }
+
+
+def traced_size(build):
+    """
+    Returns the number of bytes still allocated by the object build() returns, and the object.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--programs", type=int, default=100000, help="programs in the synthetic file")
+    add_generator_arguments(parser)
+    parser.add_argument("--dat", help="measure an existing .dat file instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.dat
+        if not path:
+            path = os.path.join(temp_dir, "synthetic.dat")
+            write_synthetic_dat(path, args.programs, **generator_options(args))
+
+        def build_dicts():
+            scripts = get_scripts(path)
+            return scripts, build_scripts_dict(scripts)
+
+        dicts_size, (scripts, scripts_dict) = traced_size(build_dicts)
+        del scripts_dict
+
+        def build_graph():
+            # Parse again so the graph does not share strings with the list measured above
+            return ScriptGraph.from_scripts(get_scripts(path))
+
+        graph_size, graph = traced_size(build_graph)
+        print(f"{len(scripts)} scripts, {len(graph.names) - graph.script_count} placeholders, "
+              f"{len(graph.calls.targets)} calls, "
+              f"{len(graph.da2_job_names) + len(graph.ops_job_names)} distinct jobs")
+        print(f"{'representation':<28}{'MB':>10}")
+        print(f"{'list of dicts + scripts_dict':<28}{dicts_size / 1e6:>10.1f}")
+        print(f"{'ScriptGraph':<28}{graph_size / 1e6:>10.1f}")
+        print(f"reduction: {dicts_size / graph_size:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Times the pipeline stages (splitting, parsing, parsing in parallel, cleaning, interning and
+writing the page, then an incremental parse and its refresh after a one-line edit) on
+synthetic exports of several sizes, with their throughput and peak memory, and flags the ones
+that got slower or bigger than a stored baseline.
+
+    python benchmarks/bench_suite.py --save-baseline
+    python benchmarks/bench_suite.py --scales 1k,10k,100k --workers 1,2,4,8
+    python benchmarks/bench_suite.py --scales 100k --fan-out 4 --cycle-density 0.2 --no-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline_profile import peak_rss_mb, reset_peak_rss
+from script_data import (clean_scripts, parse_dat_file, parse_dat_file_parallel, split_dat_file_to_blocks,
+                         update_scripts_incremental)
+from script_dep_visualizer import build_graph_page
+from script_graph import ScriptGraph
+from synthetic_dat import add_generator_arguments, generator_options, write_synthetic_dat
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+DEFAULT_SCALES = "1k,10k,100k,1M"
+
+# Worker counts parse_dat_file_parallel is timed with
+DEFAULT_WORKERS = "1,2,4"
+
+# Bump when the stages or what they measure change; baselines of other versions are not compared
+BASELINE_VERSION = 3
+
+
+def parse_scale(scale):
+    """
+    Turns "10k" or "1M" (or a plain number) into a program count.
+    """
+    multiplier = {"k": 1000, "m": 1000000}.get(scale[-1:].lower())
+    return int(float(scale[:-1]) * multiplier) if multiplier else int(scale)
+
+
+def run_stages(path, output_dir, shard_data, worker_counts=(1,)):
+    """
+    Runs every stage once on the .dat file, each on the previous one's result, and returns
+    {stage: {"seconds": ..., "peak_rss_mb": ...}}. Meant for a fresh worker process, so the
+    memory of one scale doesn't carry over into the next.
+    After "parse", a "parse xN" stage times parse_dat_file_parallel with N workers for each
+    of worker_counts; its peak RSS is the parent's, as the workers are separate processes.
+    "incremental" builds the block state of an incremental parse from scratch and "refresh"
+    brings it up to date after one body line in the middle of the file is edited in place.
+    """
+    results = {}
+    state = {}
+    cache_dir = os.path.join(output_dir, "incremental")
+
+    def split():
+        return len(split_dat_file_to_blocks(path))
+
+    def parse():
+        state["scripts"] = parse_dat_file(path)
+
+    def clean():
+        state["scripts"] = clean_scripts(state["scripts"])
+
+    def graph():
+        state["graph"] = ScriptGraph.from_scripts(state.pop("scripts"))
+
+    def html():
+        build_graph_page(state["graph"], os.path.join(output_dir, "page.html"), shard_data)
+
+    def incremental():
+        update_scripts_incremental(path, cache_dir)
+
+    def refresh():
+        edit_middle_line(path)
+        update_scripts_incremental(path, cache_dir)
+
+    def parallel(workers):
+        return lambda: parse_dat_file_parallel(path, workers)
+
+    stages = [("split", split), ("parse", parse)]
+    stages.extend((f"parse x{workers}", parallel(workers)) for workers in worker_counts)
+    stages.extend([("clean", clean), ("graph", graph), ("html", html), ("incremental", incremental),
+                   ("refresh", refresh)])
+    for stage, run in stages:
+        reset_peak_rss()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        results[stage] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}
+    return results
+
+
+def edit_middle_line(path):
+    """
+    Changes one body line in the middle of the .dat file without changing its size, the
+    smallest edit a re-export can make.
+    """
+    with open(path, "r+b") as file:
+        file.seek(os.path.getsize(path) // 2)
+        chunk = file.read(1 << 16)
+        line = chunk.find(b"  select ")
+        if line != -1:
+            file.seek(-len(chunk) + line, os.SEEK_CUR)
+            file.write(b"  SELECT ")
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """
+    Returns the regressions of results against the baseline results as (scale, stage, what,
+    baseline value, new value) tuples: a stage is flagged when its time or peak RSS grew by
+    more than tolerance (a fraction), ignoring time differences under min_seconds.
+    """
+    regressions = []
+    for scale, stages in results.items():
+        for stage, measured in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if not base:
+                continue
+            if (measured["seconds"] > base["seconds"] * (1 + tolerance)
+                    and measured["seconds"] - base["seconds"] >= min_seconds):
+                regressions.append((scale, stage, "seconds", base["seconds"], measured["seconds"]))
+            if (measured["peak_rss_mb"] and base.get("peak_rss_mb")
+                    and measured["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance)):
+                regressions.append((scale, stage, "peak_rss_mb", base["peak_rss_mb"], measured["peak_rss_mb"]))
+    return regressions
+
+
+def load_baseline(path, options):
+    """
+    Returns the per-scale results stored at path, or None if there are none to compare with.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"No baseline at {path}; run with --save-baseline to store one.")
+        return None
+    if baseline.get("version") != BASELINE_VERSION:
+        print(f"Ignoring baseline {path}: it was stored by another version of this suite.")
+        return None
+    if baseline.get("options") != options:
+        print(f"WARNING: baseline {path} was measured with other generator options: {baseline.get('options')}")
+    return baseline["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help=f"comma separated program counts, k and M allowed (default: {DEFAULT_SCALES})")
+    add_generator_arguments(parser)
+    parser.add_argument("--workers", default=DEFAULT_WORKERS,
+                        help=f"comma separated worker counts to time the parallel parse with (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--shard-data", action="store_true", help="write the page with its data in separate files")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH,
+                        help="baseline file to compare with or save to (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--no-baseline", action="store_true", help="don't compare with the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="growth in time or memory flagged as a regression (default: 0.2, i.e. 20%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="time differences smaller than this are never flagged (default: 0.05)")
+    args = parser.parse_args()
+    options = generator_options(args)
+    worker_counts = [int(workers) for workers in args.workers.split(",")]
+
+    results = {}
+    print(f"{'scale':>8}{'stage':>13}{'seconds':>10}{'programs/s':>14}{'MB/s':>10}{'peak RSS MB':>14}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for scale in args.scales.split(","):
+            programs = parse_scale(scale)
+            path = os.path.join(temp_dir, f"{scale}.dat")
+            write_synthetic_dat(path, programs, **options)
+            megabytes = os.path.getsize(path) / 1e6
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                stages = executor.submit(run_stages, path, temp_dir, args.shard_data, worker_counts).result()
+            os.remove(path)
+            results[scale] = stages
+            for stage, measured in stages.items():
+                seconds = measured["seconds"]
+                rss = "n/a" if measured["peak_rss_mb"] is None else f"{measured['peak_rss_mb']:.0f}"
+                print(f"{scale:>8}{stage:>13}{seconds:>10.2f}{programs / seconds:>14,.0f}{megabytes / seconds:>10.1f}{rss:>14}")
+
+    regressions = []
+    if not args.no_baseline and not args.save_baseline:
+        baseline = load_baseline(args.baseline, options)
+        if baseline is not None:
+            regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+            for scale, stage, what, before, after in regressions:
+                print(f"REGRESSION {scale} {stage}: {what} {before:.2f} -> {after:.2f} (+{after / before - 1:.0%})")
+            if not regressions:
+                print(f"No regressions against {args.baseline}.")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"version": BASELINE_VERSION, "options": options, "results": results}, file, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
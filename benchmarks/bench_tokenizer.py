@@ -0,0 +1,90 @@
+"""
+Compares the line throughput of the original two-pass .dat parser (split_dat_file_to_blocks
+followed by a per-line EXECUTE scan of every block) with the bytes-level tokenizer behind
+parse_dat_file, on a synthetic export.
+
+    python benchmarks/bench_tokenizer.py --programs 1000000
+    python benchmarks/bench_tokenizer.py --programs 1000000 --fan-out 4 --drop-density 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from script_data import _build_script, _collect_execute_call, parse_dat_file, split_dat_file_to_blocks
+from synthetic_dat import add_generator_arguments, generator_options, write_synthetic_dat
+
+
+def parse_two_pass(path):
+    """
+    The parser as it was before the tokenizer: build block strings, then re-split them.
+    """
+    scripts = []
+    for block_name, block_content, compiled_by, source, da2, ops, last_run_by in split_dat_file_to_blocks(path):
+        calls = []
+        for line in block_content.split('\n'):
+            _collect_execute_call(line, calls)
+        scripts.append(_build_script(block_name, calls, compiled_by, source, da2, ops, last_run_by))
+    return scripts
+
+
+def count_lines(path):
+    """
+    Counts the lines in a file without decoding it.
+    """
+    lines = 0
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(16 * 1024 * 1024)
+            if not chunk:
+                return lines
+            lines += chunk.count(b'\n')
+
+
+def time_parser(parser, path, repeat):
+    """
+    Returns the best wall time of repeat runs of parser over path, and its last result.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--programs", type=int, default=1000000, help="programs in the synthetic file")
+    add_generator_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per parser, the best one is reported")
+    parser.add_argument("--dat", help="benchmark an existing .dat file instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.dat
+        if not path:
+            path = os.path.join(temp_dir, "synthetic.dat")
+            print(f"Generating {args.programs} programs...")
+            write_synthetic_dat(path, args.programs, **generator_options(args))
+
+        lines = count_lines(path)
+        print(f"{path}: {lines} lines, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        before, before_scripts = time_parser(parse_two_pass, path, args.repeat)
+        after, after_scripts = time_parser(parse_dat_file, path, args.repeat)
+        if before_scripts != after_scripts:
+            print("WARNING: the two parsers disagree on this file")
+
+        print(f"{'parser':<12}{'seconds':>10}{'lines/sec':>16}")
+        print(f"{'two-pass':<12}{before:>10.2f}{lines / before:>16,.0f}")
+        print(f"{'tokenizer':<12}{after:>10.2f}{lines / after:>16,.0f}")
+        print(f"speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
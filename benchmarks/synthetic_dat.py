@@ -0,0 +1,131 @@
+"""
+Writes synthetic .dat exports for the benchmarks, shaped by a handful of knobs: program
+count, call fan-out, cycle density, jobs per program, which header tags are present and how
+often a program is dropped before it is created.
+
+    python benchmarks/synthetic_dat.py out.dat --programs 100000 --fan-out 3 --cycle-density 0.1
+    python benchmarks/synthetic_dat.py out.dat --programs 100000 --drop-density 0
+"""
+import argparse
+import random
+
+
+def write_synthetic_dat(path, programs, body_lines=40, fan_out=1.2, cycle_density=0.05,
+                        da2_jobs=1, ops_jobs=0.5, job_pool=5000, compilers=20, source_prefixes=4,
+                        last_run_by=True, drop_density=0.001, seed=0):
+    """
+    Writes a .dat export with the given number of programs, prg_0 .. prg_<programs - 1>.
+    Each program gets on average body_lines body lines, fan_out of which are EXECUTE
+    statements. A call goes to a later program, which keeps the call graph acyclic, except
+    for a cycle_density share of them that go to an earlier program (or the program itself)
+    and can close a cycle. Calls to programs past the last one are left in as well: about
+    one in a hundred, they become the graph's placeholders.
+    da2_jobs and ops_jobs are the mean number of jobs per program in the <<DA2>> and <<OPS>>
+    headers, drawn from job_pool names each; a program without jobs gets "N/A". compilers
+    and source_prefixes are the number of distinct <<COMPILED_BY>> users and <<SOURCE>>
+    prefixes; 0 leaves that header out, as does last_run_by=False for <<LAST_RUN_BY>>.
+    A drop_density share of the programs are dropped before they are created, with a
+    "DROP PROGRAM" line ahead of "CREATE PROGRAM" the way exports write it; like in real
+    exports they are rare by default, which is the worst case for anything that looks back
+    for the last statement of either kind.
+    Returns the number of lines written.
+    """
+    rng = random.Random(seed)
+    lines = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(programs):
+            header = []
+            if compilers:
+                header.append(f"<<COMPILED_BY: user{rng.randrange(compilers)} >>\n")
+            if source_prefixes:
+                header.append(f"<<SOURCE: src{rng.randrange(source_prefixes)}:prg_{index}.prg >>\n")
+            header.append(f"<<DA2: {_job_list(rng, 'DA2_JOB', da2_jobs, job_pool)} >>\n")
+            header.append(f"<<OPS: {_job_list(rng, 'OPS_JOB', ops_jobs, job_pool)} >>\n")
+            if last_run_by:
+                header.append(f"<<LAST_RUN_BY: user{rng.randrange(max(compilers, 1))} >>\n")
+            if rng.random() < drop_density:
+                header.append(f"DROP PROGRAM prg_{index} go\n")
+            file.writelines(header)
+            file.write(f"CREATE PROGRAM prg_{index}:dba go\n")
+
+            body = rng.randrange(body_lines // 2, body_lines * 3 // 2 + 1)
+            execute_ratio = min(fan_out / body, 1.0) if body else 0.0
+            for line in range(body):
+                if rng.random() < execute_ratio:
+                    if rng.random() < 0.01:
+                        target = programs + rng.randrange(programs // 100 + 1)
+                    elif index + 1 < programs and rng.random() >= cycle_density:
+                        target = rng.randrange(index + 1, programs)
+                    else:
+                        target = rng.randrange(index + 1)
+                    file.write(f"  EXECUTE prg_{target} 'MINE'\n")
+                else:
+                    file.write(f"  select into 'nl:' from person p where p.person_id = {line} with nocounter\n")
+            file.write("END GO\n")
+            lines += len(header) + body + 2
+    return lines
+
+
+def _job_list(rng, prefix, mean, pool):
+    """
+    Returns a comma separated list of int(mean) job names, plus one more with a probability
+    of the fractional part of mean, or "N/A" for none.
+    """
+    count = int(mean) + (rng.random() < mean - int(mean))
+    if not count:
+        return "N/A"
+    return ", ".join(f"{prefix}_{rng.randrange(pool)}" for _ in range(count))
+
+
+def add_generator_arguments(parser):
+    """
+    Adds the write_synthetic_dat knobs, other than the program count, to a benchmark's command line.
+    """
+    parser.add_argument("--body-lines", type=int, default=40, help="average body lines per program")
+    parser.add_argument("--fan-out", type=float, default=1.2, help="average EXECUTE calls per program")
+    parser.add_argument("--cycle-density", type=float, default=0.05,
+                        help="share of calls that go back to an earlier program and can close a cycle")
+    parser.add_argument("--da2-jobs", type=float, default=1, help="average DA2 jobs per program")
+    parser.add_argument("--ops-jobs", type=float, default=0.5, help="average OPS jobs per program")
+    parser.add_argument("--job-pool", type=int, default=5000, help="distinct job names of each kind")
+    parser.add_argument("--compilers", type=int, default=20,
+                        help="distinct <<COMPILED_BY>> users (0 leaves the header out)")
+    parser.add_argument("--source-prefixes", type=int, default=4,
+                        help="distinct <<SOURCE>> prefixes (0 leaves the header out)")
+    parser.add_argument("--no-last-run-by", action="store_true", help="leave the <<LAST_RUN_BY>> header out")
+    parser.add_argument("--drop-density", type=float, default=0.001,
+                        help="share of programs dropped before they are created (DROP PROGRAM blocks)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+
+def generator_options(args):
+    """
+    Returns the write_synthetic_dat keyword arguments for arguments added by add_generator_arguments.
+    """
+    return {
+        "body_lines": args.body_lines,
+        "fan_out": args.fan_out,
+        "cycle_density": args.cycle_density,
+        "da2_jobs": args.da2_jobs,
+        "ops_jobs": args.ops_jobs,
+        "job_pool": args.job_pool,
+        "compilers": args.compilers,
+        "source_prefixes": args.source_prefixes,
+        "last_run_by": not args.no_last_run_by,
+        "drop_density": args.drop_density,
+        "seed": args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="the .dat file to write")
+    parser.add_argument("--programs", type=int, default=100000, help="programs in the synthetic file")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    lines = write_synthetic_dat(args.path, args.programs, **generator_options(args))
+    print(f"Wrote {args.programs} programs, {lines} lines to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
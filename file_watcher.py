@@ -0,0 +1,46 @@
+import os
+import time
+
+# How often the watched files are looked at, in seconds
+POLL_INTERVAL = 0.2
+
+def file_signatures(paths):
+    """
+    Returns {path: (size, mtime_ns)} for the paths, with None for files that don't exist
+    (an export may delete the file before writing it again).
+    """
+    signatures = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signatures[path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            signatures[path] = None
+    return signatures
+
+def watch_files(list_paths, interval=POLL_INTERVAL, stop=None):
+    """
+    Yields the files list_paths() returns right away, then polls their size and modification
+    time every interval seconds and yields the list of paths that changed once a change has
+    settled: the files must look the same on two polls in a row, so a file that is still
+    being written is not read half-done, and none of them may be missing. Calling list_paths
+    on every poll lets a directory pick up new exports. Runs until stop() returns True, or
+    forever.
+    Stat polling needs nothing from the platform, and watching a handful of files costs a
+    few system calls per poll.
+    """
+    seen = file_signatures(list_paths())
+    previous = seen
+    # Taken before the caller reads them, so a change made meanwhile is not missed
+    yield list(seen)
+    while stop is None or not stop():
+        time.sleep(interval)
+        current = file_signatures(list_paths())
+        if current != previous:
+            previous = current
+            continue
+        if current != seen and None not in current.values():
+            changed = [path for path, signature in current.items() if seen.get(path) != signature]
+            changed.extend(path for path in seen if path not in current)
+            seen = current
+            yield changed
@@ -0,0 +1,236 @@
+from array import array
+
+from script_graph import ID_TYPECODE, Adjacency
+
+def reachable_depths(adjacency, sources, max_depth=None):
+    """
+    Walks the adjacency breadth first from the source node ids and returns {node: depth} for
+    every node reached within max_depth steps (the whole cone when max_depth is None).
+    The sources themselves are left out, even when a cycle leads back to them.
+    """
+    offsets = adjacency.offsets
+    targets = adjacency.targets
+    seen = bytearray(len(adjacency))
+    for source in sources:
+        seen[source] = 1
+
+    depths = {}
+    frontier = list(sources)
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            for target in targets[offsets[node]:offsets[node + 1]]:
+                if not seen[target]:
+                    seen[target] = 1
+                    depths[target] = depth
+                    next_frontier.append(target)
+        frontier = next_frontier
+    return depths
+
+def downstream(graph, name, max_depth=None):
+    """
+    Returns {name: depth} of the programs a script calls, directly (depth 1) or through other
+    scripts, within max_depth calls.
+    """
+    depths = reachable_depths(graph.calls, [graph.name_ids[name]], max_depth)
+    return {graph.names[node]: depth for node, depth in depths.items()}
+
+def upstream(graph, name, max_depth=None):
+    """
+    Returns {name: depth} of the scripts that call a program, directly (depth 1) or through
+    other scripts, within max_depth calls.
+    """
+    depths = reachable_depths(graph.callers, [graph.name_ids[name]], max_depth)
+    return {graph.names[node]: depth for node, depth in depths.items()}
+
+def job_scripts(graph, da2_jobs=(), ops_jobs=(), max_depth=None):
+    """
+    Returns {name: depth} of the programs a set of DA2 and OPS jobs (given by name) runs:
+    depth 1 for the scripts a job runs itself, depth 2 for the programs those call, and so
+    on, within max_depth. Goes through the job -> script indexes of the graph, so the cost is
+    that of the cone, not of the number of scripts.
+    """
+    sources = set()
+    for job in da2_jobs:
+        sources.update(graph.da2_job_scripts.neighbors(graph.da2_job_ids[job]))
+    for job in ops_jobs:
+        sources.update(graph.ops_job_scripts.neighbors(graph.ops_job_ids[job]))
+    sources = sorted(sources)
+    depths = {node: 1 for node in sources}
+    if max_depth is None or max_depth > 1:
+        called = reachable_depths(graph.calls, sources, None if max_depth is None else max_depth - 1)
+        for node, depth in called.items():
+            depths[node] = depth + 1
+    return {graph.names[node]: depth for node, depth in depths.items()}
+
+def affected_jobs(graph, names):
+    """
+    Returns ({DA2 job: depth}, {OPS job: depth}), the jobs that run any of the named scripts,
+    directly (depth 1) or through the scripts that call them (depth 2 for a caller, and so
+    on); these are the jobs a change to the scripts can affect.
+    """
+    sources = [graph.name_ids[name] for name in names]
+    depths = {node: 0 for node in sources}
+    depths.update(reachable_depths(graph.callers, sources))
+    da2 = {}
+    ops = {}
+    # Nearest scripts first, so each job keeps the depth of its shortest path
+    for node, depth in sorted(depths.items(), key=lambda item: item[1]):
+        if node >= graph.script_count:
+            continue
+        for job in graph.da2_jobs.neighbors(node):
+            da2.setdefault(graph.da2_job_names[job], depth + 1)
+        for job in graph.ops_jobs.neighbors(node):
+            ops.setdefault(graph.ops_job_names[job], depth + 1)
+    return da2, ops
+
+def group_by_depth(depths):
+    """
+    Turns {name: depth} into a list of name lists, one per depth starting at 1.
+    """
+    levels = [[] for _ in range(max(depths.values(), default=0))]
+    for name, depth in depths.items():
+        levels[depth - 1].append(name)
+    return levels
+
+def strongly_connected_components(adjacency):
+    """
+    Tarjan's algorithm with an explicit work stack, so deep call chains can't overflow the
+    interpreter's recursion limit. Returns (component_of, component_count): component_of[node]
+    is the component id of each node. Components are numbered in reverse topological order,
+    so every edge between two components points from a higher id to a lower one.
+    """
+    offsets = adjacency.offsets
+    targets = adjacency.targets
+    node_count = len(adjacency)
+    index = array(ID_TYPECODE, [-1]) * node_count
+    lowlink = array(ID_TYPECODE, [0]) * node_count
+    component_of = array(ID_TYPECODE, [-1]) * node_count
+    on_stack = bytearray(node_count)
+    stack = []
+    next_index = 0
+    component_count = 0
+
+    for root in range(node_count):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = 1
+        # Each frame is a node and the position of the next edge to look at
+        work = [(root, offsets[root])]
+        while work:
+            node, edge = work[-1]
+            end = offsets[node + 1]
+            while edge < end:
+                target = targets[edge]
+                edge += 1
+                if index[target] == -1:
+                    work[-1] = (node, edge)
+                    index[target] = lowlink[target] = next_index
+                    next_index += 1
+                    stack.append(target)
+                    on_stack[target] = 1
+                    work.append((target, offsets[target]))
+                    break
+                if on_stack[target] and index[target] < lowlink[node]:
+                    lowlink[node] = index[target]
+            else:
+                work.pop()
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component_of[member] = component_count
+                        if member == node:
+                            break
+                    component_count += 1
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+    return component_of, component_count
+
+class Condensation:
+    """
+    The call graph with every strongly connected component collapsed into one node, which
+    leaves a DAG. members lists the nodes of each component and dag holds the edges between
+    components, without duplicates or self loops.
+    """
+
+    def __init__(self, adjacency):
+        self.component_of, component_count = strongly_connected_components(adjacency)
+        offsets = adjacency.offsets
+        targets = adjacency.targets
+
+        member_lists = [[] for _ in range(component_count)]
+        for node, component in enumerate(self.component_of):
+            member_lists[component].append(node)
+
+        # last_source marks the components already linked from the one being built
+        last_source = array(ID_TYPECODE, [-1]) * component_count
+        dag_lists = []
+        self_loops = bytearray(component_count)
+        for component, members in enumerate(member_lists):
+            out = []
+            for node in members:
+                for target in targets[offsets[node]:offsets[node + 1]]:
+                    target_component = self.component_of[target]
+                    if target_component == component:
+                        self_loops[component] = 1
+                    elif last_source[target_component] != component:
+                        last_source[target_component] = component
+                        out.append(target_component)
+            dag_lists.append(out)
+
+        self.members = Adjacency.from_lists(member_lists)
+        self.dag = Adjacency.from_lists(dag_lists)
+        self._reversed_dag = None
+        # Components that contain a cycle: several members or a script that calls itself
+        self.cyclic = self_loops
+
+    @property
+    def reversed_dag(self):
+        if self._reversed_dag is None:
+            self._reversed_dag = self.dag.reversed(len(self.members))
+        return self._reversed_dag
+
+    def __len__(self):
+        return len(self.members)
+
+    def cone(self, node, reverse=False):
+        """
+        Returns the ids of every node reachable from node (or reaching it, with reverse=True),
+        walking the DAG of components instead of the individual calls.
+        The node itself is only included when it is part of a cycle.
+        """
+        start = self.component_of[node]
+        dag = self.reversed_dag if reverse else self.dag
+        components = [start] if self.cyclic[start] else []
+        components.extend(reachable_depths(dag, [start]))
+        nodes = []
+        for component in components:
+            nodes.extend(self.members.neighbors(component))
+        return nodes
+
+def cone(graph, name, reverse=False):
+    """
+    Returns the names of all programs a script reaches through calls (or, with reverse=True,
+    all scripts that reach it), using the graph's condensation.
+    """
+    return [graph.names[node] for node in graph.condensation().cone(graph.name_ids[name], reverse)]
+
+def find_cycles(graph):
+    """
+    Returns the call cycles of the graph as lists of script names in file order, largest
+    first and cycles of the same size in the file order of their first script, so the order
+    only depends on which cycles there are. A script that executes itself is a cycle of one.
+    """
+    condensation = graph.condensation()
+    cycles = [condensation.members.neighbors(component)
+              for component in range(len(condensation)) if condensation.cyclic[component]]
+    cycles.sort(key=lambda members: (-len(members), members[0]))
+    return [[graph.names[node] for node in members] for members in cycles]
@@ -0,0 +1,266 @@
+import gc
+import hashlib
+import os
+import pickle
+import shutil
+
+# Where cached script graphs are kept unless a directory is passed in
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SCRIPT_DEP_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "script_dependency_analyzer")
+)
+
+# Least recently used entries are removed once the cache grows past this size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Bump when the layout of a cache entry or of the cached scripts changes
+CACHE_VERSION = 2
+
+CACHE_SUFFIX = ".graph.pickle"
+BLOCK_STATE_SUFFIX = ".blocks.pickle"
+# Directory next to a block state holding its segments, one file per segment digest
+SEGMENTS_SUFFIX = ".segments"
+SEGMENT_SUFFIX = ".pickle"
+
+# Segments this process has read or written, by segments directory and digest; a watching
+# process gets the unchanged segments of the last state back without reading them again
+_segment_memo = {}
+
+def fingerprint_dat_file(dat_file_path):
+    """
+    Returns the size, modification time and content hash that identify a .dat file.
+    """
+    stat = os.stat(dat_file_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": hash_file(dat_file_path)
+    }
+
+def is_fingerprint_current(fingerprint, dat_file_path):
+    """
+    Tells whether a fingerprint_dat_file result still describes the .dat file: the size
+    matches and either the modification time matches or the content hash is still the same.
+    """
+    stat = os.stat(dat_file_path)
+    if fingerprint["size"] != stat.st_size:
+        return False
+    return fingerprint["mtime_ns"] == stat.st_mtime_ns or fingerprint["hash"] == hash_file(dat_file_path)
+
+def hash_file(file_path, chunk_size=8 * 1024 * 1024):
+    """
+    Returns the BLAKE2b digest of a file's contents as a hex string.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+def cache_entry_path(dat_file_path, cache_dir=None, suffix=CACHE_SUFFIX):
+    """
+    Returns the cache file used for a .dat file. Each .dat path has exactly one entry,
+    so a rebuilt graph replaces the stale one instead of piling up next to it.
+    """
+    key = hashlib.sha1(os.path.abspath(dat_file_path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, key + suffix)
+
+def load_cached_scripts(dat_file_path, cache_dir=None):
+    """
+    Returns the cleaned scripts cached for the .dat file, or None if there is no valid entry.
+    The entry is valid when the file size matches and either the modification time matches
+    or, after the file was touched, its content hash is still the same.
+    """
+    entry_path = cache_entry_path(dat_file_path, cache_dir)
+    try:
+        entry = _read_entry(entry_path)
+        stat = os.stat(dat_file_path)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        print(f"Ignoring unreadable cache entry {entry_path}: {e}")
+        return None
+
+    if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+        return None
+    fingerprint = entry["fingerprint"]
+    if fingerprint["size"] != stat.st_size:
+        return None
+    if fingerprint["mtime_ns"] != stat.st_mtime_ns:
+        if fingerprint["hash"] != hash_file(dat_file_path):
+            return None
+        # Same content under a new timestamp: remember it so the next run skips the hash
+        fingerprint["mtime_ns"] = stat.st_mtime_ns
+        try:
+            _write_entry(entry_path, entry)
+        except OSError as e:
+            print(f"Error writing cache entry {entry_path}: {e}")
+    else:
+        _touch(entry_path)
+    return entry["scripts"]
+
+def store_cached_scripts(dat_file_path, scripts, fingerprint, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+    """
+    Saves the cleaned scripts for the .dat file under the fingerprint it had when it was read,
+    then trims the cache back to max_bytes.
+    """
+    entry = {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(dat_file_path),
+        "fingerprint": fingerprint,
+        "scripts": scripts
+    }
+    entry_path = cache_entry_path(dat_file_path, cache_dir)
+    try:
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        _write_entry(entry_path, entry)
+    except OSError as e:
+        print(f"Error writing cache entry {entry_path}: {e}")
+        return
+    prune_cache(cache_dir, max_bytes)
+
+def load_block_state(dat_file_path, cache_dir=None):
+    """
+    Returns the index of the state saved by the last incremental parse of the .dat file, or
+    None: the fingerprint of the file at that time and its "segments" in file order, as
+    (digest, block_count) pairs. The cleaned scripts of the segments are read with
+    load_segments.
+    """
+    entry_path = cache_entry_path(dat_file_path, cache_dir, BLOCK_STATE_SUFFIX)
+    try:
+        entry = _read_entry(entry_path)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        print(f"Ignoring unreadable cache entry {entry_path}: {e}")
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+        return None
+    _touch(entry_path)
+    _touch(_segments_dir(entry_path))
+    return entry
+
+def load_segments(dat_file_path, digests, cache_dir=None):
+    """
+    Returns {digest: cleaned scripts} for the segments saved by store_block_state; a digest
+    whose segment is not (or no longer) in the cache maps to None.
+    """
+    segments_dir = _segments_dir(cache_entry_path(dat_file_path, cache_dir, BLOCK_STATE_SUFFIX))
+    memo = _segment_memo.setdefault(segments_dir, {})
+    segments = {}
+    for digest in digests:
+        scripts = memo.get(digest)
+        if scripts is None:
+            segment_path = os.path.join(segments_dir, digest + SEGMENT_SUFFIX)
+            try:
+                scripts = memo[digest] = _read_entry(segment_path)
+            except FileNotFoundError:
+                pass
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+                print(f"Ignoring unreadable cache entry {segment_path}: {e}")
+        segments[digest] = scripts
+    return segments
+
+def store_block_state(dat_file_path, segments, fingerprint, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+    """
+    Saves the state of an incremental parse of the .dat file: segments holds its segments in
+    file order as (digest, block_count, cleaned scripts). Only segments that aren't saved
+    yet are written, each to a file named by its digest, and the files of segments the
+    file no longer has are removed, so a small edit writes a small state.
+    """
+    entry = {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(dat_file_path),
+        "fingerprint": fingerprint,
+        "segments": [(digest, block_count) for digest, block_count, _ in segments]
+    }
+    entry_path = cache_entry_path(dat_file_path, cache_dir, BLOCK_STATE_SUFFIX)
+    segments_dir = _segments_dir(entry_path)
+    current = {digest: scripts for digest, _, scripts in segments}
+    try:
+        os.makedirs(segments_dir, exist_ok=True)
+        saved = {file_name[:-len(SEGMENT_SUFFIX)] for file_name in os.listdir(segments_dir)
+                 if file_name.endswith(SEGMENT_SUFFIX)}
+        for digest, scripts in current.items():
+            if digest not in saved:
+                _write_entry(os.path.join(segments_dir, digest + SEGMENT_SUFFIX), scripts)
+        _write_entry(entry_path, entry)
+        for digest in saved - current.keys():
+            os.remove(os.path.join(segments_dir, digest + SEGMENT_SUFFIX))
+    except OSError as e:
+        print(f"Error writing cache entry {entry_path}: {e}")
+        return
+    finally:
+        _segment_memo[segments_dir] = current
+    prune_cache(cache_dir, max_bytes)
+
+def _segments_dir(entry_path):
+    return entry_path[:-len(BLOCK_STATE_SUFFIX)] + SEGMENTS_SUFFIX
+
+def prune_cache(cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+    """
+    Deletes the least recently used cache entries until the cache fits in max_bytes.
+    Returns the paths that were removed.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    entries = []
+    try:
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith((CACHE_SUFFIX, BLOCK_STATE_SUFFIX)) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.endswith(SEGMENTS_SUFFIX) and entry.is_dir():
+                size = sum(segment.stat().st_size for segment in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+    except FileNotFoundError:
+        return []
+
+    removed = []
+    total = 0
+    for _, size, path in sorted(entries, reverse=True):
+        total += size
+        if total > max_bytes:
+            try:
+                if path.endswith(SEGMENTS_SUFFIX):
+                    shutil.rmtree(path)
+                    _segment_memo.pop(path, None)
+                else:
+                    os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                print(f"Error removing cache entry {path}: {e}")
+    return removed
+
+def _read_entry(entry_path):
+    """
+    Reads a cache entry. The collector is paused meanwhile: unpickling creates a large number
+    of small containers and would otherwise trigger many pointless collections.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(entry_path, 'rb') as file:
+            return pickle.load(file)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def _write_entry(entry_path, entry):
+    """
+    Writes a cache entry atomically so a crashed run never leaves a truncated entry behind.
+    """
+    temp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, entry_path)
+
+def _touch(entry_path):
+    """
+    Marks a cache entry as recently used for prune_cache.
+    """
+    try:
+        os.utime(entry_path)
+    except OSError:
+        pass
@@ -0,0 +1,77 @@
+from array import array
+
+from script_graph import ID_TYPECODE
+
+def layered_layout(graph, sweeps=2):
+    """
+    Lays the call graph out top-down in layers, so a script is always above the programs it
+    calls. Works on the condensation: the scripts of a call cycle share a layer and sit next
+    to each other. A component's layer is the length of the longest call chain leading to it;
+    within a layer, components are ordered by the mean position of their callers and then of
+    their callees (barycenter sweeps) to keep edges short and uncrossed.
+    Returns (layers, slots), arrays with the layer of every node id and its position in that
+    layer. Whoever draws a subgraph spaces its nodes out by these two.
+    """
+    condensation = graph.condensation()
+    dag = condensation.dag
+    parents = condensation.reversed_dag
+    members = condensation.members
+    component_count = len(condensation)
+
+    # Edges run from higher to lower component ids, so callers are placed before callees
+    layer_of = array(ID_TYPECODE, [0]) * component_count
+    layers = []
+    for component in range(component_count - 1, -1, -1):
+        layer = layer_of[component]
+        for parent in parents.neighbors(component):
+            if layer_of[parent] >= layer:
+                layer = layer_of[parent] + 1
+        layer_of[component] = layer
+        while len(layers) <= layer:
+            layers.append([])
+        layers[layer].append(component)
+
+    # Slot positions are centers, counted in nodes, so a cycle takes as much room as its members
+    position = [0.0] * component_count
+    for layer in layers:
+        _assign_positions(layer, members, position)
+
+    for _ in range(sweeps):
+        for layer in layers[1:]:
+            _order_by_barycenter(layer, parents, members, position)
+        for layer in reversed(layers[:-1]):
+            _order_by_barycenter(layer, dag, members, position)
+
+    node_count = len(condensation.component_of)
+    node_layers = array(ID_TYPECODE, [0]) * node_count
+    node_slots = array(ID_TYPECODE, [0]) * node_count
+    for layer_index, layer in enumerate(layers):
+        slot = 0
+        for component in layer:
+            for node in members.neighbors(component):
+                node_layers[node] = layer_index
+                node_slots[node] = slot
+                slot += 1
+    return node_layers, node_slots
+
+def _assign_positions(layer, members, position):
+    """
+    Packs the components of a layer side by side in their current order.
+    """
+    slot = 0
+    for component in layer:
+        width = members.degree(component)
+        position[component] = slot + width / 2
+        slot += width
+
+def _order_by_barycenter(layer, neighbours, members, position):
+    """
+    Sorts a layer by the mean position of each component's neighbours in the adjacent layers;
+    components without neighbours keep their position.
+    """
+    barycenter = {}
+    for component in layer:
+        linked = neighbours.neighbors(component)
+        barycenter[component] = sum(position[other] for other in linked) / len(linked) if linked else position[component]
+    layer.sort(key=barycenter.__getitem__)
+    _assign_positions(layer, members, position)
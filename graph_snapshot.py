@@ -0,0 +1,137 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from script_graph import ID_TYPECODE, Adjacency, ScriptGraph
+
+SNAPSHOT_MAGIC = b"SCRGRAPH"
+
+# Bump when the layout of a snapshot changes; snapshots of other versions are not read
+SNAPSHOT_VERSION = 2
+
+# Magic, version and number of sections, then one table entry per section: its name, where it
+# starts in the file and its size in bytes. Sections start on 8 byte boundaries.
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<32sQQ")
+_ALIGNMENT = 8
+
+# The string tables and adjacencies of a ScriptGraph, by their attribute names
+_STRING_TABLES = ("names", "da2_job_names", "ops_job_names", "compiled_by", "source", "last_run_by", "origin")
+_ADJACENCIES = ("calls", "callers", "da2_jobs", "da2_job_scripts", "ops_jobs", "ops_job_scripts")
+
+def write_snapshot(graph, snapshot_path, meta=None):
+    """
+    Saves a ScriptGraph as a binary snapshot: every string table as little-endian 32-bit
+    offsets into its UTF-8 bytes, every adjacency (the reversed ones too, so loading doesn't
+    redo them) as its CSR offsets and targets, and a JSON "meta" section with the script
+    count and the given meta dict. The file is replaced atomically.
+    """
+    sections = [("meta", json.dumps(dict(meta or {}, script_count=graph.script_count)).encode("utf-8"))]
+    for table in _STRING_TABLES:
+        encoded = [string.encode("utf-8") for string in getattr(graph, table)]
+        offsets = array(ID_TYPECODE, [0])
+        size = 0
+        for string in encoded:
+            size += len(string)
+            offsets.append(size)
+        sections.append((table + ".offsets", _little_endian(offsets)))
+        sections.append((table + ".data", b"".join(encoded)))
+    for name in _ADJACENCIES:
+        adjacency = getattr(graph, name)
+        sections.append((name + ".offsets", _little_endian(adjacency.offsets)))
+        sections.append((name + ".targets", _little_endian(adjacency.targets)))
+
+    position = _HEADER.size + _SECTION.size * len(sections)
+    entries = []
+    for name, data in sections:
+        position += -position % _ALIGNMENT
+        entries.append(_SECTION.pack(name.encode("ascii"), position, len(data)))
+        position += len(data)
+
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(sections)))
+        file.write(b"".join(entries))
+        for name, data in sections:
+            file.write(bytes(-file.tell() % _ALIGNMENT))
+            file.write(data)
+    os.replace(temp_path, snapshot_path)
+
+def read_snapshot(snapshot_path):
+    """
+    Opens a snapshot written by write_snapshot and returns (graph, meta). The file is
+    memory-mapped and the graph's arrays and string tables are views into it, so opening
+    costs next to nothing whatever the graph's size; pages are read as they are used.
+    Raises ValueError for files that aren't snapshots of SNAPSHOT_VERSION.
+    """
+    with open(snapshot_path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+        raise ValueError(f"{snapshot_path} is not a script graph snapshot")
+    magic, version, section_count = _HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{snapshot_path} is not a script graph snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"{snapshot_path} is a version {version} snapshot, not version {SNAPSHOT_VERSION}")
+
+    sections = {}
+    for index in range(section_count):
+        name, start, size = _SECTION.unpack_from(view, _HEADER.size + index * _SECTION.size)
+        sections[name.rstrip(b"\0").decode("ascii")] = view[start:start + size]
+
+    def ids(name):
+        data = sections[name]
+        if sys.byteorder == "big":
+            swapped = array(ID_TYPECODE, data.tobytes())
+            swapped.byteswap()
+            return swapped
+        return data.cast(ID_TYPECODE)
+
+    meta = json.loads(bytes(sections["meta"]))
+    tables = {table: StringTable(ids(table + ".offsets"), sections[table + ".data"]) for table in _STRING_TABLES}
+    adjacencies = {name: Adjacency(ids(name + ".offsets"), ids(name + ".targets")) for name in _ADJACENCIES}
+    graph = ScriptGraph(tables["names"], meta["script_count"], adjacencies["calls"],
+                        tables["da2_job_names"], adjacencies["da2_jobs"],
+                        tables["ops_job_names"], adjacencies["ops_jobs"],
+                        tables["compiled_by"], tables["source"], tables["last_run_by"], tables["origin"],
+                        adjacencies["callers"], adjacencies["da2_job_scripts"], adjacencies["ops_job_scripts"])
+    return graph, meta
+
+def _little_endian(ids):
+    if sys.byteorder == "big":
+        ids = array(ID_TYPECODE, ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+class StringTable(Sequence):
+    """
+    Read-only list of the strings of a snapshot, decoded from the mapped UTF-8 bytes when
+    they are accessed.
+    """
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        offsets = self._offsets
+        data = self._data
+        for index in range(len(offsets) - 1):
+            yield str(data[offsets[index]:offsets[index + 1]], "utf-8")
@@ -0,0 +1,56 @@
+import os
+import pathlib
+from string import Formatter
+
+# The copies of the page's browser libraries kept next to this module, shared by every page
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+
+# vis-network from the CDN pyvis links it from
+VIS_CDN_TAGS = """<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css" integrity="sha512-WgxfT5LWjfszlPHXRmBWHkV2eceiWTOBvrKCNbdgDYTHrT2AeLCGbF4sZlZw3UMN3WtL0tGUoIAKsu8mllg/XA==" crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js" integrity="sha512-LnvoEWDFrqGHlHmDD2101OrLcbsfkrzoSpvtSQtxK3RMnRV0eOkhhBN2dXHKRrUU8p2DGRTk35n4O8nWSVe1mQ==" crossorigin="anonymous" referrerpolicy="no-referrer"></script>"""
+
+# vis-network from LIB_DIR; {lib} is its location as seen from the page
+VIS_LOCAL_TAGS = """<link rel="stylesheet" href="{lib}/vis-9.1.2/vis-network.css" />
+<script src="{lib}/vis-9.1.2/vis-network.min.js"></script>"""
+
+def asset_tags(output_path, assets="cdn"):
+    """
+    Returns the tags that load vis-network into a page written to output_path: from the CDN
+    ("cdn"), or ("local") from the shared copy in LIB_DIR, linked relative to the page so the
+    pages and the library can move together.
+    """
+    if assets == "cdn":
+        return VIS_CDN_TAGS
+    page_dir = os.path.dirname(os.path.abspath(output_path))
+    try:
+        lib = os.path.relpath(LIB_DIR, page_dir).replace(os.sep, "/")
+    except ValueError:
+        # On another drive than the page, only an absolute link can reach it
+        lib = pathlib.Path(LIB_DIR).as_uri()
+    return VIS_LOCAL_TAGS.format(lib=lib)
+
+def render_template(file, template, values, minify=False):
+    """
+    Writes a str.format template to an open file, piece by piece: the literal text between
+    the fields, with {{ and }} unescaped, and the value of each {field} as it comes, so a page
+    with megabytes of data is never assembled in memory. With minify=True the template is
+    minified first (see minify_text); the values are written as they are.
+    """
+    if minify:
+        template = minify_text(template)
+    for literal, field, _, _ in Formatter().parse(template):
+        file.write(literal)
+        if field is not None:
+            file.write(str(values[field]))
+
+def minify_text(text):
+    """
+    Strips the indentation, blank lines and whole-line // comments out of the page's HTML or
+    JavaScript. Line breaks stay, so JavaScript's automatic semicolons still fall where they did.
+    """
+    lines = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if stripped and not stripped.startswith("//"):
+            lines.append(stripped)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,129 @@
+import contextlib
+import cProfile
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The profiler of the running pipeline; None (the default) turns profile_stage into a no-op
+_active = None
+
+class StageProfiler:
+    """
+    Records every pipeline stage run inside profile_stage as one JSON line in the report
+    file: its wall and CPU time in seconds, the peak resident memory while it ran and the
+    counters the stage filled in (bytes_read, blocks, ...), with blocks_per_second derived
+    from blocks. With profile_path the whole run is also under cProfile, and its stats are
+    dumped there on close() for pstats, snakeviz or a flame graph tool such as flameprof.
+    """
+
+    def __init__(self, report_path=None, profile_path=None):
+        self.report = None
+        if report_path == "-":
+            self.report = sys.stderr
+        elif report_path:
+            self.report = open(report_path, "w", encoding="utf-8")
+        self.profile_path = profile_path
+        self.profiler = None
+        if profile_path:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        counters = {}
+        reset_peak_rss()
+        started = time.time()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield counters
+        finally:
+            record = {
+                "stage": name,
+                "started": started,
+                "wall_seconds": time.perf_counter() - wall,
+                "cpu_seconds": time.process_time() - cpu,
+                "peak_rss_mb": peak_rss_mb()
+            }
+            record.update(counters)
+            if "blocks" in record and record["wall_seconds"] > 0:
+                record["blocks_per_second"] = record["blocks"] / record["wall_seconds"]
+            if self.report is not None:
+                self.report.write(json.dumps(record) + "\n")
+                self.report.flush()
+
+    def close(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+        if self.report is not None and self.report is not sys.stderr:
+            self.report.close()
+        self.report = None
+
+def start_profiling(report_path=None, profile_path=None):
+    """
+    Turns the stage hooks on for the rest of the run: JSON lines go to report_path ("-" for
+    stderr) and, with profile_path, cProfile stats to that file. See StageProfiler.
+    """
+    global _active
+    stop_profiling()
+    _active = StageProfiler(report_path, profile_path)
+    return _active
+
+def stop_profiling():
+    """
+    Turns the stage hooks off again, writing out the cProfile stats if they were on.
+    """
+    global _active
+    if _active is not None:
+        _active.close()
+        _active = None
+
+def profile_stage(name):
+    """
+    Context manager around one pipeline stage. It yields a dict for the stage's counters:
+
+        with profile_stage("parse") as stage:
+            scripts = parse_dat_file(path)
+            stage["blocks"] = len(scripts)
+
+    While profiling is off it measures nothing and the counters go to a dict of their own,
+    which is dropped.
+    """
+    if _active is None:
+        return contextlib.nullcontext({})
+    return _active.stage(name)
+
+def reset_peak_rss():
+    """
+    Starts a new peak RSS measurement where the platform allows it (Linux), so a stage
+    reports its own peak instead of the highest one so far.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB, or None where it can't be read.
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
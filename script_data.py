@@ -130,14 +130,27 @@
 
 
 
+import glob
+import hashlib
+import mmap
+import operator
+import os
 import re
-from tkinter import filedialog
-import tkinter as tk
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import graph_cache
+import graph_snapshot
+from pipeline_profile import profile_stage
 
 def select_dat_file():
     """
-    Opens a file dialog to select a .dat file
+    Opens a file dialog to select a .dat file.
+    tkinter is only imported here, so everything else runs on machines without a display.
     """
+    from tkinter import filedialog
+    import tkinter as tk
+
     root = tk.Tk()
     root.withdraw()  # Hide the main window
     file_path = filedialog.askopenfilename(
@@ -150,43 +163,433 @@ def parse_dat_file(file_path):
     """
     Parses the .dat file and returns a list of script objects in the required format.
     """
-    # Get the raw blocks from the file
-    blocks = split_dat_file_to_blocks(file_path)
+    return list(iter_dat_scripts(file_path))
+
+# Files are streamed in line-aligned chunks of about this many bytes
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Token kinds recognised by the line tokenizer, as bit flags
+_COMPILED_BY = 1
+_SOURCE = 2
+_DA2 = 4
+_OPS = 8
+_LAST_RUN_BY = 16
+_PROGRAM = 32
+_END_GO = 64
+_EXECUTE = 128
+
+# Every byte string the block state machine reacts to. A line holding none of them
+# cannot change the parser state, so it is never decoded or inspected.
+_LINE_TOKENS = (
+    (b'<<COMPILED_BY:', _COMPILED_BY),
+    (b'<<SOURCE:', _SOURCE),
+    (b'<<DA2:', _DA2),
+    (b'<<OPS:', _OPS),
+    (b'<<LAST_RUN_BY:', _LAST_RUN_BY),
+    (b'CREATE PROGRAM', _PROGRAM),
+    (b'DROP PROGRAM', _PROGRAM),
+    (b'END GO', _END_GO),
+)
+
+# Header tags are found with a single scan; the matched group identifies the tag
+_HEADER_TAG_RE = re.compile(rb'<<(?:(COMPILED_BY)|(SOURCE)|(DA2)|(OPS)|(LAST_RUN_BY)):')
+_HEADER_KINDS = (0, _COMPILED_BY, _SOURCE, _DA2, _OPS, _LAST_RUN_BY)
+_HEADER_MASK = _COMPILED_BY | _SOURCE | _DA2 | _OPS | _LAST_RUN_BY
+
+def iter_dat_scripts(input_file_path, skip_compiler_prefix=None, skip_source_prefix=None, keep_content=False):
+    """
+    Streams the .dat file and yields one finished script object per program block.
+    Header tags and EXECUTE calls are extracted in the same pass over the file, so only
+    the block currently being read is held in memory. The block text itself is only kept
+    (under the "content" key) when keep_content is True.
+    """
+    try:
+        with open(input_file_path, 'rb') as file:
+            yield from _iter_scripts_from_segments(_iter_line_chunks(file), skip_compiler_prefix,
+                                                   skip_source_prefix, keep_content)
+    except IOError as e:
+        print(f"Error reading file {input_file_path}: {e}")
+
+def _iter_line_chunks(file, chunk_size=None):
+    """
+    Reads a binary file in chunks that end on a line break.
+    Yields (buffer, start, end) segments for _iter_scripts_from_segments.
+    """
+    chunk_size = chunk_size or READ_CHUNK_SIZE
+    tail = b''
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            if tail:
+                yield tail, 0, len(tail)
+            return
+        if tail:
+            data = tail + data
+        cut = data.rfind(b'\n') + 1
+        tail = data[cut:]
+        if cut:
+            yield data, 0, cut
+
+def _iter_scripts_from_segments(segments, skip_compiler_prefix=None, skip_source_prefix=None, keep_content=False,
+                                reuse=None):
+    """
+    Runs the block state machine of split_dat_file_to_blocks over line-aligned
+    (buffer, start, end) byte segments, yielding script objects instead of collecting
+    block text. Each segment is classified once by _tokenize_lines and only the lines
+    holding a token are decoded, so plain program body lines are never touched from Python.
+    When reuse is given (a dict of block digest -> script object), every script gets a
+    "digest" of its headers and block bytes; blocks whose digest is in reuse yield the stored
+    script as is and only the other blocks are scanned for EXECUTE calls.
+    """
+    block_name = ""
+    calls = []
+    content = []
+    compiled_by = ""
+    source = ""
+    da2 = ""
+    ops = ""
+    last_run_by = ""
+    in_block = False
+    keep_bytes = keep_content or reuse is not None
+
+    for buf, start, end in segments:
+        block_start = start
+        for line_start, kinds in _tokenize_lines(buf, start, end, execute=reuse is None):
+            raw = buf[line_start:buf.find(b'\n', line_start, end) + 1 or end]
+            if b'\r' in raw and raw.count(b'\r') != raw.count(b'\r\n'):
+                # Text mode also breaks lines on a bare carriage return; classify each part
+                lines = [(line_start + offset, part, _classify_line(part))
+                         for offset, part in _split_bare_cr_lines(raw)]
+            else:
+                lines = ((line_start, raw, kinds),)
+
+            for offset, raw_line, kinds in lines:
+                if not kinds:
+                    continue
+                line = raw_line.decode('utf-8', errors='ignore')
+
+                # Capture compiled by and source information
+                if kinds & _HEADER_MASK:
+                    if kinds & _COMPILED_BY:
+                        compiled_by = _parse_header_value(line, '<<COMPILED_BY: ')
+                    if kinds & _SOURCE:
+                        source = _parse_header_value(line, '<<SOURCE: ')
+                    if kinds & _DA2:
+                        da2 = _parse_header_value(line, '<<DA2: ')
+                    if kinds & _OPS:
+                        ops = _parse_header_value(line, '<<OPS: ')
+                    if kinds & _LAST_RUN_BY:
+                        last_run_by = _parse_header_value(line, '<<LAST_RUN_BY: ')
+                    if not kinds & ~_HEADER_MASK:
+                        continue
+
+                # Check if the line starts a block
+                if kinds & _PROGRAM:
+                    in_block = True
+                    block_name = line.split()[2]  # Assuming the name is the third word
+                    calls = []  # A new block discards anything collected for an unfinished one
+                    if kinds & _EXECUTE:
+                        _collect_execute_call(line, calls)
+                    content = []
+                    block_start = offset
+                elif kinds & _END_GO and in_block:
+                    if kinds & _EXECUTE:
+                        _collect_execute_call(line, calls)
+                    if not ((skip_compiler_prefix and compiled_by.lower().startswith(skip_compiler_prefix)) or
+                            (skip_source_prefix and skip_source_prefix in source.lower())):
+                        if keep_bytes:
+                            content.append(buf[block_start:offset + len(raw_line)])
+                        if reuse is not None:
+                            block = b''.join(content)
+                            digest = _block_digest(block, compiled_by, source, da2, ops, last_run_by)
+                            script = reuse.get(digest)
+                            if script is None:
+                                script = _build_script(block_name, _extract_execute_calls(block), compiled_by,
+                                                       source, da2, ops, last_run_by)
+                                script["digest"] = digest
+                        else:
+                            script = _build_script(block_name, calls, compiled_by, source, da2, ops, last_run_by)
+                        if keep_content:
+                            script["content"] = _decode_block_text(content)
+                        yield script
+                    in_block = False
+                    calls = []
+                    content = []
+                    compiled_by, source, da2, ops, last_run_by = "", "", "", "", ""  # Reset all for next block
+                elif in_block and kinds & _EXECUTE:
+                    _collect_execute_call(line, calls)
+        if in_block and keep_bytes:
+            content.append(buf[block_start:end])
+
+def _tokenize_lines(buf, start, end, execute=True):
+    """
+    Classifies the lines of buf[start:end] with a handful of C-level scans over the buffer.
+    Returns a list of (line_start, kinds) for every line holding at least one token, in
+    file order, where kinds is a bit set of the token kinds found on the line.
+    With execute=False EXECUTE statements are not looked for.
+    """
+    marks = {}
+    get = marks.get
+    find = buf.find
+    rfind = buf.rfind
+
+    for match in _HEADER_TAG_RE.finditer(buf, start, end):
+        pos = match.start()
+        line_start = pos if pos == start or buf[pos - 1] == 10 else rfind(b'\n', start, pos) + 1 or start
+        marks[line_start] = get(line_start, 0) | _HEADER_KINDS[match.lastindex]
+
+    pos = find(b' PROGRAM', start, end)
+    while pos != -1:
+        if buf[max(pos - 6, 0):pos] == b'CREATE' or buf[max(pos - 4, 0):pos] == b'DROP':
+            line_start = rfind(b'\n', start, pos) + 1 or start
+            marks[line_start] = get(line_start, 0) | _PROGRAM
+        pos = find(b' PROGRAM', pos + 8, end)
+
+    pos = find(b'END GO', start, end)
+    while pos != -1:
+        line_start = pos if pos == start or buf[pos - 1] == 10 else rfind(b'\n', start, pos) + 1 or start
+        marks[line_start] = get(line_start, 0) | _END_GO
+        pos = find(b'END GO', pos + 6, end)
+
+    if not execute:
+        return sorted(marks.items())
+
+    # EXECUTE is matched case-insensitively, like the 'EXECUTE' in line.upper() check
+    upper = buf[start:end].upper()
+    pos = upper.find(b'EXECUTE')
+    while pos != -1:
+        line_start = upper.rfind(b'\n', 0, pos) + 1 + start
+        marks[line_start] = get(line_start, 0) | _EXECUTE
+        pos = upper.find(b'EXECUTE', pos + 7)
+
+    return sorted(marks.items())
+
+def _classify_line(raw_line):
+    """
+    Returns the token kinds found in a single raw line.
+    """
+    kinds = 0
+    for token, kind in _LINE_TOKENS:
+        if token in raw_line:
+            kinds |= kind
+    if b'EXECUTE' in raw_line.upper():
+        kinds |= _EXECUTE
+    return kinds
+
+def _split_bare_cr_lines(raw):
+    """
+    Yields (offset, line) for the universal-newline lines inside raw.
+    """
+    offset = 0
+    for line in raw.splitlines(keepends=True):
+        yield offset, line
+        offset += len(line)
+
+def _block_digest(block, compiled_by, source, da2, ops, last_run_by):
+    """
+    Returns a hex digest identifying a block by its raw bytes and the header values it was read with.
+    """
+    digest = hashlib.blake2b(block, digest_size=16)
+    digest.update('\0'.join((compiled_by, source, da2, ops, last_run_by)).encode('utf-8'))
+    return digest.hexdigest()
+
+def _extract_execute_calls(block):
+    """
+    Returns the EXECUTE calls in the raw bytes of a single block, in order.
+    """
+    calls = []
+    for line in _decode_block_text([block]).split('\n'):
+        _collect_execute_call(line, calls)
+    return calls
+
+def _decode_block_text(parts):
+    """
+    Decodes the raw byte pieces of a block into text with universal newlines.
+    """
+    text = b''.join(parts).decode('utf-8', errors='ignore')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def _parse_header_value(line, tag):
+    """
+    Returns the value of a '<<TAG: value >>' header line, or "Unknown" if it has none.
+    """
+    parts = line.strip().split(tag)
+    return parts[1].rstrip(' >>') if len(parts) > 1 else "Unknown"
+
+def _parse_job_list(jobs):
+    """
+    Splits a comma separated DA2/OPS header value into a list of job names.
+    """
+    if jobs and jobs.upper() != 'N/A' and jobs.upper() != 'UNKNOWN':
+        return [job.strip() for job in jobs.split(',')]
+    return []
+
+def _collect_execute_call(line, calls):
+    """
+    Appends the program called by an EXECUTE statement on the line, if any, to calls.
+    """
+    if 'EXECUTE' in line.upper():
+        called_script = line.split('EXECUTE')[-1].strip().split()[0].strip()
+        called_script = called_script.replace("'", "").replace('"', '')
+        if called_script:
+            calls.append(normalize_program_name(called_script))
+
+def _build_script(block_name, calls, compiled_by, source, da2, ops, last_run_by):
+    """
+    Creates the script object for a finished block.
+    """
+    return {
+        "name": normalize_program_name(block_name),
+        "da2_jobs": _parse_job_list(da2),
+        "ops_jobs": _parse_job_list(ops),
+        "calls": calls,
+        "compiled_by": compiled_by,
+        "source": source,
+        "last_run_by": last_run_by
+    }
+
+# Chunks handed to parallel workers are kept at or below this size
+PARALLEL_CHUNK_SIZE = 64 * 1024 * 1024
+
+# The fields of a script object, in the order parallel workers send them back as a tuple:
+# tuples pickle smaller and load faster than dicts that repeat every key
+_SCRIPT_FIELDS = ("name", "da2_jobs", "ops_jobs", "calls", "compiled_by", "source", "last_run_by")
+
+def parse_dat_file_parallel(file_path, workers=None):
+    """
+    Parses the .dat file across a pool of worker processes.
+    The file is memory-mapped and cut into chunks on 'END GO' lines that close a block,
+    so every chunk starts in the same state the sequential parser would be in there.
+    Returns the same list as parse_dat_file.
+    """
+    workers = workers or os.cpu_count() or 1
+    try:
+        ranges = find_dat_chunk_ranges(file_path, workers)
+    except (IOError, ValueError) as e:
+        print(f"Error reading file {file_path}: {e}")
+        return []
+    if workers == 1 or len(ranges) == 1:
+        return parse_dat_file(file_path)
+
     scripts = []
-    
-    for block_name, block_content, compiled_by, source, da2, ops, last_run_by in blocks:
-        # Create script object
-        script = {
-            "name": normalize_program_name(block_name),
-            "da2_jobs": [],
-            "ops_jobs": [],
-            "calls": []
-        }
-        
-        # Parse DA2 jobs
-        if da2 and da2.upper() != 'N/A' and da2.upper() != 'UNKNOWN':
-            script["da2_jobs"] = [job.strip() for job in da2.split(',')]
-        
-        # Parse OPS jobs
-        if ops and ops.upper() != 'N/A' and ops.upper() != 'UNKNOWN':
-            script["ops_jobs"] = [job.strip() for job in ops.split(',')]
-        #
-        # Parse EXECUTE statements from block content
-        for line in block_content.split('\n'):
-            if 'EXECUTE' in line.upper():
-                called_script = line.split('EXECUTE')[-1].strip().split()[0].strip()
-                called_script = called_script.replace("'", "").replace('"', '')
-                if called_script:
-                    script["calls"].append(normalize_program_name(called_script))
-        
-        scripts.append(script)
-    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() returns results in submission order, which keeps the file order
+        for chunk_scripts in pool.map(_parse_dat_range, [(file_path, start, end) for start, end in ranges]):
+            scripts.extend(_scripts_from_fields(chunk_scripts))
     return scripts
 
-def get_scripts(dat_file_path=None):
+def find_dat_chunk_ranges(file_path, workers):
+    """
+    Splits the .dat file into (start, end) byte ranges that can be parsed independently.
+    Aims for a few chunks per worker, none larger than PARALLEL_CHUNK_SIZE.
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return [(0, 0)]
+    chunk_count = max(workers * 4, -(-size // PARALLEL_CHUNK_SIZE))
+    target = -(-size // chunk_count)
+
+    boundaries = [0]
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = target
+        while pos < size:
+            boundary = _find_block_boundary(mm, pos, boundaries[-1])
+            if boundary is None or boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            pos = max(boundary, pos) + target
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+def _find_block_boundary(mm, pos, lower=0):
+    """
+    Returns the offset just past an 'END GO' line near pos that is guaranteed to close a
+    block, or None if there is none before the end of the file.
+    A line qualifies when it is the first 'END GO' after the last CREATE/DROP PROGRAM line
+    and is followed by another CREATE/DROP PROGRAM line: the sequential parser is inside a
+    block when it reaches it, so it resets all block and header state there.
+    Statements are not looked for before lower (the start of the chunk being cut), so
+    cutting a whole file reads each byte about once, however many chunks it makes.
+    """
+    while True:
+        statement = _find_program_statement(mm, pos)
+        if statement == -1:
+            return None
+        statement_line = mm.rfind(b'\n', 0, statement) + 1
+        previous = _rfind_program_statement(mm, lower, statement_line)
+        next_pos = mm.find(b'\n', statement)
+        if next_pos == -1:
+            return None
+        if previous != -1:
+            previous_line = mm.rfind(b'\n', 0, previous) + 1
+            end_go = mm.find(b'END GO', mm.find(b'\n', previous), statement_line)
+            if end_go != -1:
+                boundary = mm.find(b'\n', end_go) + 1
+                # Text mode also breaks lines on a bare CR, which the byte search above
+                # cannot see; only cut where both views of the lines agree.
+                region = mm[previous_line:boundary]
+                if region.count(b'\r') == region.count(b'\r\n'):
+                    return boundary
+        pos = next_pos
+
+def _find_program_statement(mm, pos, end=None):
+    """
+    Returns the offset of the first 'CREATE PROGRAM' or 'DROP PROGRAM' in mm[pos:end], or -1.
+    Both are found with one search for ' PROGRAM', so a statement that is rare in the file
+    (DROP, usually) doesn't cost a scan to the end of it on every call.
+    """
+    end = len(mm) if end is None else end
+    found = mm.find(b' PROGRAM', pos, end)
+    while found != -1:
+        for verb in (b'CREATE', b'DROP'):
+            start = found - len(verb)
+            if start >= pos and mm[start:found] == verb:
+                return start
+        found = mm.find(b' PROGRAM', found + 8, end)
+    return -1
+
+def _rfind_program_statement(mm, pos, end):
+    """
+    Returns the offset of the last 'CREATE PROGRAM' or 'DROP PROGRAM' in mm[pos:end], or -1.
+    """
+    found = mm.rfind(b' PROGRAM', pos, end)
+    while found != -1:
+        for verb in (b'CREATE', b'DROP'):
+            start = found - len(verb)
+            if start >= pos and mm[start:found] == verb:
+                return start
+        found = mm.rfind(b' PROGRAM', pos, found)
+    return -1
+
+def _parse_dat_range(args):
+    """
+    Worker entry point: parses the script objects in one byte range of the .dat file and
+    returns them as tuples of their _SCRIPT_FIELDS, turned back into dicts by
+    _scripts_from_fields.
+    """
+    file_path, start, end = args
+    script_fields = operator.itemgetter(*_SCRIPT_FIELDS)
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return list(map(script_fields, _iter_scripts_from_segments([(mm, start, end)])))
+
+def _scripts_from_fields(chunk_scripts):
+    """
+    Returns the script objects of the tuples a worker sent back.
+    """
+    return [dict(zip(_SCRIPT_FIELDS, fields)) for fields in chunk_scripts]
+
+def get_scripts(dat_file_path=None, parallel=False, workers=None, use_cache=False, cache_dir=None,
+                rebuild_cache=False, incremental=False, changes=None):
     """
     Returns the scripts data from the .dat file.
     If no file path is provided, prompts user to select one.
+    With parallel=True the file is parsed across a pool of worker processes.
+    With use_cache=True the cleaned scripts are kept on disk and reused for as long as the
+    .dat file is unchanged; rebuild_cache=True forces a re-parse that refreshes the entry.
+    With incremental=True only the blocks changed since the last incremental run are parsed
+    (see update_scripts_incremental) and a summary of the changes is printed; a dict passed
+    as changes receives them.
     """
 
     if not dat_file_path:
@@ -195,12 +598,364 @@ def get_scripts(dat_file_path=None):
             return []
     
     try:
-        scripts = parse_dat_file(dat_file_path)
-        return clean_scripts(scripts)
+        if incremental:
+            with profile_stage("incremental_parse") as stage:
+                scripts, file_changes = update_scripts_incremental(dat_file_path, cache_dir)
+                stage["blocks"] = file_changes["reparsed_blocks"]
+                stage["total_blocks"] = file_changes["total_blocks"]
+            print(f"Re-parsed {file_changes['reparsed_blocks']} of {file_changes['total_blocks']} blocks: "
+                  f"{len(file_changes['added'])} scripts added, {len(file_changes['changed'])} changed, "
+                  f"{len(file_changes['removed'])} removed.")
+            if changes is not None:
+                changes.update(file_changes)
+            return scripts
+
+        if use_cache:
+            if not rebuild_cache:
+                with profile_stage("cache_load") as stage:
+                    scripts = graph_cache.load_cached_scripts(dat_file_path, cache_dir)
+                    stage["hit"] = scripts is not None
+                if scripts is not None:
+                    return scripts
+            # Fingerprint before parsing so a file rewritten mid-parse is not cached as current
+            with profile_stage("fingerprint"):
+                fingerprint = graph_cache.fingerprint_dat_file(dat_file_path)
+
+        # Reading, block splitting and EXECUTE extraction are one pass over the file
+        with profile_stage("parse") as stage:
+            if parallel:
+                scripts = parse_dat_file_parallel(dat_file_path, workers)
+            else:
+                scripts = parse_dat_file(dat_file_path)
+            stage["bytes_read"] = os.path.getsize(dat_file_path)
+            stage["blocks"] = len(scripts)
+        with profile_stage("clean") as stage:
+            scripts = clean_scripts(scripts)
+            stage["blocks"] = len(scripts)
+
+        if use_cache:
+            with profile_stage("cache_store"):
+                graph_cache.store_cached_scripts(dat_file_path, scripts, fingerprint, cache_dir)
+        return scripts
     except Exception as e:
         print(f"Error processing .dat file: {e}")
         return []
 
+# How get_scripts_from_files settles a program defined in more than one file:
+#   "first": the file listed first wins, "last": the file listed last wins,
+#   "newest": the most recently modified file wins,
+#   "merge": the first file's definition, with the calls and jobs of all of them
+PRECEDENCE_RULES = ("first", "last", "newest", "merge")
+
+def expand_dat_paths(patterns, report_missing=True):
+    """
+    Turns a list of .dat files, directories (all the .dat files in them) and glob patterns
+    into the list of files they name, in the order given; matches of one directory or pattern
+    are sorted. A file named twice is only kept once. Patterns that match nothing are
+    printed unless report_missing is False.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(glob.escape(pattern), "*.dat")))
+        elif glob.has_magic(pattern):
+            matches = sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+        else:
+            matches = [pattern]
+        if not matches and report_missing:
+            print(f"No .dat files match {pattern}")
+        paths.extend(matches)
+    return list(dict.fromkeys(paths))
+
+def get_scripts_from_files(patterns, precedence="first", workers=None, use_cache=False, cache_dir=None,
+                           rebuild_cache=False):
+    """
+    Returns the scripts of several .dat files (see expand_dat_paths for what patterns may
+    hold) merged into one list, so calls from one export to a program of another resolve.
+    Files with a valid cache entry are taken from the cache (with use_cache=True, as in
+    get_scripts); the others are cut into chunks of whole blocks and parsed together on one
+    pool of worker processes, so more files mostly mean more chunks for the same workers.
+    Programs defined in several files are settled by the precedence rule (PRECEDENCE_RULES)
+    and every script records the file it was taken from as its "origin".
+    """
+    if precedence not in PRECEDENCE_RULES:
+        raise ValueError(f"Unknown precedence rule {precedence!r}; expected one of {', '.join(PRECEDENCE_RULES)}")
+    try:
+        paths = expand_dat_paths(patterns)
+        file_scripts = {}
+        to_parse = []
+        for path in paths:
+            if use_cache and not rebuild_cache:
+                with profile_stage("cache_load") as stage:
+                    scripts = graph_cache.load_cached_scripts(path, cache_dir)
+                    stage["hit"] = scripts is not None
+                if scripts is not None:
+                    file_scripts[path] = scripts
+                    continue
+            to_parse.append(path)
+
+        fingerprints = {}
+        if use_cache:
+            with profile_stage("fingerprint"):
+                fingerprints = {path: graph_cache.fingerprint_dat_file(path) for path in to_parse}
+        with profile_stage("parse") as stage:
+            parsed = _parse_dat_files(to_parse, workers)
+            stage["bytes_read"] = sum(os.path.getsize(path) for path in to_parse)
+            stage["blocks"] = sum(len(scripts) for scripts in parsed.values())
+        with profile_stage("clean") as stage:
+            for path in to_parse:
+                file_scripts[path] = clean_scripts(parsed[path])
+            stage["blocks"] = sum(len(scripts) for scripts in file_scripts.values())
+        if use_cache:
+            with profile_stage("cache_store"):
+                for path in to_parse:
+                    graph_cache.store_cached_scripts(path, file_scripts[path], fingerprints[path], cache_dir)
+
+        with profile_stage("merge") as stage:
+            scripts = merge_scripts([(path, file_scripts[path]) for path in paths], precedence)
+            stage["blocks"] = len(scripts)
+        return scripts
+    except Exception as e:
+        print(f"Error processing .dat files: {e}")
+        return []
+
+def _parse_dat_files(paths, workers=None):
+    """
+    Parses several .dat files on one process pool. Each file gets a share of the chunks in
+    proportion to its size. Returns {path: scripts}, each list in file order.
+    """
+    workers = workers or os.cpu_count() or 1
+    parsed = {path: [] for path in paths}
+    sizes = {path: os.path.getsize(path) for path in paths}
+    total_size = sum(sizes.values())
+    tasks = []
+    for path in paths:
+        # mmap refuses empty files, and they hold no scripts anyway
+        if sizes[path]:
+            file_workers = max(1, round(workers * sizes[path] / total_size))
+            tasks.extend((path, start, end) for start, end in find_dat_chunk_ranges(path, file_workers))
+    if workers == 1 or len(tasks) <= 1:
+        for path in paths:
+            if sizes[path]:
+                parsed[path] = parse_dat_file(path)
+        return parsed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() returns results in submission order, which keeps every file in file order
+        for (path, _, _), chunk_scripts in zip(tasks, pool.map(_parse_dat_range, tasks)):
+            parsed[path].extend(_scripts_from_fields(chunk_scripts))
+    return parsed
+
+def merge_scripts(file_scripts, precedence="first"):
+    """
+    Merges the cleaned scripts of several files, given as (path, scripts) pairs, into one
+    list in the order programs first appear. Each script is the one of the file the
+    precedence rule picks (see PRECEDENCE_RULES), with that file as its "origin".
+    Prints how many programs were defined more than once.
+    """
+    if precedence == "last":
+        ranked = list(reversed(file_scripts))
+    elif precedence == "newest":
+        # sorted() is stable, so files modified at the same time keep the order they were given in
+        ranked = sorted(file_scripts, key=lambda item: os.stat(item[0]).st_mtime_ns, reverse=True)
+    else:
+        ranked = list(file_scripts)
+    rank = {path: index for index, (path, _) in enumerate(ranked)}
+
+    order = []
+    chosen = {}
+    duplicates = 0
+    for path, scripts in file_scripts:
+        for script in scripts:
+            name = script["name"]
+            current = chosen.get(name)
+            if current is None:
+                order.append(name)
+                chosen[name] = dict(script, origin=path)
+                continue
+            duplicates += 1
+            if precedence == "merge":
+                current["calls"] = list(dict.fromkeys(current["calls"] + script["calls"]))
+                current["da2_jobs"] = list(dict.fromkeys(current["da2_jobs"] + script["da2_jobs"]))
+                current["ops_jobs"] = list(dict.fromkeys(current["ops_jobs"] + script["ops_jobs"]))
+            elif rank[path] < rank[current["origin"]]:
+                chosen[name] = dict(script, origin=path)
+    if duplicates:
+        print(f"{duplicates} program definitions were duplicated across files; kept by the '{precedence}' rule.")
+    return [chosen[name] for name in order]
+
+def save_graph_snapshot(graph, snapshot_path, dat_file_path=None, fingerprint=None):
+    """
+    Saves a ScriptGraph as a binary snapshot (see graph_snapshot) that load_graph_snapshot
+    opens without parsing anything. With dat_file_path, the snapshot remembers the .dat file
+    it was built from and its fingerprint (graph_cache.fingerprint_dat_file), so loading it
+    can tell when it has gone stale. The fingerprint has to be taken before the file is
+    parsed, as get_scripts does for its cache: one taken afterwards would pass off a graph of
+    the old contents as current if the file was rewritten meanwhile. Without one, the
+    snapshot is never taken as current for the file.
+    """
+    meta = {}
+    if dat_file_path:
+        meta["dat_file"] = os.path.abspath(dat_file_path)
+        meta["fingerprint"] = fingerprint
+    try:
+        graph_snapshot.write_snapshot(graph, snapshot_path, meta)
+    except OSError as e:
+        print(f"Error writing graph snapshot {snapshot_path}: {e}")
+
+def load_graph_snapshot(snapshot_path, dat_file_path=None):
+    """
+    Returns the ScriptGraph saved by save_graph_snapshot, memory-mapped rather than read in,
+    or None if the snapshot is missing or unusable. With dat_file_path, a snapshot that was
+    built from another state of that .dat file (or without one) is not used either.
+    """
+    try:
+        graph, meta = graph_snapshot.read_snapshot(snapshot_path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unusable graph snapshot {snapshot_path}: {e}")
+        return None
+    if dat_file_path:
+        fingerprint = meta.get("fingerprint")
+        try:
+            if fingerprint is None or not graph_cache.is_fingerprint_current(fingerprint, dat_file_path):
+                print(f"Graph snapshot {snapshot_path} is out of date with {dat_file_path}")
+                return None
+        except OSError as e:
+            print(f"Error checking {dat_file_path}: {e}")
+            return None
+    return graph
+
+# Incremental parsing hashes the file in segments of roughly this many blocks; the cut points
+# are chosen from the bytes around them, so an edit only moves the boundaries next to it
+INCREMENTAL_SEGMENT_BLOCKS = 16
+
+# An 'END GO' and the rest of its line
+_END_GO_LINE_RE = re.compile(rb'END GO[^\n]*\n')
+
+def update_scripts_incremental(dat_file_path, cache_dir=None):
+    """
+    Brings the scripts of the .dat file up to date from the state saved by the previous call.
+    The file is cut into segments of whole program blocks, and the cleaned scripts of each
+    segment are saved under the digest of its bytes. Only segments whose bytes changed are
+    parsed again; inside those, blocks (CREATE or DROP PROGRAM) are matched by their content
+    digest against the segments that are gone and only added or edited ones are scanned for
+    EXECUTE calls. Only the names in those segments are compared with the previous state.
+    Returns the cleaned scripts, the same as get_scripts but with the "digest" of each
+    block, and a dict describing what changed:
+        "added", "changed", "removed": script names
+        "reparsed_blocks", "total_blocks": how much of the file actually had to be parsed
+    """
+    stat = os.stat(dat_file_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    state = graph_cache.load_block_state(dat_file_path, cache_dir)
+    old_index = state["segments"] if state else []
+    old_segments = graph_cache.load_segments(dat_file_path, [digest for digest, _ in old_index], cache_dir)
+    if None in old_segments.values():
+        # A segment went missing from the cache; without it the state can't be diffed
+        old_index, old_segments = [], {}
+    changes = {"added": [], "changed": [], "removed": [], "reparsed_blocks": 0,
+               "total_blocks": sum(block_count for _, block_count in old_index)}
+    if old_index and state["fingerprint"] == fingerprint:
+        return _join_segments(old_segments[digest] for digest, _ in old_index), changes
+
+    new_index = []
+    new_segments = {}
+    if stat.st_size:
+        with open(dat_file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = _find_segment_ranges(mm)
+            digests = [hashlib.sha256(mm[start:end]).hexdigest() for start, end in ranges]
+            digest_set = set(digests)
+            # Blocks of the segments that are gone may have only moved, or sit next to an edit
+            reuse = {block["digest"]: block for digest, segment in old_segments.items()
+                     if digest not in digest_set for block in segment}
+            for (start, end), digest in zip(ranges, digests):
+                segment = new_segments.get(digest) or old_segments.get(digest)
+                if segment is None:
+                    segment = clean_scripts(_iter_scripts_from_segments([(mm, start, end)], reuse=reuse))
+                    changes["reparsed_blocks"] += sum(1 for block in segment if block["digest"] not in reuse)
+                new_segments[digest] = segment
+                new_index.append((digest, len(segment)))
+    changes["total_blocks"] = sum(block_count for _, block_count in new_index)
+    graph_cache.store_block_state(dat_file_path, [(digest, block_count, new_segments[digest])
+                                                  for digest, block_count in new_index],
+                                  fingerprint, cache_dir)
+    scripts = _join_segments(new_segments[digest] for digest, _ in new_index)
+
+    # A name's definition can only change in a segment that was added or is gone, unless
+    # the segments that stayed were reordered and a duplicate definition now comes first
+    old_digests = [digest for digest, _ in old_index]
+    new_digests = [digest for digest, _ in new_index]
+    kept = set(old_digests) & set(new_digests)
+    if [digest for digest in old_digests if digest in kept] == [digest for digest in new_digests if digest in kept]:
+        candidates = {script["name"] for digest in set(old_digests) ^ set(new_digests)
+                      for script in old_segments.get(digest) or new_segments[digest]}
+    else:
+        candidates = None
+    old_scripts = {}
+    for digest in old_digests:
+        for script in old_segments[digest]:
+            if (candidates is None or script["name"] in candidates) and script["name"] not in old_scripts:
+                old_scripts[script["name"]] = script
+    for script in scripts:
+        if candidates is None or script["name"] in candidates:
+            old_script = old_scripts.pop(script["name"], None)
+            if old_script is None:
+                changes["added"].append(script["name"])
+            elif old_script["digest"] != script["digest"]:
+                changes["changed"].append(script["name"])
+    changes["removed"] = list(old_scripts)
+    return scripts, changes
+
+def _join_segments(segments):
+    """
+    Joins the cleaned scripts of consecutive segments the way clean_scripts joins blocks:
+    the first definition of a name wins.
+    """
+    seen = set()
+    scripts = []
+    for segment in segments:
+        for script in segment:
+            if script["name"] not in seen:
+                seen.add(script["name"])
+                scripts.append(script)
+    return scripts
+
+def _find_segment_ranges(mm):
+    """
+    Cuts a memory-mapped .dat file into (start, end) ranges of whole blocks for incremental
+    parsing. A cut is made after an 'END GO' line that closes a block whenever a checksum of
+    the bytes following it hits 1 in INCREMENTAL_SEGMENT_BLOCKS.
+    An 'END GO' line closes a block when it is the first one after the last CREATE/DROP
+    PROGRAM line and holds no statement itself; the sequential parser resets all block and
+    header state there. Only the lines whose checksum hits are checked for that, and the
+    search for the last statement stops at the previous such line, so most 'END GO' lines
+    cost one regex match and a checksum.
+    """
+    size = len(mm)
+    boundaries = [0]
+    # Start of the last line checked; any statement before it was closed by that line
+    lower = 0
+    for match in _END_GO_LINE_RE.finditer(mm):
+        line_end = match.end()
+        if zlib.crc32(mm[line_end:line_end + 64]) % INCREMENTAL_SEGMENT_BLOCKS:
+            continue
+        line_start = mm.rfind(b'\n', lower, match.start()) + 1 or lower
+        statement = _rfind_program_statement(mm, lower, line_start)
+        lower = line_start
+        if statement == -1 or _find_program_statement(mm, line_start, line_end) != -1:
+            continue
+        # An 'END GO' on a line after the statement's has closed its block already
+        if mm.find(b'END GO', mm.find(b'\n', statement) + 1, line_start) != -1:
+            continue
+        # Text mode also breaks lines on a bare CR, which the byte searches cannot see
+        region = mm[mm.rfind(b'\n', 0, statement) + 1:line_end]
+        if region.count(b'\r') == region.count(b'\r\n'):
+            boundaries.append(line_end)
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
 def clean_scripts(scripts_list):
     """
     Cleans the scripts data by removing duplicates and invalid entries.
@@ -1,26 +1,35 @@
-import networkx as nx
-from pyvis.network import Network
+import argparse
+import base64
+import filecmp
+import glob
 import json
-from script_data import get_scripts
-
-scripts = get_scripts()
-# Step 2: Preprocess Scripts into a Dictionary
-scripts_dict = {}
-for script in scripts:
-    scripts_dict[script["name"]] = {
-        "da2_jobs": script.get("da2_jobs") or [],
-        "ops_jobs": script.get("ops_jobs") or [],
-        "calls": script.get("calls", [])
-    }
-
-# Convert the scripts dictionary to JSON for JavaScript consumption
-scripts_json = json.dumps(scripts_dict)
-
-# Step 3: Initialize an Empty Network with PyVis
-net = Network(height="750px", width="100%", directed=True, notebook=False)
-#
-# Update network options to enhance visualization
-net.set_options("""
+import operator
+import os
+import sys
+import time
+from array import array
+from itertools import compress
+
+from file_watcher import watch_files
+from graph_analysis import find_cycles, reachable_depths
+from graph_layout import layered_layout
+from page_renderer import asset_tags, render_template
+from pipeline_profile import profile_stage, start_profiling, stop_profiling
+from script_data import PRECEDENCE_RULES, expand_dat_paths, get_scripts, get_scripts_from_files
+from script_graph import ID_TYPECODE, ScriptGraph
+from script_groups import build_script_groups
+from search_index import GRAM_SIZE, build_search_index, gram_file, update_search_index
+
+DEFAULT_OUTPUT_PATH = "script_dependency_graph.html"
+
+# Names per data file when the graph data is written next to the page instead of inline
+DATA_SHARD_SIZE = 2000
+
+# Entries of the search datalist when the page opens
+SUGGESTION_LIMIT = 50
+
+# vis.js options of the network
+NETWORK_OPTIONS = """
 {
     "nodes": {
         "shape": "dot",
@@ -75,16 +84,46 @@ net.set_options("""
         "zoomView": true
     }
 }
-""")
+"""
 
-# Step 4: Save and Read the Initial Empty Network
-net.save_graph("script_dependency_graph.html")
+# Start of the page up to the network: {assets} loads vis-network and {options} holds the
+# network options
+PAGE_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Script Dependency Graph</title>
+    {assets}
+    <style type="text/css">
+        #mynetwork {{
+            width: 100%;
+            height: 750px;
+            background-color: #ffffff;
+            border: 1px solid lightgray;
+            position: relative;
+            float: left;
+        }}
+    </style>
+</head>
+<body>
+<div id="mynetwork"></div>
+<script type="text/javascript">
+    // The network starts empty; the page script adds the selected scripts to its data sets
+    var network = new vis.Network(
+        document.getElementById('mynetwork'),
+        {{nodes: new vis.DataSet([]), edges: new vis.DataSet([])}},
+        {options}
+    );
+</script>
+"""
 
-with open("script_dependency_graph.html", "r", encoding="utf-8") as file:
-    html_content = file.read()
+PAGE_TAIL = """
+</body>
+</html>
+"""
 
-# Step 5: Define Custom HTML and JavaScript for Dynamic Loading
-custom_html = """
+# Custom HTML for dynamic loading; {options} is filled with the initial datalist entries
+CUSTOM_HTML = """
 <!-- Search Box -->
 <div id="searchBox" style="position: fixed; top: 10px; left: 10px; width: 350px; background: white; 
     padding: 10px; border: 1px solid black; border-radius: 5px; font-family: Arial; z-index: 1000;">
@@ -100,6 +139,23 @@ custom_html = """
         {options}
     </datalist>
     <button id="addScriptBtn" style="margin-top: 10px; padding: 5px 10px;">Add Script</button>
+    <label for="depthSelect" style="margin-left: 10px;">Depth:</label>
+    <select id="depthSelect" style="padding: 5px;">
+        <option value="1">1</option>
+        <option value="2" selected>2</option>
+        <option value="3">3</option>
+        <option value="5">5</option>
+        <option value="10">10</option>
+        <option value="0">All</option>
+    </select>
+    <br>
+    <label for="groupSelect">Group long lists by:</label>
+    <select id="groupSelect" style="margin-top: 10px; padding: 5px;">
+        <option value="source" selected>Source</option>
+        <option value="da2">DA2 Job</option>
+        <option value="compiler">Compiler</option>
+        <option value="">Don't group</option>
+    </select>
 </div>
 
 <!-- Selected Nodes List -->
@@ -119,70 +175,761 @@ custom_html = """
 </div>
 """
 
-# Generate datalist options based on script names only
-script_options = "\n".join([f'<option value="{script["name"]}">' for script in scripts])
-custom_html = custom_html.format(options=script_options)
-
-# Correctly escaped custom_js with doubled curly braces and proper scriptId handling
-custom_js = f"""
+# Custom JavaScript, with doubled curly braces so it can go through str.format
+CUSTOM_JS = """
 <script type="text/javascript">
-    // Pre-computed scripts data
+    // Pre-computed scripts data: the jobs of every defined script
     const scriptsData = {scripts_json};
+    // Call graph for the traversal worker (null with sharded data, where every shard holds the
+    // part of its scripts): the node names, scripts first and placeholders after them, the
+    // calls as base64 CSR arrays and the groupings of the scripts
+    const inlineGraphData = {graph_json};
+    // Call cycles (lists of scripts that reach each other) and the cycle each script is in
+    const cyclesData = {cycles_json};
+    const cycleOf = {{}};
+    cyclesData.forEach((cycle, cycleIndex) => cycle.forEach(script => {{ cycleOf[script] = cycleIndex; }}));
+    // Layer and slot of each script from the generator's layered layout; with them, the shown
+    // nodes are placed directly instead of by the physics simulation
+    const precomputedLayout = {precomputed_layout};
+    const nodePositions = {positions_json};
+    const LAYER_SPACING = 150;
+    const NODE_SPACING = 100;
+    // Sharded data files next to the page, or null when all the data is inline
+    const dataFiles = {data_files_json};
+
+    // Data files are JSONP-style scripts calling scriptGraphData, so they also load from file://
+    const dataRequests = {{}};
+    const dataCallbacks = {{}};
+    window.scriptGraphData = function(file, payload) {{
+        dataCallbacks[file](payload);
+    }};
+
+    // Loads a data file once; merge runs with its payload before any caller sees it
+    function loadDataFile(file, merge) {{
+        if (!dataRequests[file]) {{
+            dataRequests[file] = new Promise((resolve, reject) => {{
+                dataCallbacks[file] = payload => {{
+                    if (merge) {{
+                        merge(payload);
+                    }}
+                    resolve(payload);
+                }};
+                const tag = document.createElement('script');
+                tag.src = `${{dataFiles.dir}}/${{file}}`;
+                tag.onerror = () => {{
+                    delete dataRequests[file];
+                    reject(new Error(`Could not load ${{tag.src}}`));
+                }};
+                document.head.appendChild(tag);
+            }});
+        }}
+        return dataRequests[file];
+    }}
 
-    // Keep track of selected nodes and their dependencies
-    let selectedNodes = new Set();
-    let addedNodes = new Set();
-    let addedEdges = new Set();
+    // Shards hold consecutive names in sorted order; find the last one starting at or before name
+    function shardOf(name) {{
+        const starts = dataFiles.shardStarts;
+        let low = 0;
+        let high = starts.length - 1;
+        while (low < high) {{
+            const middle = (low + high + 1) >> 1;
+            if (starts[middle] <= name) {{
+                low = middle;
+            }} else {{
+                high = middle - 1;
+            }}
+        }}
+        return low;
+    }}
 
-    // Function to create node info HTML
-    function createNodeInfoHTML(nodeId, directCalls, calledBy, indirectCalls, indirectCalledBy) {{
-        // Helper function to get node attributes
-        function getNodeJobs(nodeId) {{
-            const script = scriptsData[nodeId];
-            return {{
-                da2_jobs: script.da2_jobs || [],
-                ops_jobs: script.ops_jobs || []
+    // The names and group ids of the loaded shards, by shard number
+    const shardScripts = [];
+
+    // Takes in a shard; its calls and callers go to the traversal worker
+    function mergeShard(payload) {{
+        payload.names.forEach((name, i) => {{ scriptsData[name] = payload.scripts[i]; }});
+        Object.assign(cycleOf, payload.cycleOf);
+        Object.assign(nodePositions, payload.positions);
+        const index = shardOf(payload.names[0]);
+        const groups = {{}};
+        Object.keys(payload.groups).forEach(grouping => {{ groups[grouping] = decodeIds(payload.groups[grouping]); }});
+        shardScripts[index] = {{names: payload.names, groups}};
+        const adjacency = {{type: 'shard', index}};
+        ['calls', 'callers'].forEach(list => {{
+            adjacency[list] = {{
+                offsets: decodeIds(payload[list].offsets).buffer,
+                targets: decodeIds(payload[list].targets).buffer
             }};
+        }});
+        getGraphWorker().postMessage(adjacency, [adjacency.calls.offsets, adjacency.calls.targets,
+                                                 adjacency.callers.offsets, adjacency.callers.targets]);
+    }}
+
+    // Loads the shard of a script number
+    function loadShard(index) {{
+        return loadDataFile(dataFiles.shardFiles[index], mergeShard);
+    }}
+
+    // Loads the shards holding the given scripts
+    function loadScripts(names) {{
+        if (!dataFiles) {{
+            return Promise.resolve();
         }}
+        const shards = new Set();
+        names.forEach(name => shards.add(shardOf(name)));
+        return Promise.all(Array.from(shards, loadShard));
+    }}
 
-        // Helper function to create jobs HTML
-        function createJobsHTML(jobs) {{
-            let da2_jobs = jobs.da2_jobs || [];
-            let ops_jobs = jobs.ops_jobs || [];
-            
-            if (da2_jobs.length === 0 && ops_jobs.length === 0) return '';
-            return `
-                <div style="margin-left: 20px; font-size: 0.9em; color: #666;">
-                    ${{jobs.da2_jobs.length > 0 ? `
-                        <div>DA2 Jobs:</div>
-                        <ul style="margin: 2px 0 5px 20px; padding: 0;">
-                            ${{jobs.da2_jobs.map(job => `<li>${{job}}</li>`).join('')}}
-                        </ul>
-                    ` : ''}}
-                    ${{jobs.ops_jobs.length > 0 ? `
-                        <div>OPS Jobs:</div>
-                        <ul style="margin: 2px 0 5px 20px; padding: 0;">
-                            ${{jobs.ops_jobs.map(job => `<li>${{job}}</li>`).join('')}}
-                        </ul>
-                    ` : ''}}
-                </div>
-            `;
-        }}
-
-        // Filter out placeholder scripts from each list
-        const filteredDirectCalls = Array.from(directCalls).filter(script => 
-            scriptsData[script] && !scriptsData[script].isPlaceholder
-        );
-        const filteredCalledBy = Array.from(calledBy).filter(script => 
-            scriptsData[script] && !scriptsData[script].isPlaceholder
-        );
-        const filteredIndirectCalls = Array.from(indirectCalls).filter(script => 
-            scriptsData[script] && !scriptsData[script].isPlaceholder
-        );
-        const filteredIndirectCalledBy = Array.from(indirectCalledBy).filter(script => 
-            scriptsData[script] && !scriptsData[script].isPlaceholder
-        );
+    // Gets the dependencies of a script; with sharded data getDependencies has loaded the
+    // shards of every script in them, and this loads the group names if a list is long enough
+    // to be grouped and the cycle lists if one of the scripts is in a cycle
+    function loadDependencies(scriptId) {{
+        return getDependencies(scriptId).then(dependencies => {{
+            if (!dataFiles) {{
+                return dependencies;
+            }}
+            const loads = [];
+            if (Object.keys(NEIGHBOUR_LISTS).some(list => dependencies[list].length > CLUSTER_THRESHOLD)) {{
+                loads.push(loadDataFile(dataFiles.groupsFile, payload => {{ groupNames = payload; }}));
+            }}
+            if (dataFiles.cyclesFile && Object.keys(cycleOf).length > 0) {{
+                loads.push(loadDataFile(dataFiles.cyclesFile, payload => {{ cyclesData.push(...payload); }}));
+            }}
+            return Promise.all(loads).then(() => dependencies);
+        }});
+    }}
+
+    // Pre-built search index of script, DA2 and OPS job names as JSON text, parsed by the
+    // worker (null with sharded data, where it is in pieces)
+    const inlineSearchIndex = {search_index_json};
+    // Suggestions shown while typing, and the pause in typing before they are looked up
+    const SUGGESTION_LIMIT = {suggestion_limit};
+    const SUGGESTION_DELAY_MS = 150;
+
+    // Graph queries run in a Web Worker made from this function's source, so long traversals
+    // and searches don't freeze the page; it can't use anything from outside of it. Requests
+    // are answered in the order they arrive, as {{id, result}}, with id arrays transferred
+    // rather than copied.
+    function graphWorker(scope) {{
+        const GRAM_SIZE = 3;
+        let names = null;
+        let nameIds = null;
+        let scriptCount = 0;
+        // Calls and callers as CSR arrays over shards of shardSize nodes, by shard number: one
+        // shard of every node when the graph came whole, else the shards the page has sent,
+        // numbered within their shard and pointing at script numbers
+        let shardSize = 0;
+        const callShards = [];
+        const callerShards = [];
+        // The condensation of a whole graph: the component of every node, the members of
+        // every component and the DAG between components, both ways
+        let componentOf = null;
+        let componentMembers = null;
+        let componentDag = null;
+        let reversedComponentDag = null;
+        let componentMarks = null;
+        let search = {{}};
+        // Nodes seen by a walk are marked with its number, so the marks never need clearing
+        let seenMarks = null;
+        let walkNumber = 0;
+
+        // Transposes a CSR adjacency with a counting sort, so neighbours keep the order of their ids
+        function reverse(adjacency) {{
+            const nodeCount = adjacency.offsets.length - 1;
+            const offsets = new Int32Array(nodeCount + 1);
+            adjacency.targets.forEach(target => {{ offsets[target + 1]++; }});
+            for (let node = 0; node < nodeCount; node++) {{
+                offsets[node + 1] += offsets[node];
+            }}
+            const next = offsets.slice(0, nodeCount);
+            const targets = new Int32Array(adjacency.targets.length);
+            for (let source = 0; source < nodeCount; source++) {{
+                for (let edge = adjacency.offsets[source]; edge < adjacency.offsets[source + 1]; edge++) {{
+                    targets[next[adjacency.targets[edge]]++] = source;
+                }}
+            }}
+            return {{offsets, targets}};
+        }}
+
+        // Breadth-first walk from source over shards: scripts at depth 1 are direct, deeper
+        // ones indirect. Placeholders are walked through but left out, since the page never
+        // shows them. The numbers of shards the walk reaches but doesn't have go into missing
+        function traverse(shards, source, maxDepth, missing) {{
+            const direct = [];
+            const indirect = [];
+            walkNumber++;
+            seenMarks[source] = walkNumber;
+            let frontier = [source];
+            for (let depth = 1; frontier.length > 0 && (maxDepth === 0 || depth <= maxDepth); depth++) {{
+                const nextFrontier = [];
+                frontier.forEach(current => {{
+                    const shard = Math.floor(current / shardSize);
+                    const adjacency = shards[shard];
+                    if (!adjacency) {{
+                        missing.add(shard);
+                        return;
+                    }}
+                    const local = current - shard * shardSize;
+                    for (let edge = adjacency.offsets[local]; edge < adjacency.offsets[local + 1]; edge++) {{
+                        const neighbour = adjacency.targets[edge];
+                        if (seenMarks[neighbour] !== walkNumber) {{
+                            seenMarks[neighbour] = walkNumber;
+                            if (neighbour < scriptCount) {{
+                                (depth === 1 ? direct : indirect).push(neighbour);
+                            }}
+                            nextFrontier.push(neighbour);
+                        }}
+                    }}
+                }});
+                frontier = nextFrontier;
+            }}
+            return [Int32Array.from(direct), Int32Array.from(indirect)];
+        }}
+
+        // Every script reachable from source with no depth limit, like traverse's walk but over
+        // the DAG of components (callers over the reversed DAG): the members of every component
+        // reached, and those of source's own when it is in a cycle. Only the direct neighbours
+        // are looked up in the calls themselves
+        function traverseCone(shards, dag, source) {{
+            const direct = [];
+            const indirect = [];
+            walkNumber++;
+            seenMarks[source] = walkNumber;
+            const calls = shards[0];
+            for (let edge = calls.offsets[source]; edge < calls.offsets[source + 1]; edge++) {{
+                const neighbour = calls.targets[edge];
+                if (seenMarks[neighbour] !== walkNumber) {{
+                    seenMarks[neighbour] = walkNumber;
+                    if (neighbour < scriptCount) {{
+                        direct.push(neighbour);
+                    }}
+                }}
+            }}
+            const start = componentOf[source];
+            componentMarks[start] = walkNumber;
+            const components = [start];
+            for (let i = 0; i < components.length; i++) {{
+                const component = components[i];
+                for (let edge = dag.offsets[component]; edge < dag.offsets[component + 1]; edge++) {{
+                    const target = dag.targets[edge];
+                    if (componentMarks[target] !== walkNumber) {{
+                        componentMarks[target] = walkNumber;
+                        components.push(target);
+                    }}
+                }}
+            }}
+            components.forEach(component => {{
+                for (let edge = componentMembers.offsets[component]; edge < componentMembers.offsets[component + 1]; edge++) {{
+                    const member = componentMembers.targets[edge];
+                    if (seenMarks[member] !== walkNumber) {{
+                        seenMarks[member] = walkNumber;
+                        if (member < scriptCount) {{
+                            indirect.push(member);
+                        }}
+                    }}
+                }}
+            }});
+            return [Int32Array.from(direct), Int32Array.from(indirect)];
+        }}
+
+        // Ids of the keys containing a gram, decoding its delta-encoded list on first use
+        function gramPostings(index, gram) {{
+            const ids = index.grams[gram];
+            if (ids && !index.decodedGrams.has(gram)) {{
+                for (let i = 1; i < ids.length; i++) {{
+                    ids[i] += ids[i - 1];
+                }}
+                index.decodedGrams.add(gram);
+            }}
+            return ids;
+        }}
+
+        // Ids of the keys containing needle (already lowercase), in key order, at most limit of them
+        function matchKeys(index, needle, limit) {{
+            const keys = index.lowerKeys;
+            const matches = [];
+            if (needle.length < GRAM_SIZE) {{
+                for (let id = 0; id < keys.length && matches.length < limit; id++) {{
+                    if (keys[id].includes(needle)) {{
+                        matches.push(id);
+                    }}
+                }}
+                return matches;
+            }}
+            // Only the keys sharing the needle's rarest gram can contain it
+            let candidates = null;
+            for (let i = 0; i + GRAM_SIZE <= needle.length; i++) {{
+                const ids = gramPostings(index, needle.substr(i, GRAM_SIZE));
+                if (!ids) {{
+                    return matches;
+                }}
+                if (!candidates || ids.length < candidates.length) {{
+                    candidates = ids;
+                }}
+            }}
+            for (let i = 0; i < candidates.length && matches.length < limit; i++) {{
+                if (keys[candidates[i]].includes(needle)) {{
+                    matches.push(candidates[i]);
+                }}
+            }}
+            return matches;
+        }}
+
+        // Up to limit key ids for typeahead: keys starting with needle first, then other matches
+        function suggestKeys(index, needle, limit) {{
+            const keys = index.lowerKeys;
+            let low = 0;
+            let high = keys.length;
+            while (low < high) {{
+                const middle = (low + high) >> 1;
+                if (keys[middle] < needle) {{
+                    low = middle + 1;
+                }} else {{
+                    high = middle;
+                }}
+            }}
+            const suggestions = [];
+            for (let id = low; id < keys.length && suggestions.length < limit && keys[id].startsWith(needle); id++) {{
+                suggestions.push(id);
+            }}
+            if (suggestions.length < limit) {{
+                const prefixMatches = new Set(suggestions);
+                matchKeys(index, needle, limit + suggestions.length).forEach(id => {{
+                    if (suggestions.length < limit && !prefixMatches.has(id)) {{
+                        suggestions.push(id);
+                    }}
+                }});
+            }}
+            return suggestions;
+        }}
+
+        const handlers = {{
+            // The call graph, whose callers are derived here instead of being shipped; or with
+            // sharded data, the script count and shard size, the shards coming separately
+            graph(request) {{
+                scriptCount = request.scriptCount;
+                if (request.names === undefined) {{
+                    shardSize = request.shardSize;
+                    seenMarks = new Int32Array(scriptCount);
+                    return;
+                }}
+                names = request.names.split('\\n');
+                nameIds = new Map(names.map((name, node) => [name, node]));
+                shardSize = Math.max(names.length, 1);
+                callShards[0] = {{offsets: new Int32Array(request.callOffsets), targets: new Int32Array(request.callTargets)}};
+                callerShards[0] = reverse(callShards[0]);
+                seenMarks = new Int32Array(names.length);
+                componentOf = new Int32Array(request.componentOf);
+                componentDag = {{offsets: new Int32Array(request.dagOffsets), targets: new Int32Array(request.dagTargets)}};
+                reversedComponentDag = reverse(componentDag);
+                // The members of each component, as the reverse of the node to component mapping
+                componentMembers = reverse({{offsets: Int32Array.from({{length: names.length + 1}}, (_, node) => node),
+                                            targets: componentOf}});
+                componentMarks = new Int32Array(componentDag.offsets.length - 1);
+            }},
+            shard(request) {{
+                callShards[request.index] = {{
+                    offsets: new Int32Array(request.calls.offsets), targets: new Int32Array(request.calls.targets)
+                }};
+                callerShards[request.index] = {{
+                    offsets: new Int32Array(request.callers.offsets), targets: new Int32Array(request.callers.targets)
+                }};
+            }},
+            search(request) {{
+                search = JSON.parse(request.index);
+                Object.keys(search).forEach(searchType => {{
+                    const index = search[searchType];
+                    index.lowerKeys = index.keys.map(key => key.toLowerCase());
+                    index.decodedGrams = new Set();
+                }});
+            }},
+            // A piece of a sharded search index: the keys of a namespace, postings of some of
+            // its grams or the scripts of a shard of its keys
+            searchPart(request) {{
+                if (!search[request.searchType]) {{
+                    search[request.searchType] = {{
+                        grams: {{}}, decodedGrams: new Set(), shardSize: request.shardSize,
+                        scriptShards: request.hasScripts ? [] : null
+                    }};
+                }}
+                const index = search[request.searchType];
+                const data = JSON.parse(request.data);
+                if (request.part === 'keys') {{
+                    index.keys = data;
+                    index.lowerKeys = data.map(key => key.toLowerCase());
+                }} else if (request.part === 'grams') {{
+                    Object.assign(index.grams, data);
+                }} else {{
+                    index.scriptShards[request.shard] = data;
+                }}
+            }},
+            // Node ids of the scripts a script calls and is called by within depth calls, from
+            // its name, or its number with sharded data; or the shards the walks still need
+            dependencies(request) {{
+                const node = request.node !== undefined ? request.node : nameIds.get(request.name);
+                if (node === undefined || node === -1) {{
+                    const none = () => new Int32Array(0);
+                    return {{directCalls: none(), calledBy: none(), indirectCalls: none(), indirectCalledBy: none()}};
+                }}
+                if (request.depth === 0 && componentOf) {{
+                    const [directCalls, indirectCalls] = traverseCone(callShards, componentDag, node);
+                    const [calledBy, indirectCalledBy] = traverseCone(callerShards, reversedComponentDag, node);
+                    return {{directCalls, calledBy, indirectCalls, indirectCalledBy}};
+                }}
+                const missing = new Set();
+                const [directCalls, indirectCalls] = traverse(callShards, node, request.depth, missing);
+                const [calledBy, indirectCalledBy] = traverse(callerShards, node, request.depth, missing);
+                if (missing.size > 0) {{
+                    return {{missingShards: Array.from(missing)}};
+                }}
+                return {{directCalls, calledBy, indirectCalls, indirectCalledBy}};
+            }},
+            // Every script whose name, or one of whose DA2 or OPS jobs, contains the needle; or
+            // with a sharded index, the shards of job scripts the matches still need
+            match(request) {{
+                const index = search[request.searchType];
+                const ids = matchKeys(index, request.needle, Infinity);
+                if (index.scriptShards) {{
+                    const missing = new Set();
+                    ids.forEach(id => {{
+                        const shard = Math.floor(id / index.shardSize);
+                        if (!index.scriptShards[shard]) {{
+                            missing.add(shard);
+                        }}
+                    }});
+                    if (missing.size > 0) {{
+                        return {{missingShards: Array.from(missing)}};
+                    }}
+                }}
+                const scripts = new Set();
+                ids.forEach(id => {{
+                    if (index.scriptShards) {{
+                        index.scriptShards[Math.floor(id / index.shardSize)][id % index.shardSize].forEach(scriptName => scripts.add(scriptName));
+                    }} else if (index.scripts) {{
+                        index.scripts[id].forEach(scriptName => scripts.add(scriptName));
+                    }} else {{
+                        scripts.add(index.keys[id]);
+                    }}
+                }});
+                return Array.from(scripts);
+            }},
+            suggest(request) {{
+                const index = search[request.searchType];
+                return suggestKeys(index, request.needle, request.limit).map(id => index.keys[id]);
+            }}
+        }};
+
+        scope.onmessage = function(event) {{
+            const request = event.data;
+            let result;
+            try {{
+                result = handlers[request.type](request);
+            }} catch (error) {{
+                scope.postMessage({{id: request.id, error: error.message}});
+                return;
+            }}
+            if (request.id !== undefined) {{
+                const buffers = result ? Object.values(result).filter(ArrayBuffer.isView).map(ids => ids.buffer) : [];
+                scope.postMessage({{id: request.id, result}}, buffers);
+            }}
+        }};
+    }}
+
+    // Starts graphWorker in a worker from a blob: URL, which also works from file://; where
+    // workers aren't available it runs on the page instead, behind the same message interface
+    function createGraphWorker() {{
+        try {{
+            const source = `(${{graphWorker.toString()}})(self);`;
+            return new Worker(URL.createObjectURL(new Blob([source], {{type: 'text/javascript'}})));
+        }} catch (error) {{
+            console.log(`Running graph queries on the page: ${{error.message}}`);
+            const page = {{onmessage: null, onerror: null}};
+            const scope = {{onmessage: null}};
+            page.postMessage = data => setTimeout(() => scope.onmessage({{data}}), 0);
+            scope.postMessage = data => setTimeout(() => page.onmessage({{data}}), 0);
+            graphWorker(scope);
+            return page;
+        }}
+    }}
+
+    let graphWorkerPort = null;
+    const workerReplies = new Map();
+    let nextRequestId = 0;
+
+    function getGraphWorker() {{
+        if (!graphWorkerPort) {{
+            graphWorkerPort = createGraphWorker();
+            graphWorkerPort.onmessage = function(event) {{
+                const reply = event.data;
+                const pending = workerReplies.get(reply.id);
+                workerReplies.delete(reply.id);
+                if (reply.error) {{
+                    pending.reject(new Error(reply.error));
+                }} else {{
+                    pending.resolve(reply.result);
+                }}
+            }};
+            graphWorkerPort.onerror = function(event) {{
+                workerReplies.forEach(pending => pending.reject(new Error(`The graph worker failed: ${{event.message}}`)));
+                workerReplies.clear();
+            }};
+        }}
+        return graphWorkerPort;
+    }}
+
+    // Sends a request to the worker once the data it needs (the ready promise) has been sent
+    function askGraphWorker(request, ready) {{
+        return ready.then(() => new Promise((resolve, reject) => {{
+            request.id = nextRequestId++;
+            workerReplies.set(request.id, {{resolve, reject}});
+            getGraphWorker().postMessage(request);
+        }}));
+    }}
+
+    // Asks the worker again each time it answers with the shards it is missing, once
+    // loadShard has sent them
+    function askGraphWorkerLoading(request, ready, loadShard) {{
+        return askGraphWorker(request, ready).then(reply => {{
+            if (!reply || !reply.missingShards) {{
+                return reply;
+            }}
+            return Promise.all(reply.missingShards.map(loadShard))
+                .then(() => askGraphWorkerLoading(request, Promise.resolve(), loadShard));
+        }});
+    }}
+
+    // Decodes base64 into the Int32Array it encodes (little-endian, like the browsers' own)
+    function decodeIds(base64) {{
+        const bytes = atob(base64);
+        const ids = new Int32Array(bytes.length / 4);
+        const view = new Uint8Array(ids.buffer);
+        for (let i = 0; i < bytes.length; i++) {{
+            view[i] = bytes.charCodeAt(i);
+        }}
+        return ids;
+    }}
+
+    // Node names, to turn the ids the worker answers with back into scripts, when the graph
+    // is inline; sharded data has them in shardScripts
+    let graphNames = null;
+    // Precomputed groupings of the scripts: the group names of each grouping, and with an
+    // inline graph the group id of every script
+    let groupNames = null;
+    let groupIds = null;
+    let graphSent = null;
+
+    // Hands the call graph to the worker: the inline graph, or the script count and shard size
+    // of sharded data, whose shards mergeShard sends as they load
+    function sendGraph() {{
+        if (!graphSent) {{
+            if (dataFiles) {{
+                getGraphWorker().postMessage({{type: 'graph', scriptCount: dataFiles.scriptCount, shardSize: dataFiles.shardSize}});
+                graphSent = Promise.resolve();
+                return graphSent;
+            }}
+            const graph = inlineGraphData;
+            graphNames = graph.names.split('\\n');
+            groupNames = {{}};
+            groupIds = {{}};
+            Object.keys(graph.groups).forEach(grouping => {{
+                groupNames[grouping] = graph.groups[grouping].names;
+                groupIds[grouping] = decodeIds(graph.groups[grouping].of);
+            }});
+            const buffers = {{}};
+            ['callOffsets', 'callTargets', 'componentOf', 'dagOffsets', 'dagTargets'].forEach(array => {{
+                buffers[array] = decodeIds(graph[array]).buffer;
+            }});
+            getGraphWorker().postMessage({{
+                type: 'graph',
+                names: graph.names,
+                scriptCount: graph.scriptCount,
+                ...buffers
+            }}, Object.values(buffers));
+            graphSent = Promise.resolve();
+        }}
+        return graphSent;
+    }}
+
+    // Name of a node id the worker answered with
+    function nodeName(node) {{
+        if (!dataFiles) {{
+            return graphNames[node];
+        }}
+        return shardScripts[Math.floor(node / dataFiles.shardSize)].names[node % dataFiles.shardSize];
+    }}
+
+    // Group id of a node id in a grouping
+    function nodeGroup(grouping, node) {{
+        if (!dataFiles) {{
+            return groupIds[grouping][node];
+        }}
+        return shardScripts[Math.floor(node / dataFiles.shardSize)].groups[grouping][node % dataFiles.shardSize];
+    }}
+
+    // Promise of the number of a script with sharded data, loading its shard; -1 if there is none
+    function findNode(name) {{
+        return loadScripts([name]).then(() => {{
+            const shard = shardOf(name);
+            const position = shardScripts[shard].names.indexOf(name);
+            return position === -1 ? -1 : shard * dataFiles.shardSize + position;
+        }});
+    }}
+
+    // Loads the shards of every node id in the lists of ids
+    function loadNodes(ids) {{
+        if (!dataFiles) {{
+            return Promise.resolve(ids);
+        }}
+        const shards = new Set();
+        Object.values(ids).forEach(nodes => nodes.forEach(node => shards.add(Math.floor(node / dataFiles.shardSize))));
+        return Promise.all(Array.from(shards, loadShard)).then(() => ids);
+    }}
+
+    let searchSent = null;
+
+    // Hands the search index to the worker. An inline index goes whole; of a sharded one, the
+    // keys of the searched namespace and the postings of the needle's grams are sent, each
+    // file once, and a match asks for the scripts of job keys as it needs them
+    function sendSearchIndex(searchType, needle) {{
+        if (!dataFiles) {{
+            if (!searchSent) {{
+                getGraphWorker().postMessage({{type: 'search', index: inlineSearchIndex}});
+                searchSent = Promise.resolve();
+            }}
+            return searchSent;
+        }}
+        const files = dataFiles.search[searchType];
+        const loads = [sendSearchPart(searchType, 'keys', files.keys)];
+        for (let i = 0; i + dataFiles.gramSize <= needle.length; i++) {{
+            const gram = needle.substr(i, dataFiles.gramSize);
+            loads.push(sendSearchPart(searchType, 'grams', files.grams[gramFile(gram, files.grams.length)]));
+        }}
+        return Promise.all(loads);
+    }}
+
+    // Loads a file of a sharded search index and sends it to the worker
+    function sendSearchPart(searchType, part, file, shard) {{
+        return loadDataFile(file, payload => {{
+            getGraphWorker().postMessage({{
+                type: 'searchPart', searchType, part, shard, data: payload,
+                shardSize: dataFiles.shardSize, hasScripts: dataFiles.search[searchType].scripts !== null
+            }});
+        }});
+    }}
+
+    // Which of count files holds the postings of a gram, hashed like search_index.gram_file
+    function gramFile(gram, count) {{
+        let hash = 0;
+        for (let i = 0; i < gram.length; i++) {{
+            hash = (Math.imul(hash, 31) + gram.charCodeAt(i)) >>> 0;
+        }}
+        return hash % count;
+    }}
+
+    // Asks the worker a search request, sending it the parts of the index it needs first
+    function askSearch(request) {{
+        const ready = sendSearchIndex(request.searchType, request.needle);
+        return askGraphWorkerLoading(request, ready, shard => {{
+            const files = dataFiles.search[request.searchType];
+            return sendSearchPart(request.searchType, 'scripts', files.scripts[shard], shard);
+        }});
+    }}
+
+    // Keep track of selected nodes and their dependencies
+    let selectedNodes = new Set();
+    // Reference counts of the shown nodes and edges: how many times selections added each one
+    const nodeRefs = new Map();
+    const edgeRefs = new Map();
+    // The node and edge ids each selection added, to take back when it is removed, its
+    // dependencies and its group nodes
+    const selectionItems = new Map();
+
+    // Neighbour lists longer than this are shown as one node per group of scripts, at most this
+    // many; clicking a group node shows this many more of its scripts
+    const CLUSTER_THRESHOLD = 30;
+    // Grouping of long neighbour lists, a key of groupNames; empty shows every script
+    let groupBy = 'source';
+    // The group nodes on the network and the scripts they still stand for, by node id
+    const groupNodes = new Map();
+    // How each neighbour list of a selection is drawn
+    const NEIGHBOUR_LISTS = {{
+        directCalls: {{color: '#FF0000', calls: true}},
+        indirectCalls: {{color: '#FFA500', calls: true}},
+        calledBy: {{color: '#FF0000', calls: false}},
+        indirectCalledBy: {{color: '#FFA500', calls: false}}
+    }};
+
+    // Lists in the info box show this many scripts at first, and this many more per click
+    const INFO_LIST_PAGE_SIZE = 50;
+
+    // Helper function to get node attributes
+    function getNodeJobs(nodeId) {{
+        const script = scriptsData[nodeId];
+        return {{
+            da2_jobs: script.da2_jobs || [],
+            ops_jobs: script.ops_jobs || []
+        }};
+    }}
+
+    // Helper function to create jobs HTML
+    function createJobsHTML(jobs) {{
+        let da2_jobs = jobs.da2_jobs || [];
+        let ops_jobs = jobs.ops_jobs || [];
+        
+        if (da2_jobs.length === 0 && ops_jobs.length === 0) return '';
+        return `
+            <div style="margin-left: 20px; font-size: 0.9em; color: #666;">
+                ${{jobs.da2_jobs.length > 0 ? `
+                    <div>DA2 Jobs:</div>
+                    <ul style="margin: 2px 0 5px 20px; padding: 0;">
+                        ${{jobs.da2_jobs.map(job => `<li>${{job}}</li>`).join('')}}
+                    </ul>
+                ` : ''}}
+                ${{jobs.ops_jobs.length > 0 ? `
+                    <div>OPS Jobs:</div>
+                    <ul style="margin: 2px 0 5px 20px; padding: 0;">
+                        ${{jobs.ops_jobs.map(job => `<li>${{job}}</li>`).join('')}}
+                    </ul>
+                ` : ''}}
+            </div>
+        `;
+    }}
+
+    // The lists of the info box for a selected script: its dependencies, which come without
+    // placeholders
+    function getInfoLists(nodeId) {{
+        return selectionItems.get(nodeId).dependencies;
+    }}
+
+    // List items for scripts, with their jobs
+    function createScriptItemsHTML(nodes) {{
+        return nodes.map(node => `
+            <li>
+                ${{node}}
+                ${{createJobsHTML(getNodeJobs(node))}}
+            </li>
+        `).join('');
+    }}
 
+    // One list of the info box: the first page of scripts, and a button for the next ones
+    function createInfoListHTML(nodeId, listName) {{
+        const nodes = getInfoLists(nodeId)[listName];
+        const shown = Math.min(nodes.length, INFO_LIST_PAGE_SIZE);
+        return `
+            <ul style="list-style-type: none; padding-left: 10px; margin-top: 5px;">
+                ${{createScriptItemsHTML(nodes.slice(0, shown))}}
+            </ul>
+            ${{shown < nodes.length ? createMoreButtonHTML(nodeId, listName, shown, nodes.length) : ''}}
+        `;
+    }}
+
+    function createMoreButtonHTML(nodeId, listName, shown, total) {{
+        return `<button data-script="${{nodeId}}" data-list="${{listName}}" data-shown="${{shown}}"
+                    style="margin-left: 10px; padding: 2px 5px; cursor: pointer;">Show more (${{total - shown}} left)</button>`;
+    }}
+
+    // Function to create node info HTML
+    function createNodeInfoHTML(nodeId) {{
         // Get jobs for selected node
         const selectedNodeJobs = getNodeJobs(nodeId);
 
@@ -190,156 +937,367 @@ custom_js = f"""
             <div style="margin-bottom: 20px; padding: 10px; border: 1px solid #ccc; border-radius: 5px;">
                 <h4 style="margin-top: 0;">Selected: ${{nodeId}}</h4>
                 ${{createJobsHTML(selectedNodeJobs)}}
+                ${{cycleOf[nodeId] !== undefined ? `
+                    <div style="color: #8E44AD; margin-top: 10px;">
+                        Part of a call cycle of ${{cyclesData[cycleOf[nodeId]].length}} script(s):
+                        ${{cyclesData[cycleOf[nodeId]].join(', ')}}
+                    </div>
+                ` : ''}}
                 
                 <div style="color: #FF0000; font-weight: bold; margin-top: 10px;">Directly Calls:</div>
-                <ul style="list-style-type: none; padding-left: 10px; margin-top: 5px;">
-                    ${{filteredDirectCalls.map(node => `
-                        <li>
-                            ${{node}}
-                            ${{createJobsHTML(getNodeJobs(node))}}
-                        </li>
-                    `).join('')}}
-                </ul>
+                ${{createInfoListHTML(nodeId, 'directCalls')}}
                 
                 <div style="color: #FF0000; font-weight: bold; margin-top: 10px;">Called By:</div>
-                <ul style="list-style-type: none; padding-left: 10px; margin-top: 5px;">
-                    ${{filteredCalledBy.map(node => `
-                        <li>
-                            ${{node}}
-                            ${{createJobsHTML(getNodeJobs(node))}}
-                        </li>
-                    `).join('')}}
-                </ul>
+                ${{createInfoListHTML(nodeId, 'calledBy')}}
                 
                 <div style="color: #FFA500; font-weight: bold; margin-top: 10px;">Indirectly Calls:</div>
-                <ul style="list-style-type: none; padding-left: 10px; margin-top: 5px;">
-                    ${{filteredIndirectCalls.map(node => `
-                        <li>
-                            ${{node}}
-                            ${{createJobsHTML(getNodeJobs(node))}}
-                        </li>
-                    `).join('')}}
-                </ul>
+                ${{createInfoListHTML(nodeId, 'indirectCalls')}}
                 
                 <div style="color: #FFA500; font-weight: bold; margin-top: 10px;">Indirectly Called By:</div>
-                <ul style="list-style-type: none; padding-left: 10px; margin-top: 5px;">
-                    ${{filteredIndirectCalledBy.map(node => `
-                        <li>
-                            ${{node}}
-                            ${{createJobsHTML(getNodeJobs(node))}}
-                        </li>
-                    `).join('')}}
-                </ul>
+                ${{createInfoListHTML(nodeId, 'indirectCalledBy')}}
             </div>
         `;
     }}
 
-    // Function to get dependencies with placeholder handling
+    // How many calls getDependencies follows from a script; 0 follows the whole cone
+    let traversalDepth = 2;
+
+    // Dependencies asked of the worker so far, by depth and script; the graph data never
+    // changes, so an entry stays valid until it is the oldest one in a full cache
+    const DEPENDENCY_CACHE_SIZE = 1000;
+    const dependencyCache = new Map();
+
+    // Promise of the scripts a script calls and is called by, directly and indirectly, within
+    // the traversal depth, from the worker and memoized
     function getDependencies(scriptId) {{
-        let directCalls = new Set();
-        let calledBy = new Set();
-        let indirectCalls = new Set();
-        let indirectCalledBy = new Set();
+        const key = `${{traversalDepth}}:${{scriptId}}`;
+        let dependencies = dependencyCache.get(key);
+        if (!dependencies) {{
+            const request = {{type: 'dependencies', name: scriptId, depth: traversalDepth}};
+            const node = dataFiles ? findNode(scriptId) : Promise.resolve(undefined);
+            dependencies = node.then(node => {{
+                request.node = node;
+                return askGraphWorkerLoading(request, sendGraph(), loadShard);
+            }}).then(loadNodes).then(ids => {{
+                const toNames = nodes => Array.from(nodes, nodeName);
+                return {{
+                    directCalls: toNames(ids.directCalls),
+                    calledBy: toNames(ids.calledBy),
+                    indirectCalls: toNames(ids.indirectCalls),
+                    indirectCalledBy: toNames(ids.indirectCalledBy),
+                    nodeIds: ids
+                }};
+            }}, error => {{
+                dependencyCache.delete(key);
+                throw error;
+            }});
+            if (dependencyCache.size >= DEPENDENCY_CACHE_SIZE) {{
+                dependencyCache.delete(dependencyCache.keys().next().value);
+            }}
+            dependencyCache.set(key, dependencies);
+        }}
+        return dependencies;
+    }}
 
-        // Ensure the script exists in scriptsData
-        if (!scriptsData[scriptId]) {{
-            console.log(`Creating placeholder for undefined script: ${{scriptId}}`);
-            scriptsData[scriptId] = {{
-                da2_jobs: [],
-                ops_jobs: [],
-                calls: [],
-                isPlaceholder: true
-            }};
+    // Node and edge changes of the current user action, handed to vis.js in one update each
+    let batchDepth = 0;
+    const pendingNodes = new Map();
+    const pendingEdges = new Map();
+    let infoBoxStale = false;
+    // Nodes and edges no selection shows any more, taken off the network when the batch ends
+    const pendingNodeRemovals = new Set();
+    const pendingEdgeRemovals = new Set();
+
+    // Starts collecting changes; physics stays paused until the outermost batch ends
+    function beginBatch() {{
+        if (batchDepth++ === 0 && !precomputedLayout) {{
+            network.setOptions({{physics: {{enabled: false}}}});
         }}
+    }}
 
-        // Directly Calls
-        scriptsData[scriptId].calls.forEach(calledScript => {{
-            // Create placeholder if needed
-            if (!scriptsData[calledScript]) {{
-                console.log(`Creating placeholder for undefined direct call: ${{calledScript}}`);
-                scriptsData[calledScript] = {{
-                    da2_jobs: [],
-                    ops_jobs: [],
-                    calls: [],
-                    isPlaceholder: true
-                }};
+    // Applies the collected removals and changes, refreshes the info box and lets the layout settle
+    function endBatch() {{
+        if (--batchDepth > 0) {{
+            return;
+        }}
+        if (pendingNodeRemovals.size > 0) {{
+            network.body.data.nodes.remove(Array.from(pendingNodeRemovals));
+            pendingNodeRemovals.forEach(nodeId => pendingNodes.delete(nodeId));
+            pendingNodeRemovals.clear();
+        }}
+        if (pendingEdgeRemovals.size > 0) {{
+            network.body.data.edges.remove(Array.from(pendingEdgeRemovals));
+            pendingEdgeRemovals.forEach(edgeId => pendingEdges.delete(edgeId));
+            pendingEdgeRemovals.clear();
+        }}
+        if (pendingNodes.size > 0) {{
+            network.body.data.nodes.update(Array.from(pendingNodes.values()));
+            pendingNodes.clear();
+        }}
+        if (pendingEdges.size > 0) {{
+            network.body.data.edges.update(Array.from(pendingEdges.values()));
+            pendingEdges.clear();
+        }}
+        if (infoBoxStale) {{
+            infoBoxStale = false;
+            updateInfoBox();
+        }}
+        if (precomputedLayout) {{
+            placeShownNodes();
+            network.fit();
+        }} else {{
+            network.setOptions({{physics: {{enabled: true}}}});
+            network.stabilize();
+        }}
+    }}
+
+    // Places the shown nodes by their precomputed layer and slot: layers without shown nodes
+    // are skipped, and each layer's nodes are packed in slot order around the center
+    function placeShownNodes() {{
+        const layers = new Map();
+        network.body.data.nodes.getIds().forEach(nodeId => {{
+            const position = nodePositions[nodeId];
+            if (position) {{
+                if (!layers.has(position[0])) {{
+                    layers.set(position[0], []);
+                }}
+                layers.get(position[0]).push(nodeId);
             }}
-            directCalls.add(calledScript);
         }});
+        const updates = [];
+        Array.from(layers.keys()).sort((a, b) => a - b).forEach((layer, row) => {{
+            const nodeIds = layers.get(layer).sort((a, b) => nodePositions[a][1] - nodePositions[b][1]);
+            nodeIds.forEach((nodeId, column) => {{
+                updates.push({{
+                    id: nodeId,
+                    x: (column - (nodeIds.length - 1) / 2) * NODE_SPACING,
+                    y: row * LAYER_SPACING
+                }});
+            }});
+        }});
+        network.body.data.nodes.update(updates);
+    }}
+
+    // Counts a node for a selection and queues it if it isn't shown yet; placeholders are skipped
+    function showNode(items, scriptId) {{
+        const script = scriptsData[scriptId];
+        if (!script || script.isPlaceholder) {{
+            return false;
+        }}
+        countNode(items, scriptId, () => ({{
+            id: scriptId,
+            label: scriptId,
+            title: `${{scriptId}}\\nDA2 Jobs: ${{script.da2_jobs.join(', ')}}\\nOPS Jobs: ${{script.ops_jobs.join(', ')}}`,
+            color: '#97C2FC'
+        }}));
+        return true;
+    }}
 
-        // Called By
-        Object.keys(scriptsData).forEach(otherScript => {{
-            if (scriptsData[otherScript].calls.includes(scriptId)) {{
-                calledBy.add(otherScript);
+    // Counts a node for a selection; createNode makes it when it isn't shown yet
+    function countNode(items, nodeId, createNode) {{
+        const count = nodeRefs.get(nodeId) || 0;
+        if (count === 0) {{
+            pendingNodeRemovals.delete(nodeId);
+            queueChange(pendingNodes, createNode());
+        }}
+        nodeRefs.set(nodeId, count + 1);
+        items.nodes.push(nodeId);
+    }}
+
+    // Shows a script of a selection's neighbour list, with its edge to the selected script
+    function showNeighbour(items, scriptId, listName, neighbour) {{
+        const list = NEIGHBOUR_LISTS[listName];
+        if (showNode(items, neighbour)) {{
+            if (list.calls) {{
+                showEdge(items, scriptId, neighbour, list.color);
+            }} else {{
+                showEdge(items, neighbour, scriptId, list.color);
             }}
-        }});
+        }}
+    }}
 
-        // Indirect Calls (depth 2)
-        directCalls.forEach(function(directScript) {{
-            // Create placeholder if needed
-            if (!scriptsData[directScript]) {{
-                console.log(`Creating placeholder for undefined direct script: ${{directScript}}`);
-                scriptsData[directScript] = {{
-                    da2_jobs: [],
-                    ops_jobs: [],
-                    calls: [],
-                    isPlaceholder: true
-                }};
+    // Shows a neighbour list of a selection: every script, or group nodes when it is long
+    function showNeighbours(items, scriptId, listName) {{
+        const neighbours = items.dependencies[listName];
+        if (!groupBy || neighbours.length <= CLUSTER_THRESHOLD) {{
+            neighbours.forEach(neighbour => showNeighbour(items, scriptId, listName, neighbour));
+            return;
+        }}
+        const nodeIds = items.dependencies.nodeIds[listName];
+        const members = new Map();
+        neighbours.forEach((neighbour, i) => {{
+            const group = nodeGroup(groupBy, nodeIds[i]);
+            if (!members.has(group)) {{
+                members.set(group, []);
             }}
-            
-            scriptsData[directScript].calls.forEach(indirectScript => {{
-                // Create placeholder if needed
-                if (!scriptsData[indirectScript]) {{
-                    console.log(`Creating placeholder for undefined indirect call: ${{indirectScript}}`);
-                    scriptsData[indirectScript] = {{
-                        da2_jobs: [],
-                        ops_jobs: [],
-                        calls: [],
-                        isPlaceholder: true
-                    }};
-                }}
-                if (indirectScript !== scriptId && !directCalls.has(indirectScript)) {{
-                    indirectCalls.add(indirectScript);
-                }}
-            }});
+            members.get(group).push(neighbour);
+        }});
+        // The biggest groups get their own node and the rest share one
+        const groups = Array.from(members.keys()).sort((a, b) => members.get(b).length - members.get(a).length);
+        groups.slice(0, CLUSTER_THRESHOLD - 1).forEach(group => {{
+            showGroup(items, scriptId, listName, groupNames[groupBy][group], members.get(group));
         }});
+        if (groups.length >= CLUSTER_THRESHOLD) {{
+            const others = [];
+            groups.slice(CLUSTER_THRESHOLD - 1).forEach(group => others.push(...members.get(group)));
+            showGroup(items, scriptId, listName, `${{groups.length - CLUSTER_THRESHOLD + 1}} other groups`, others);
+        }}
+    }}
 
-        // Indirect Called By (depth 2)
-        calledBy.forEach(function(directCaller) {{
-            Object.keys(scriptsData).forEach(otherScript => {{
-                if (scriptsData[otherScript].calls.includes(directCaller) && 
-                    otherScript !== scriptId && 
-                    !calledBy.has(otherScript)) {{
-                    indirectCalledBy.add(otherScript);
-                }}
+    // Adds a node standing for scripts of a selection's neighbour list, with the list's edge
+    function showGroup(items, scriptId, listName, groupName, members) {{
+        const list = NEIGHBOUR_LISTS[listName];
+        const groupId = `group:${{scriptId}}:${{listName}}:${{groupName}}`;
+        const group = {{scriptId, listName, groupName, members}};
+        groupNodes.set(groupId, group);
+        items.groups.push(groupId);
+        // Layered pages place the group where its first script would be
+        if (nodePositions[members[0]]) {{
+            nodePositions[groupId] = nodePositions[members[0]];
+        }}
+        countNode(items, groupId, () => Object.assign({{id: groupId, shape: 'box', color: '#D5DBDB'}}, groupLabel(group)));
+        group.edgeId = list.calls ? `${{scriptId}}->${{groupId}}` : `${{groupId}}->${{scriptId}}`;
+        if (list.calls) {{
+            showEdge(items, scriptId, groupId, list.color);
+        }} else {{
+            showEdge(items, groupId, scriptId, list.color);
+        }}
+    }}
+
+    function groupLabel(group) {{
+        return {{
+            label: `${{group.groupName}} (${{group.members.length}})`,
+            title: `${{group.members.length}} scripts of ${{group.groupName}}\\nClick to show ${{Math.min(group.members.length, CLUSTER_THRESHOLD)}} of them`
+        }};
+    }}
+
+    // Shows the next scripts of a group node; the node goes once it has shown them all
+    function expandGroup(groupId) {{
+        const group = groupNodes.get(groupId);
+        const items = selectionItems.get(group.scriptId);
+        beginBatch();
+        try {{
+            group.members.splice(0, CLUSTER_THRESHOLD).forEach(member => {{
+                showNeighbour(items, group.scriptId, group.listName, member);
             }});
+            if (group.members.length > 0) {{
+                queueChange(pendingNodes, Object.assign({{id: groupId}}, groupLabel(group)));
+            }} else {{
+                groupNodes.delete(groupId);
+                releaseItems(nodeRefs, [groupId], pendingNodeRemovals);
+                releaseItems(edgeRefs, [group.edgeId], pendingEdgeRemovals);
+                items.nodes.splice(items.nodes.indexOf(groupId), 1);
+                items.edges.splice(items.edges.indexOf(group.edgeId), 1);
+                items.groups.splice(items.groups.indexOf(groupId), 1);
+            }}
+        }} finally {{
+            endBatch();
+        }}
+    }}
+
+    // Counts an edge for a selection and queues it if it isn't shown yet
+    function showEdge(items, from, to, color) {{
+        const edgeId = `${{from}}->${{to}}`;
+        const count = edgeRefs.get(edgeId) || 0;
+        if (count === 0) {{
+            pendingEdgeRemovals.delete(edgeId);
+            queueChange(pendingEdges, {{from: from, to: to, id: edgeId, color: color}});
+        }}
+        edgeRefs.set(edgeId, count + 1);
+        items.edges.push(edgeId);
+    }}
+
+    // Drops one reference to each id; ids no selection references any more are queued for removal
+    function releaseItems(refs, ids, removals) {{
+        ids.forEach(id => {{
+            const count = refs.get(id) - 1;
+            if (count === 0) {{
+                refs.delete(id);
+                removals.add(id);
+            }} else {{
+                refs.set(id, count);
+            }}
         }});
+    }}
 
-        return {{directCalls, calledBy, indirectCalls, indirectCalledBy}};
+    // Queues a node or edge change for the current batch, merging it with earlier ones
+    function queueChange(pending, item) {{
+        const queued = pending.get(item.id);
+        pending.set(item.id, queued ? Object.assign(queued, item) : item);
     }}
 
+    // Rendered info box fragment of each selected script; only new selections are rendered
+    const infoFragments = new Map();
+    let noSelectionMessage = null;
+
     // Function to update the selected nodes info box
     function updateInfoBox() {{
-        let allNodesInfo = '';
-        if (selectedNodes.size > 0) {{
-            selectedNodes.forEach(nodeId => {{
-                const connections = getDependencies(nodeId);
-                allNodesInfo += createNodeInfoHTML(
-                    nodeId,
-                    connections.directCalls,
-                    connections.calledBy,
-                    connections.indirectCalls,
-                    connections.indirectCalledBy
-                );
-            }});
-        }} else {{
-            allNodesInfo = '<p>No nodes selected</p>';
+        if (batchDepth > 0) {{
+            infoBoxStale = true;
+            return;
+        }}
+        const container = document.getElementById('selectedNodesInfo');
+        infoFragments.forEach((fragment, nodeId) => {{
+            if (!selectedNodes.has(nodeId)) {{
+                fragment.remove();
+                infoFragments.delete(nodeId);
+            }}
+        }});
+        selectedNodes.forEach(nodeId => {{
+            if (!infoFragments.has(nodeId)) {{
+                const fragment = document.createElement('div');
+                fragment.innerHTML = createNodeInfoHTML(nodeId);
+                container.appendChild(fragment);
+                infoFragments.set(nodeId, fragment);
+            }}
+        }});
+
+        if (!noSelectionMessage) {{
+            noSelectionMessage = document.createElement('p');
+            noSelectionMessage.textContent = 'No nodes selected';
+            container.appendChild(noSelectionMessage);
         }}
-        document.getElementById('selectedNodesInfo').innerHTML = allNodesInfo;
+        noSelectionMessage.style.display = selectedNodes.size > 0 ? 'none' : '';
     }}
 
-    // Function to add a script and its dependencies to the network
+    // Renders the next page of an info box list when its "Show more" button is clicked
+    document.getElementById('selectedNodesInfo').addEventListener('click', function(event) {{
+        const button = event.target;
+        if (!button.dataset || !button.dataset.list) {{
+            return;
+        }}
+        const nodes = getInfoLists(button.dataset.script)[button.dataset.list];
+        const shown = parseInt(button.dataset.shown, 10);
+        const nextShown = Math.min(nodes.length, shown + INFO_LIST_PAGE_SIZE);
+        button.previousElementSibling.insertAdjacentHTML('beforeend', createScriptItemsHTML(nodes.slice(shown, nextShown)));
+        if (nextShown < nodes.length) {{
+            button.dataset.shown = nextShown;
+            button.textContent = `Show more (${{nodes.length - nextShown}} left)`;
+        }} else {{
+            button.remove();
+        }}
+    }});
+
+    // Function to add a script and its dependencies to the network, once their data is loaded
     function addScript(scriptId) {{
+        addScripts([scriptId]);
+    }}
+
+    // Adds several scripts as one batch, so the network is updated and laid out once
+    function addScripts(scriptIds) {{
+        Promise.all(scriptIds.map(loadDependencies)).then(dependencies => {{
+            beginBatch();
+            try {{
+                scriptIds.forEach((scriptId, i) => addLoadedScript(scriptId, dependencies[i]));
+            }} finally {{
+                endBatch();
+            }}
+        }}).catch(error => {{
+            alert(error.message);
+        }});
+    }}
+
+    function addLoadedScript(scriptId, connections) {{
         if (selectedNodes.has(scriptId)) {{
             alert('Script already added.');
             return;
@@ -370,125 +1328,24 @@ custom_js = f"""
         `;
         selectedList.appendChild(listItem);
 
-        // Traverse dependencies
-        const connections = getDependencies(scriptId);
+        // Show the dependencies; every node and edge shown for this selection is counted
+        const items = {{nodes: [], edges: [], dependencies: connections, groups: []}};
+        selectionItems.set(scriptId, items);
 
-        // Direct Calls - Red
-        connections.directCalls.forEach(calledScript => {{
-            // Skip placeholder scripts
-            if (!scriptsData[calledScript] || scriptsData[calledScript].isPlaceholder) {{
-                return;
-            }}
-
-            if (!addedNodes.has(calledScript)) {{
-                network.body.data.nodes.update([{{
-                    id: calledScript, 
-                    label: calledScript,
-                    title: `${{calledScript}}\\nDA2 Jobs: ${{scriptsData[calledScript].da2_jobs.join(', ')}}\\nOPS Jobs: ${{scriptsData[calledScript].ops_jobs.join(', ')}}`,
-                    color: '#97C2FC'
-                }}]);
-                addedNodes.add(calledScript);
-            }}
-            const edgeId = `${{scriptId}}->${{calledScript}}`;
-            if (!addedEdges.has(edgeId)) {{
-                network.body.data.edges.update([{{
-                    from: scriptId, to: calledScript, id: edgeId, color: '#FF0000'
-                }}]); // Red for direct
-                addedEdges.add(edgeId);
-            }}
-        }});
-
-        // Indirect Calls - Yellow
-        connections.indirectCalls.forEach(indirectScript => {{
-            // Skip placeholder scripts
-            if (!scriptsData[indirectScript] || scriptsData[indirectScript].isPlaceholder) {{
-                return;
-            }}
-
-            if (!addedNodes.has(indirectScript)) {{
-                network.body.data.nodes.update([{{
-                    id: indirectScript, 
-                    label: indirectScript,
-                    title: `${{indirectScript}}\\nDA2 Jobs: ${{scriptsData[indirectScript].da2_jobs.join(', ')}}\\nOPS Jobs: ${{scriptsData[indirectScript].ops_jobs.join(', ')}}`,
-                    color: '#97C2FC'
-                }}]);
-                addedNodes.add(indirectScript);
-            }}
-            const edgeId = `${{scriptId}}->${{indirectScript}}`;
-            if (!addedEdges.has(edgeId)) {{
-                network.body.data.edges.update([{{
-                    from: scriptId, to: indirectScript, id: edgeId, color: '#FFA500'
-                }}]); // Yellow for indirect
-                addedEdges.add(edgeId);
-            }}
-        }});
-
-        // Called By - Red
-        connections.calledBy.forEach(callingScript => {{
-            // Skip placeholder scripts
-            if (!scriptsData[callingScript] || scriptsData[callingScript].isPlaceholder) {{
-                return;
-            }}
-
-            if (!addedNodes.has(callingScript)) {{
-                network.body.data.nodes.update([{{
-                    id: callingScript, 
-                    label: callingScript,
-                    title: `${{callingScript}}\\nDA2 Jobs: ${{scriptsData[callingScript].da2_jobs.join(', ')}}\\nOPS Jobs: ${{scriptsData[callingScript].ops_jobs.join(', ')}}`,
-                    color: '#97C2FC'
-                }}]);
-                addedNodes.add(callingScript);
-            }}
-            const edgeId = `${{callingScript}}->${{scriptId}}`;
-            if (!addedEdges.has(edgeId)) {{
-                network.body.data.edges.update([{{
-                    from: callingScript, to: scriptId, id: edgeId, color: '#FF0000'
-                }}]); // Red for direct
-                addedEdges.add(edgeId);
-            }}
-        }});
-
-        // Indirect Called By - Yellow
-        connections.indirectCalledBy.forEach(indirectCaller => {{
-            // Skip placeholder scripts
-            if (!scriptsData[indirectCaller] || scriptsData[indirectCaller].isPlaceholder) {{
-                return;
-            }}
-
-            if (!addedNodes.has(indirectCaller)) {{
-                network.body.data.nodes.update([{{
-                    id: indirectCaller, 
-                    label: indirectCaller,
-                    title: `${{indirectCaller}}\\nDA2 Jobs: ${{scriptsData[indirectCaller].da2_jobs.join(', ')}}\\nOPS Jobs: ${{scriptsData[indirectCaller].ops_jobs.join(', ')}}`,
-                    color: '#97C2FC'
-                }}]);
-                addedNodes.add(indirectCaller);
-            }}
-            const edgeId = `${{indirectCaller}}->${{scriptId}}`;
-            if (!addedEdges.has(edgeId)) {{
-                network.body.data.edges.update([{{
-                    from: indirectCaller, to: scriptId, id: edgeId, color: '#FFA500'
-                }}]); // Yellow for indirect
-                addedEdges.add(edgeId);
-            }}
-        }});
+        // Calls and callers in red, indirect ones in yellow; long lists in groups
+        showNeighbours(items, scriptId, 'directCalls');
+        showNeighbours(items, scriptId, 'indirectCalls');
+        showNeighbours(items, scriptId, 'calledBy');
+        showNeighbours(items, scriptId, 'indirectCalledBy');
 
         // Add the selected script itself (only if it's not a placeholder)
-        if (!scriptsData[scriptId].isPlaceholder && !addedNodes.has(scriptId)) {{
-            network.body.data.nodes.update([{{
-                id: scriptId, 
-                label: scriptId,
-                title: `${{scriptId}}\\nDA2 Jobs: ${{scriptsData[scriptId].da2_jobs.join(', ')}}\\nOPS Jobs: ${{scriptsData[scriptId].ops_jobs.join(', ')}}`,
-                color: '#97C2FC'
-            }}]);
-            addedNodes.add(scriptId);
-        }}
+        showNode(items, scriptId);
 
         // Add to selected nodes
         selectedNodes.add(scriptId);
 
         // Highlight the node border
-        network.body.data.nodes.update({{id: scriptId, borderWidth: 3, borderWidthSelected: 5}});
+        queueChange(pendingNodes, {{id: scriptId, borderWidth: 3, borderWidthSelected: 5}});
 
         // Update the info box
         updateInfoBox();
@@ -510,68 +1367,26 @@ custom_js = f"""
             listItem.remove();
         }}
 
-        // If there are no more selected nodes, clear everything
-        if (selectedNodes.size === 0) {{
-            network.body.data.nodes.clear();
-            network.body.data.edges.clear();
-            addedNodes.clear();
-            addedEdges.clear();
-            updateInfoBox();
-            return;
+        // Take back what this selection added; what other selections still show stays
+        const items = selectionItems.get(scriptId);
+        selectionItems.delete(scriptId);
+        items.groups.forEach(groupId => groupNodes.delete(groupId));
+        beginBatch();
+        releaseItems(nodeRefs, items.nodes, pendingNodeRemovals);
+        releaseItems(edgeRefs, items.edges, pendingEdgeRemovals);
+        if (nodeRefs.has(scriptId)) {{
+            // Still shown for another selection: drop the selection highlight
+            queueChange(pendingNodes, {{id: scriptId, borderWidth: 1, borderWidthSelected: 2}});
         }}
-
-        // Rebuild the network based on remaining selected nodes
-        let nodesToKeep = new Set();
-        let edgesToKeep = new Set();
-
-        // For each remaining selected node, recalculate its dependencies
-        selectedNodes.forEach(remainingScript => {{
-            const connections = getDependencies(remainingScript);
-            
-            // Add all related nodes to keep
-            nodesToKeep.add(remainingScript);
-            connections.directCalls.forEach(script => nodesToKeep.add(script));
-            connections.calledBy.forEach(script => nodesToKeep.add(script));
-            connections.indirectCalls.forEach(script => nodesToKeep.add(script));
-            connections.indirectCalledBy.forEach(script => nodesToKeep.add(script));
-
-            // Rebuild edges for direct calls
-            connections.directCalls.forEach(calledScript => {{
-                edgesToKeep.add(`${{remainingScript}}->${{calledScript}}`);
-            }});
-
-            // Rebuild edges for indirect calls
-            connections.indirectCalls.forEach(indirectScript => {{
-                edgesToKeep.add(`${{remainingScript}}->${{indirectScript}}`);
-            }});
-        }});
-
-        // Remove nodes that are no longer needed
-        network.body.data.nodes.get().forEach(node => {{
-            if (!nodesToKeep.has(node.id)) {{
-                network.body.data.nodes.remove({{id: node.id}});
-                addedNodes.delete(node.id);
-            }}
-        }});
-
-        // Remove edges that are no longer needed
-        network.body.data.edges.get().forEach(edge => {{
-            const edgeId = `${{edge.from}}->${{edge.to}}`;
-            if (!edgesToKeep.has(edgeId)) {{
-                network.body.data.edges.remove({{id: edge.id}});
-                addedEdges.delete(edgeId);
-            }}
-        }});
-
-        // Update the info box
         updateInfoBox();
+        endBatch();
     }}
 
     // Function to reset all edge colors to default gray
     function resetEdgeColors() {{
-        network.body.data.edges.get().forEach(function(edge) {{
-            network.body.data.edges.update({{id: edge.id, color: {{color: '#848484'}}}});
-        }});
+        network.body.data.edges.update(network.body.data.edges.getIds().map(edgeId => ({{
+            id: edgeId, color: {{color: '#848484'}}
+        }})));
     }}
 
     // Function to handle the Add Script button click
@@ -579,45 +1394,45 @@ custom_js = f"""
         var input = document.getElementById('scriptSearchInput').value.trim();
         var searchType = document.getElementById('searchType').value;
         if (input !== '') {{
-            let matchingScripts = new Set();
-            if (searchType === 'name') {{
-                // Direct name match
-                Object.keys(scriptsData).forEach(scriptName => {{
-                    if (scriptName.toLowerCase().includes(input.toLowerCase())) {{
-                        matchingScripts.add(scriptName);
-                    }}
-                }});
-            }} else if (searchType === 'da2') {{
-                // DA2 job match
-                Object.keys(scriptsData).forEach(scriptName => {{
-                    scriptsData[scriptName].da2_jobs.forEach(job => {{
-                        if (job.toLowerCase().includes(input.toLowerCase())) {{
-                            matchingScripts.add(scriptName);
-                        }}
-                    }});
-                }});
-            }} else if (searchType === 'ops') {{
-                // OPS job match
-                Object.keys(scriptsData).forEach(scriptName => {{
-                    scriptsData[scriptName].ops_jobs.forEach(job => {{
-                        if (job.toLowerCase().includes(input.toLowerCase())) {{
-                            matchingScripts.add(scriptName);
-                        }}
-                    }});
-                }});
-            }}
-
-            if (matchingScripts.size > 0) {{
-                matchingScripts.forEach(function(scriptId) {{
-                    addScript(scriptId);
-                }});
-                document.getElementById('scriptSearchInput').value = '';
-            }} else {{
-                alert('No matching scripts found.');
-            }}
+            // Every script whose name, or one of whose DA2 or OPS jobs, contains the input
+            const request = {{type: 'match', searchType: searchType, needle: input.toLowerCase()}};
+            askSearch(request).then(matchingScripts => {{
+                if (matchingScripts.length > 0) {{
+                    addScripts(matchingScripts);
+                    document.getElementById('scriptSearchInput').value = '';
+                }} else {{
+                    alert('No matching scripts found.');
+                }}
+            }});
         }}
     }});
 
+    // Re-draws the selected scripts, after the traversal depth or the grouping changed
+    function redrawSelections() {{
+        const scripts = Array.from(selectedNodes);
+        selectedNodes.clear();
+        nodeRefs.clear();
+        edgeRefs.clear();
+        selectionItems.clear();
+        groupNodes.clear();
+        network.body.data.nodes.clear();
+        network.body.data.edges.clear();
+        document.getElementById('selectedNodesList').innerHTML = '';
+        infoFragments.forEach(fragment => fragment.remove());
+        infoFragments.clear();
+        addScripts(scripts);
+    }}
+
+    document.getElementById('depthSelect').addEventListener('change', function() {{
+        traversalDepth = parseInt(this.value, 10);
+        redrawSelections();
+    }});
+
+    document.getElementById('groupSelect').addEventListener('change', function() {{
+        groupBy = this.value;
+        redrawSelections();
+    }});
+
     // Allow pressing Enter to add the script
     document.getElementById('scriptSearchInput').addEventListener('keydown', function(event) {{
         if (event.key === 'Enter') {{
@@ -626,60 +1441,32 @@ custom_js = f"""
         }}
     }});
 
-    // Function to handle dynamic datalist based on search type
+    // Function to handle dynamic datalist based on search type: the top matches only
     document.getElementById('searchType').addEventListener('change', function() {{
         var searchType = this.value;
         var dataList = document.getElementById('scriptList');
         var input = document.getElementById('scriptSearchInput').value.trim().toLowerCase();
-        
-        // Clear current datalist
-        dataList.innerHTML = '';
-        
-        if (searchType === 'name') {{
-            // For name search, show script names
-            Object.keys(scriptsData).forEach(scriptName => {{
-                if (scriptName.toLowerCase().includes(input)) {{
-                    var option = document.createElement('option');
-                    option.value = scriptName;
-                    dataList.appendChild(option);
-                }}
-            }});
-        }} else if (searchType === 'da2') {{
-            // For DA2 search, show DA2 job names
-            let uniqueDa2Jobs = new Set();
-            Object.keys(scriptsData).forEach(scriptName => {{
-                scriptsData[scriptName].da2_jobs.forEach(job => {{
-                    if (job.toLowerCase().includes(input)) {{
-                        uniqueDa2Jobs.add(job);
-                    }}
-                }});
-            }});
-            uniqueDa2Jobs.forEach(job => {{
-                var option = document.createElement('option');
-                option.value = job;
-                dataList.appendChild(option);
-            }});
-        }} else if (searchType === 'ops') {{
-            // For OPS search, show OPS job names
-            let uniqueOpsJobs = new Set();
-            Object.keys(scriptsData).forEach(scriptName => {{
-                scriptsData[scriptName].ops_jobs.forEach(job => {{
-                    if (job.toLowerCase().includes(input)) {{
-                        uniqueOpsJobs.add(job);
-                    }}
-                }});
-            }});
-            uniqueOpsJobs.forEach(job => {{
+
+        const request = {{type: 'suggest', searchType: searchType, needle: input, limit: SUGGESTION_LIMIT}};
+        askSearch(request).then(suggestions => {{
+            const options = document.createDocumentFragment();
+            suggestions.forEach(key => {{
                 var option = document.createElement('option');
-                option.value = job;
-                dataList.appendChild(option);
+                option.value = key;
+                options.appendChild(option);
             }});
-        }}
+            dataList.innerHTML = '';
+            dataList.appendChild(options);
+        }});
     }});
 
-    // Optional: Update datalist as user types
+    // Update datalist as user types, once typing pauses
+    let suggestionTimer = null;
     document.getElementById('scriptSearchInput').addEventListener('input', function() {{
-        document.getElementById('searchType').dispatchEvent(new Event('change'));
+        clearTimeout(suggestionTimer);
+        suggestionTimer = setTimeout(function() {{
+            document.getElementById('searchType').dispatchEvent(new Event('change'));
+        }}, SUGGESTION_DELAY_MS);
     }});
 
     // Function to handle network clicks
@@ -687,17 +1474,24 @@ custom_js = f"""
         if (params.nodes.length > 0) {{
             const clickedNode = params.nodes[0];
             
-            // Toggle node selection
-            if (selectedNodes.has(clickedNode)) {{
+            // Group nodes show more of their scripts; others toggle their selection
+            if (groupNodes.has(clickedNode)) {{
+                expandGroup(clickedNode);
+            }} else if (selectedNodes.has(clickedNode)) {{
                 removeScript(clickedNode);
             }} else {{
                 addScript(clickedNode);
             }}
         }} else {{
             // Clicked on background, clear all selections
-            selectedNodes.forEach(nodeId => {{
-                removeScript(nodeId);
-            }});
+            beginBatch();
+            try {{
+                selectedNodes.forEach(nodeId => {{
+                    removeScript(nodeId);
+                }});
+            }} finally {{
+                endBatch();
+            }}
         }}
     }});
 
@@ -709,13 +1503,541 @@ custom_js = f"""
 </script>
 """
 
-# Combine the original HTML with custom HTML and JS
-html_content = html_content.replace("</body>", custom_html + custom_js + "\n</body>")
+def build_graph_page(graph, output_path=DEFAULT_OUTPUT_PATH, shard_data=False, shard_size=DATA_SHARD_SIZE,
+                     layout="physics", assets="cdn", minify=False, state=None, changed=None):
+    """
+    Writes the interactive dependency graph page for a ScriptGraph to output_path.
+    With shard_data=True the graph data goes to data files in a directory next to the page
+    (see write_data_files) and the page loads only the ones it needs; otherwise it is inline.
+    With layout="layered" every script gets its layer and slot from graph_layout.layered_layout,
+    the page places what it shows by them and the browser's physics simulation is switched
+    off; "physics" leaves the layout to vis.js.
+    The page is streamed to the file from its templates (see page_renderer.render_template);
+    assets picks where vis-network comes from (see page_renderer.asset_tags) and minify
+    strips the page's markup and code down.
+    state is a dict the graph and what was derived from it are kept in for the next call.
+    When it holds those of the previous graph and changed lists the scripts added, changed
+    or removed since, the cycles are only searched again if a changed call could have
+    closed or split one, the search index is patched and only the data files those scripts
+    touch are serialized again.
+    """
+    previous = state if state and changed is not None else None
+
+    # Recursive EXECUTE cycles, from the condensation of the call graph
+    with profile_stage("cycles") as stage:
+        if previous and _same_cycles(previous["graph"], graph, changed, previous["cycles"]):
+            cycles = previous["cycles"]
+        else:
+            cycles = find_cycles(graph)
+        stage["cycles"] = len(cycles)
+    if cycles:
+        print(f"Found {len(cycles)} call cycles; the largest has {len(cycles[0])} scripts.")
+
+    positions = None
+    if layout == "layered":
+        with profile_stage("layout"):
+            layers, slots = layered_layout(graph)
+            positions = {graph.names[node]: [layers[node], slots[node]] for node in range(graph.script_count)}
+
+    if shard_data:
+        data_dir = os.path.splitext(output_path)[0] + "_data"
+        with profile_stage("write_data_files") as stage:
+            written = []
+            data_files = write_data_files(graph, data_dir, cycles, shard_size, positions, written, state, changed)
+            stage["files"] = len(os.listdir(data_dir))
+            stage["files_written"] = len(written)
+        scripts_json = positions_json = "{}"
+        graph_json = search_index_json = "null"
+        cycles_json = "[]"
+    else:
+        data_files = None
+
+        with profile_stage("serialize") as stage:
+            # The jobs of every script, as JSON for JavaScript consumption; the calls go to the
+            # page's traversal worker in compact form
+            scripts_json = _compact_json({graph.names[node]: _script_jobs(graph, node) for node in range(graph.script_count)})
+            graph_json = _compact_json(worker_graph_data(graph))
+            cycles_json = _compact_json(cycles)
+
+            # The worker parses the search index, so it is embedded as a JSON string
+            search_index = _search_index(graph, previous)
+            search_index_json = json.dumps(_compact_json(search_index))
+            positions_json = _compact_json(positions or {})
+            stage["blocks"] = graph.script_count
+
+    options = json.loads(NETWORK_OPTIONS)
+    if layout == "layered":
+        options["physics"]["enabled"] = False
+
+    # The datalist starts with the first names in sorted order; typing looks up the rest
+    first_names = sorted(graph.names[:graph.script_count], key=str.lower)[:SUGGESTION_LIMIT]
+    script_options = "\n".join([f'<option value="{name}">' for name in first_names])
+
+    # Written aside and moved into place, so a browser reloading the page never gets half of it
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with profile_stage("write_html") as stage:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            render_template(file, PAGE_HEAD, {"assets": asset_tags(output_path, assets),
+                                              "options": _compact_json(options)}, minify)
+            render_template(file, CUSTOM_HTML, {"options": script_options}, minify)
+            render_template(file, CUSTOM_JS, {
+                "scripts_json": scripts_json,
+                "graph_json": graph_json,
+                "cycles_json": cycles_json,
+                "data_files_json": json.dumps(data_files),
+                "search_index_json": search_index_json,
+                "suggestion_limit": SUGGESTION_LIMIT,
+                "positions_json": positions_json,
+                "precomputed_layout": json.dumps(layout == "layered")
+            }, minify)
+            render_template(file, PAGE_TAIL, {}, minify)
+            stage["bytes_written"] = file.tell()
+        stage["replaced"] = _replace_if_changed(temp_path, output_path)
+
+    if state is not None:
+        state.update(graph=graph, cycles=cycles)
+        if not shard_data:
+            state.update(search_index=search_index, data_dir=None)
+
+def _same_cycles(old_graph, graph, changed, old_cycles):
+    """
+    Tells whether graph has the same call cycles as old_graph, whose cycles were old_cycles,
+    given the names of the scripts whose definitions changed in between: the scripts must
+    be the same, in the same order, no call inside a cycle may be gone (which could split
+    it) and no new call may lead back to its caller.
+    """
+    script_count = graph.script_count
+    if old_graph.names[:old_graph.script_count] != graph.names[:script_count]:
+        return False
+    cycle_of = {name: index for index, cycle in enumerate(old_cycles) for name in cycle}
+    callers = set()
+    targets = set()
+    for name in changed:
+        node = graph.name_ids.get(name)
+        if node is None or node >= script_count:
+            continue
+        old_targets = {target for target in old_graph.calls.neighbors(node) if target < script_count}
+        new_targets = {target for target in graph.calls.neighbors(node) if target < script_count}
+        if name in cycle_of and any(cycle_of.get(graph.names[target]) == cycle_of[name]
+                                    for target in old_targets - new_targets):
+            return False
+        if new_targets - old_targets:
+            callers.add(node)
+            targets.update(new_targets - old_targets)
+    if not targets:
+        return True
+    reached = reachable_depths(graph.calls, targets)
+    return not any(node in targets or node in reached for node in callers)
+
+def _search_index(graph, previous):
+    """
+    Returns the search index of the graph, patched from the previous one when there is one.
+    """
+    if previous and "search_index" in previous:
+        return update_search_index(previous["search_index"], previous["graph"], graph)
+    return build_search_index(graph)
+
+def _compact_json(value):
+    return json.dumps(value, separators=(",", ":"))
+
+def worker_graph_data(graph):
+    """
+    Returns the call graph of an inline page the way its traversal worker takes it: the node
+    names joined by newlines (scripts first, then placeholders), the script count and the CSR
+    call arrays as base64 of little-endian 32-bit ids, which the page decodes straight into
+    the buffers it transfers to the worker. The component id of every node and the DAG of
+    the graph's condensation are encoded the same way, so the worker answers whole-cone
+    queries by walking components (see graph_analysis.cone). "groups" holds the
+    script_groups groupings the page clusters long neighbour lists by, with their group id
+    arrays encoded the same way.
+    """
+    condensation = graph.condensation()
+    return {
+        "names": "\n".join(graph.names),
+        "scriptCount": graph.script_count,
+        "callOffsets": _encode_ids(graph.calls.offsets),
+        "callTargets": _encode_ids(graph.calls.targets),
+        "componentOf": _encode_ids(condensation.component_of),
+        "dagOffsets": _encode_ids(condensation.dag.offsets),
+        "dagTargets": _encode_ids(condensation.dag.targets),
+        "groups": {
+            grouping: {"names": groups["names"], "of": _encode_ids(groups["of"])}
+            for grouping, groups in build_script_groups(graph).items()
+        }
+    }
 
-# Write the updated HTML back to the file
-with open("script_dependency_graph.html", "w", encoding="utf-8") as file:
-    file.write(html_content)
+def _encode_ids(ids):
+    if sys.byteorder == "big":
+        ids = array(ID_TYPECODE, ids)
+        ids.byteswap()
+    return base64.b64encode(ids.tobytes()).decode("ascii")
 
-print("Graph has been generated and saved to 'script_dependency_graph.html'. Open this file in your web browser to view the interactive graph.")
+def _script_jobs(graph, node):
+    return {
+        "da2_jobs": [graph.da2_job_names[job] for job in graph.da2_jobs.neighbors(node)],
+        "ops_jobs": [graph.ops_job_names[job] for job in graph.ops_jobs.neighbors(node)]
+    }
 
+def write_data_files(graph, data_dir, cycles, shard_size=DATA_SHARD_SIZE, positions=None, written=None,
+                     state=None, changed=None):
+    """
+    Writes the graph data for a sharded page and returns the manifest the page embeds.
+    Scripts are numbered in name order (UTF-16 order, as JavaScript compares strings) and cut
+    into shards of shard_size; a shard holds its scripts' names, jobs, cycle ids, group ids
+    (see script_groups) and, when positions ({name: [layer, slot]}) is given, their layout
+    positions, so the page finds the shard of any name by binary search over the first name
+    of each shard. It also holds their calls and callers as CSR arrays of script numbers
+    (encoded like worker_graph_data's), which the page hands to the traversal worker as a
+    walk reaches the shard; placeholders are left out, since they call nothing and are
+    never shown.
+    Each namespace of the search index gets a file of its keys and its grams' postings spread
+    over files by search_index.gram_file, so a search loads the keys and the postings of the
+    grams it looks up; the scripts of job keys go to files of shard_size keys, loaded for the
+    keys a search matches. These, the group names and the cycle lists are JSON text the
+    worker or the page parses on first use.
+    Files that already hold their new content are left alone, so regenerating the page after
+    a small change only rewrites the data files it affects; their names are appended to the
+    written list when one is passed. Other .js files in data_dir are removed.
+    state and changed work as for build_graph_page: while the scripts stay the same, in the
+    same order, their numbers do too and only the shards holding a script whose data
+    changed are serialized again; the other shards and the search files of keys that
+    didn't change are left as they are.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    written = written if written is not None else []
+    files = set()
+    previous = state if state and changed is not None and state.get("data_dir") == data_dir else None
+    if previous and previous["shard_size"] != shard_size:
+        previous = None
+
+    def write(file_name, payload):
+        files.add(file_name)
+        if _write_data_file(data_dir, file_name, payload):
+            written.append(file_name)
+        return file_name
+
+    def keep(file_name):
+        files.add(file_name)
+        return file_name
+
+    cycle_of = {name: index for index, cycle in enumerate(cycles) for name in cycle}
+    groupings = build_script_groups(graph)
+    search_index = _search_index(graph, previous)
+    old_graph = previous["graph"] if previous else None
+    dirty_shards = None
+    if old_graph and old_graph.names[:old_graph.script_count] == graph.names[:graph.script_count]:
+        order, numbers = previous["order"], previous["numbers"]
+        dirty = _changed_shard_scripts(previous, graph, changed, cycle_of, positions, groupings)
+        if dirty is not None:
+            dirty_shards = {numbers[node] // shard_size for node in dirty}
+    else:
+        order = sorted(range(graph.script_count), key=lambda node: graph.names[node].encode("utf-16-be"))
+        numbers = array(ID_TYPECODE, [0]) * graph.script_count
+        for number, node in enumerate(order):
+            numbers[node] = number
+
+    shard_starts = []
+    shard_files = []
+    for start in range(0, len(order), shard_size):
+        nodes = order[start:start + shard_size]
+        shard_starts.append(graph.names[nodes[0]])
+        file_name = f"shard-{len(shard_files):05d}.js"
+        if dirty_shards is not None and len(shard_files) not in dirty_shards:
+            shard_files.append(keep(file_name))
+            continue
+        names = [graph.names[node] for node in nodes]
+        shard = {
+            "names": names,
+            "scripts": [_script_jobs(graph, node) for node in nodes],
+            "cycleOf": {name: cycle_of[name] for name in names if name in cycle_of},
+            "positions": {name: positions[name] for name in names if positions and name in positions},
+            "groups": {grouping: _encode_ids(array(ID_TYPECODE, [groups["of"][node] for node in nodes]))
+                       for grouping, groups in groupings.items()},
+            "calls": _shard_adjacency(graph, graph.calls, nodes, numbers),
+            "callers": _shard_adjacency(graph, graph.callers, nodes, numbers)
+        }
+        shard_files.append(write(file_name, shard))
+
+    search_files = {}
+    for namespace, index in search_index.items():
+        keys = index["keys"]
+        gram_file_count = max(1, -(-len(keys) // shard_size))
+        gram_file_names = [f"search-{namespace}-grams-{number:05d}.js" for number in range(gram_file_count)]
+        if previous and previous["search_index"][namespace]["grams"] is index["grams"]:
+            # The same keys: the keys and grams files are still current
+            keys_file = keep(f"search-{namespace}.js")
+            gram_file_names = [keep(file_name) for file_name in gram_file_names]
+        else:
+            keys_file = write(f"search-{namespace}.js", _compact_json(keys))
+            gram_files = [{} for _ in range(gram_file_count)]
+            for gram, ids in index["grams"].items():
+                gram_files[gram_file(gram, gram_file_count)][gram] = ids
+            gram_file_names = [write(file_name, _compact_json(grams))
+                               for file_name, grams in zip(gram_file_names, gram_files)]
+        search_files[namespace] = {
+            "keys": keys_file,
+            "grams": gram_file_names,
+            "scripts": None if "scripts" not in index else [
+                write(f"search-{namespace}-scripts-{number:05d}.js",
+                      _compact_json(index["scripts"][start:start + shard_size]))
+                for number, start in enumerate(range(0, len(keys), shard_size))
+            ]
+        }
+
+    groups_file = write("groups.js", {grouping: groups["names"] for grouping, groups in groupings.items()})
+    cycles_file = write("cycles.js", cycles) if cycles else None
+
+    # Files left over from an earlier graph would never be read again
+    for file_name in os.listdir(data_dir):
+        if file_name.endswith(".js") and file_name not in files:
+            os.remove(os.path.join(data_dir, file_name))
+
+    if state is not None:
+        state.update(graph=graph, search_index=search_index, data_dir=data_dir, shard_size=shard_size,
+                     order=order, numbers=numbers, cycle_of=cycle_of, positions=positions, groupings=groupings)
+
+    return {
+        "dir": os.path.basename(data_dir),
+        "scriptCount": graph.script_count,
+        "shardSize": shard_size,
+        "shardStarts": shard_starts,
+        "shardFiles": shard_files,
+        "search": search_files,
+        "gramSize": GRAM_SIZE,
+        "groupsFile": groups_file,
+        "cyclesFile": cycles_file
+    }
 
+def _changed_shard_scripts(previous, graph, changed, cycle_of, positions, groupings):
+    """
+    Returns the scripts whose shard data may differ from the previous call of
+    write_data_files, when the scripts are the same and in the same order: the changed
+    ones, the scripts they called or call now (whose callers changed) and the ones with a
+    new cycle, position or group. Returns None when a grouping's groups changed, which
+    renumbers them everywhere.
+    """
+    old_graph = previous["graph"]
+    script_count = graph.script_count
+    nodes = set()
+    for name in changed:
+        node = graph.name_ids.get(name)
+        if node is not None and node < script_count:
+            nodes.add(node)
+            nodes.update(target for target in old_graph.calls.neighbors(node) if target < script_count)
+            nodes.update(target for target in graph.calls.neighbors(node) if target < script_count)
+    old_cycle_of = previous["cycle_of"]
+    nodes.update(graph.name_ids[name] for name in old_cycle_of.keys() | cycle_of.keys()
+                 if old_cycle_of.get(name) != cycle_of.get(name))
+    old_positions = previous["positions"] or {}
+    if positions or old_positions:
+        nodes.update(node for node, name in enumerate(graph.names[:script_count])
+                     if (positions or {}).get(name) != old_positions.get(name))
+    for grouping, groups in groupings.items():
+        old_groups = previous["groupings"][grouping]
+        if old_groups["names"] != groups["names"]:
+            return None
+        if old_groups["of"] != groups["of"]:
+            nodes.update(compress(range(script_count), map(operator.ne, old_groups["of"], groups["of"])))
+    return nodes
+
+def _shard_adjacency(graph, adjacency, nodes, numbers):
+    """
+    Returns the CSR arrays of adjacency for the nodes of a shard, base64-encoded, with the
+    neighbours that are scripts as script numbers, in the order the graph lists them.
+    """
+    offsets = array(ID_TYPECODE, [0])
+    targets = array(ID_TYPECODE)
+    for node in nodes:
+        targets.extend(numbers[target] for target in adjacency.neighbors(node) if target < graph.script_count)
+        offsets.append(len(targets))
+    return {"offsets": _encode_ids(offsets), "targets": _encode_ids(targets)}
+
+def _write_data_file(data_dir, file_name, payload):
+    """
+    Writes one data file as a script that hands its payload to the page, unless the file
+    already holds exactly that. Returns whether it was written.
+    """
+    path = os.path.join(data_dir, file_name)
+    data = f"scriptGraphData({json.dumps(file_name)}, {json.dumps(payload, separators=(',', ':'))});\n".encode("utf-8")
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as file:
+                if file.read() == data:
+                    return False
+    except OSError:
+        pass
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+    return True
+
+def _replace_if_changed(temp_path, path):
+    """
+    Moves a freshly written temp file over path, or drops it when path has the same content,
+    so a page that didn't change keeps its timestamp. Returns whether path was replaced.
+    """
+    if os.path.exists(path) and filecmp.cmp(temp_path, path, shallow=False):
+        os.remove(temp_path)
+        return False
+    os.replace(temp_path, path)
+    return True
+
+def is_multi_file(dat_files):
+    """
+    Tells whether the command line names more than one .dat file: several arguments, a
+    directory or a glob pattern.
+    """
+    return len(dat_files) > 1 or any(os.path.isdir(path) or glob.has_magic(path) for path in dat_files)
+
+def load_scripts(args, changes=None):
+    """
+    Loads the scripts of the .dat files named on the command line: merged when there are
+    several (see get_scripts_from_files), otherwise through get_scripts, from the on-disk
+    cache when the file is unchanged. With --incremental, a dict passed as changes receives
+    the scripts added, changed and removed since the last run.
+    """
+    if is_multi_file(args.dat_files):
+        return get_scripts_from_files(args.dat_files, args.precedence, args.workers,
+                                      use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                      rebuild_cache=args.rebuild_cache)
+    return get_scripts(args.dat_files[0] if args.dat_files else None, parallel=args.parallel,
+                       workers=args.workers, use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                       rebuild_cache=args.rebuild_cache, incremental=args.incremental, changes=changes)
+
+def write_graph(args, scripts, state=None, changed=None):
+    """
+    Interns the scripts into the compact graph and writes its page as the command line says.
+    state and changed are passed on to build_graph_page; when state holds the previous
+    graph, it is patched with the changed scripts instead of being built again.
+    """
+    with profile_stage("graph") as stage:
+        if state and changed is not None:
+            graph = state["graph"].patched(scripts, changed)
+        else:
+            graph = ScriptGraph.from_scripts(scripts)
+        stage["blocks"] = graph.script_count
+    build_graph_page(graph, args.output, args.shard_data, args.shard_size, args.layout, args.assets, args.minify,
+                     state, changed)
+    print(f"Graph has been generated and saved to '{args.output}'. Open this file in your web browser to view the interactive graph.")
+
+def generate(args):
+    """
+    Runs the pipeline for the parsed command line: load the scripts, build the graph and
+    write the page. Returns the exit status.
+    """
+    # Step 1: Load the scripts, from the on-disk cache when the .dat files are unchanged
+    scripts = load_scripts(args)
+    if not scripts:
+        print("No scripts were loaded; the graph was not generated.")
+        return 1
+
+    # Steps 2 and 3: Intern the scripts into the compact graph and write the page
+    write_graph(args, scripts)
+    return 0
+
+def watch(args):
+    """
+    Writes the page, then writes it again each time the watched .dat files change, until
+    interrupted. A single file is re-parsed incrementally unless --no-cache or --parallel
+    says otherwise, and the graph of the last round is then patched with the scripts that
+    changed: a re-export that leaves every program as it was is not written at all, and
+    otherwise only the data files those scripts touch are serialized again. Several files
+    are merged again, with the unchanged ones from the cache.
+    """
+    if is_multi_file(args.dat_files):
+        list_paths = lambda: expand_dat_paths(args.dat_files, report_missing=False)
+    else:
+        list_paths = lambda: args.dat_files
+    # The graph of the last round and what was derived from it (see build_graph_page)
+    state = {}
+    try:
+        # The first round writes the page for the files as they are when watching starts
+        for round_index, changed_paths in enumerate(watch_files(list_paths)):
+            if round_index:
+                print(f"{', '.join(changed_paths)} changed; regenerating the graph...")
+            start = time.perf_counter()
+            try:
+                changes = {} if args.incremental else None
+                scripts = load_scripts(args, changes)
+                changed = None
+                if state and changes:
+                    changed = changes["added"] + changes["changed"] + changes["removed"]
+                if not scripts:
+                    # The incremental state may have moved on without the graph
+                    state.clear()
+                    print("No scripts were loaded; the graph was left as it was.")
+                elif changed == []:
+                    print("No program changed; the graph is up to date.")
+                else:
+                    write_graph(args, scripts, state, changed)
+            except OSError as e:
+                state.clear()
+                print(f"Error regenerating the graph: {e}")
+            if round_index:
+                print(f"Done in {time.perf_counter() - start:.2f}s.")
+            else:
+                print(f"Watching {', '.join(args.dat_files)} for changes; press Ctrl+C to stop.")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates the interactive script dependency graph.")
+    parser.add_argument("dat_files", nargs="*",
+                        help="the .dat exports to read: files, directories or glob patterns, merged into one "
+                             "graph (a file picker opens when they are left out)")
+    parser.add_argument("--precedence", choices=PRECEDENCE_RULES, default="first",
+                        help="which file's definition wins when several define a program (default: first)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_PATH,
+                        help=f"where to write the graph page (default: {DEFAULT_OUTPUT_PATH})")
+    parser.add_argument("--shard-data", action="store_true",
+                        help="write the graph data to files next to the page, loaded as needed")
+    parser.add_argument("--shard-size", type=int, default=DATA_SHARD_SIZE,
+                        help=f"scripts per data file with --shard-data (default: {DATA_SHARD_SIZE})")
+    parser.add_argument("--layout", choices=("physics", "layered"), default="physics",
+                        help="physics: laid out in the browser; layered: coordinates computed here, physics off")
+    parser.add_argument("--assets", choices=("cdn", "local"), default="cdn",
+                        help="load vis-network from its CDN, or from the lib directory shared by all pages")
+    parser.add_argument("--minify", action="store_true",
+                        help="strip indentation and comments out of the page")
+    parser.add_argument("--parallel", action="store_true",
+                        help="parse the .dat file across a pool of worker processes")
+    parser.add_argument("--workers", type=int,
+                        help="number of worker processes for --parallel and for reading several files")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="re-parse the .dat file even if a cached graph for it is still valid")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the parsed graph cache")
+    parser.add_argument("--cache-dir", help="directory for the parsed graph cache")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-parse the program blocks that changed since the last incremental run")
+    parser.add_argument("--profile-report",
+                        help="write the time, CPU and peak memory of every stage to this file as JSON lines (- for stderr)")
+    parser.add_argument("--cprofile", help="also run under cProfile and dump its stats to this file")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and regenerate the page whenever the .dat files change, re-parsing "
+                             "a single file incrementally unless --no-cache or --parallel is given (best with "
+                             "--shard-data, which only rewrites the data files that changed)")
+    args = parser.parse_args(argv)
+    if args.incremental and is_multi_file(args.dat_files):
+        parser.error("--incremental reads a single .dat file")
+    if args.incremental and args.no_cache:
+        parser.error("--incremental keeps the state of the last run in the cache; it can't be used with --no-cache")
+    if args.watch and not args.dat_files:
+        parser.error("--watch needs the .dat files to watch")
+    if args.watch and not is_multi_file(args.dat_files) and not (args.no_cache or args.parallel):
+        # Re-exports are parsed only where they changed, and the graph patched with that
+        args.incremental = True
+
+    if args.profile_report or args.cprofile:
+        start_profiling(args.profile_report, args.cprofile)
+    try:
+        if args.watch:
+            return watch(args)
+        return generate(args)
+    finally:
+        stop_profiling()
+
+if __name__ == "__main__":
+    sys.exit(main())
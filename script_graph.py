@@ -0,0 +1,395 @@
+import operator
+import sys
+from array import array
+from collections.abc import Mapping
+from itertools import chain, compress, repeat
+from operator import itemgetter
+
+# Typecode of every id and offset array in the graph (signed 32 bit)
+ID_TYPECODE = 'i'
+
+class Adjacency:
+    """
+    Compressed sparse row adjacency: the neighbours of node i are
+    targets[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_lists(cls, neighbour_lists):
+        """
+        Builds the adjacency from one list of neighbour ids per node.
+        """
+        offsets = array(ID_TYPECODE, [0])
+        targets = array(ID_TYPECODE)
+        for neighbours in neighbour_lists:
+            targets.extend(neighbours)
+            offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def neighbors(self, node):
+        """
+        Returns the neighbour ids of a node as an array slice.
+        """
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def degree(self, node):
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def reversed(self, node_count):
+        """
+        Returns the transposed adjacency over node_count target nodes, using a counting sort
+        so neighbours keep the order of their source ids.
+        """
+        counts = array(ID_TYPECODE, bytes(4 * (node_count + 1)))
+        for target in self.targets:
+            counts[target + 1] += 1
+        for node in range(node_count):
+            counts[node + 1] += counts[node]
+        offsets = array(ID_TYPECODE, counts)
+        targets = array(ID_TYPECODE, bytes(4 * len(self.targets)))
+        for source in range(len(self)):
+            for index in range(self.offsets[source], self.offsets[source + 1]):
+                target = self.targets[index]
+                targets[counts[target]] = source
+                counts[target] += 1
+        return Adjacency(offsets, targets)
+
+    def patched(self, sources, remap, rows):
+        """
+        Returns a new adjacency with one node per entry of sources: node n gets the neighbours
+        of node sources[n] of this one mapped through remap (new id by old id), or rows[n] when
+        n is a key of rows; -1 in sources means no neighbours. Runs of nodes whose sources are
+        consecutive are copied as one array slice.
+        """
+        if len(remap) == len(self) and remap == list(range(len(remap))):
+            remapped = self.targets
+        else:
+            remapped = array(ID_TYPECODE, map(remap.__getitem__, self.targets))
+        node_count = len(sources)
+        # A run ends where the next source isn't one more, and around every node of rows
+        if sources == list(range(node_count)):
+            breaks = set(rows)
+        else:
+            breaks = set(compress(range(1, node_count), map(operator.ne, map(operator.sub, sources[1:], sources),
+                                                           repeat(1))))
+            breaks.update(rows)
+        breaks.update(node + 1 for node in rows)
+        breaks.update(node + 1 for node in compress(range(node_count), map(operator.lt, sources, repeat(0))))
+        breaks.discard(0)
+        breaks = sorted(node for node in breaks if node < node_count)
+        runs = zip([0] + breaks, breaks + [node_count]) if node_count else ()
+
+        old_offsets = self.offsets
+        offsets = array(ID_TYPECODE, [0])
+        targets = array(ID_TYPECODE)
+        for start, end in runs:
+            source = sources[start]
+            if source < 0 or start in rows:
+                targets.extend(rows.get(start, ()))
+                offsets.append(len(targets))
+                continue
+            source_end = source + end - start
+            shift = len(targets) - old_offsets[source]
+            targets.extend(remapped[old_offsets[source]:old_offsets[source_end]])
+            offsets.extend(map(shift.__add__, old_offsets[source + 1:source_end + 1]))
+        return Adjacency(offsets, targets)
+
+class ScriptGraph:
+    """
+    Compact call graph of the cleaned scripts.
+    Script and job names are interned to integer ids and calls and job links are stored as
+    CSR adjacency arrays, in both directions. Ids 0 .. script_count - 1 are the scripts that
+    are defined in the .dat file, in file order; higher ids are programs that are only ever
+    called (placeholders). origin holds the .dat file each script was taken from when several
+    files were merged, "" otherwise.
+    The reversed adjacencies (callers, da2_job_scripts, ops_job_scripts) can be passed in when
+    they are already known, as a loaded snapshot does; the name -> id maps are built on first use.
+    """
+
+    def __init__(self, names, script_count, calls, da2_job_names, da2_jobs, ops_job_names, ops_jobs,
+                 compiled_by=None, source=None, last_run_by=None, origin=None,
+                 callers=None, da2_job_scripts=None, ops_job_scripts=None):
+        self.names = names
+        self.script_count = script_count
+        self.calls = calls
+        self.callers = callers if callers is not None else calls.reversed(len(names))
+        self.da2_job_names = da2_job_names
+        self.da2_jobs = da2_jobs
+        self.da2_job_scripts = da2_job_scripts if da2_job_scripts is not None else da2_jobs.reversed(len(da2_job_names))
+        self.ops_job_names = ops_job_names
+        self.ops_jobs = ops_jobs
+        self.ops_job_scripts = ops_job_scripts if ops_job_scripts is not None else ops_jobs.reversed(len(ops_job_names))
+        self.compiled_by = compiled_by or [""] * script_count
+        self.source = source or [""] * script_count
+        self.last_run_by = last_run_by or [""] * script_count
+        self.origin = origin or [""] * script_count
+        self._name_ids = None
+        self._da2_job_ids = None
+        self._ops_job_ids = None
+        self._condensation = None
+
+    @classmethod
+    def from_scripts(cls, scripts):
+        """
+        Builds the graph from cleaned script objects, as returned by get_scripts.
+        """
+        names = []
+        name_ids = {}
+        for script in scripts:
+            name = sys.intern(script["name"])
+            if name not in name_ids:
+                name_ids[name] = len(names)
+                names.append(name)
+        script_count = len(names)
+
+        def intern_id(table, ids, name):
+            node = ids.get(name)
+            if node is None:
+                name = sys.intern(name)
+                node = ids[name] = len(table)
+                table.append(name)
+            return node
+
+        da2_job_names, da2_job_ids = [], {}
+        ops_job_names, ops_job_ids = [], {}
+        call_lists, da2_lists, ops_lists = [], [], []
+        compiled_by, source, last_run_by, origin = [], [], [], []
+        seen = set()
+        for script in scripts:
+            if script["name"] in seen:
+                continue
+            seen.add(script["name"])
+            call_lists.append([intern_id(names, name_ids, called) for called in script.get("calls") or []])
+            da2_lists.append([intern_id(da2_job_names, da2_job_ids, job) for job in script.get("da2_jobs") or []])
+            ops_lists.append([intern_id(ops_job_names, ops_job_ids, job) for job in script.get("ops_jobs") or []])
+            compiled_by.append(sys.intern(script.get("compiled_by", "")))
+            source.append(sys.intern(script.get("source", "")))
+            last_run_by.append(sys.intern(script.get("last_run_by", "")))
+            origin.append(sys.intern(script.get("origin", "")))
+
+        # Placeholders have no calls of their own
+        call_lists.extend([] for _ in range(len(names) - script_count))
+        return cls(names, script_count, Adjacency.from_lists(call_lists),
+                   da2_job_names, Adjacency.from_lists(da2_lists),
+                   ops_job_names, Adjacency.from_lists(ops_lists),
+                   compiled_by, source, last_run_by, origin)
+
+    def patched(self, scripts, changed):
+        """
+        Returns the graph of scripts, the cleaned script objects of the same .dat file after an
+        edit as get_scripts returns them, exactly as from_scripts would build it, given the
+        names of the scripts added, changed or removed since this graph was built
+        (update_scripts_incremental reports them). Only the rows of those scripts are interned
+        again; the other rows, and the callers and job script lists they don't touch, are
+        copied over from this graph.
+        """
+        names = list(map(sys.intern, map(itemgetter("name"), scripts)))
+        script_count = len(names)
+        name_ids = dict(zip(names, range(script_count)))
+        for name in dict.fromkeys(chain.from_iterable(map(itemgetter("calls"), scripts))):
+            if name not in name_ids:
+                name_ids[name] = len(names)
+                names.append(sys.intern(name))
+        da2_job_names = list(map(sys.intern, dict.fromkeys(chain.from_iterable(map(itemgetter("da2_jobs"), scripts)))))
+        ops_job_names = list(map(sys.intern, dict.fromkeys(chain.from_iterable(map(itemgetter("ops_jobs"), scripts)))))
+        da2_job_ids = dict(zip(da2_job_names, range(len(da2_job_names))))
+        ops_job_ids = dict(zip(ops_job_names, range(len(ops_job_names))))
+
+        # The old script each script's rows are copied from, -1 for the ones interned again
+        sources = list(map(self.name_ids.get, names[:script_count], repeat(-1)))
+        for node in compress(range(script_count), map(operator.ge, sources, repeat(self.script_count))):
+            sources[node] = -1
+        for name in changed:
+            node = name_ids.get(name)
+            if node is not None and node < script_count:
+                sources[node] = -1
+        fresh = [node for node in compress(range(script_count), map(operator.lt, sources, repeat(0)))]
+        call_rows = {node: [name_ids[name] for name in scripts[node]["calls"]] for node in fresh}
+        da2_rows = {node: [da2_job_ids[job] for job in scripts[node]["da2_jobs"]] for node in fresh}
+        ops_rows = {node: [ops_job_ids[job] for job in scripts[node]["ops_jobs"]] for node in fresh}
+
+        calls = self.calls.patched(sources + [-1] * (len(names) - script_count),
+                                   list(map(name_ids.get, self.names, repeat(-1))), call_rows)
+        da2_jobs = self.da2_jobs.patched(sources, list(map(da2_job_ids.get, self.da2_job_names, repeat(-1))), da2_rows)
+        ops_jobs = self.ops_jobs.patched(sources, list(map(ops_job_ids.get, self.ops_job_names, repeat(-1))), ops_rows)
+
+        def attributes(values, key):
+            patched_values = list(map(values.__getitem__, sources))
+            for node in fresh:
+                patched_values[node] = sys.intern(scripts[node].get(key, ""))
+            return patched_values
+
+        callers = da2_job_scripts = ops_job_scripts = None
+        kept = [source for source in sources if source >= 0]
+        # Copied rows keep their order only while the scripts that stayed keep theirs
+        if all(map(operator.lt, kept, kept[1:])):
+            kept_ids = [-1] * self.script_count
+            for node in compress(range(script_count), map(operator.ge, sources, repeat(0))):
+                kept_ids[sources[node]] = node
+            stale = [old_node for old_node in compress(range(self.script_count), map(operator.lt, kept_ids, repeat(0)))]
+            callers = _patch_reversed(self.callers, self.calls, self.names, self.name_ids, names, name_ids,
+                                      kept_ids, stale, call_rows)
+            da2_job_scripts = _patch_reversed(self.da2_job_scripts, self.da2_jobs, self.da2_job_names,
+                                              self.da2_job_ids, da2_job_names, da2_job_ids, kept_ids, stale, da2_rows)
+            ops_job_scripts = _patch_reversed(self.ops_job_scripts, self.ops_jobs, self.ops_job_names,
+                                              self.ops_job_ids, ops_job_names, ops_job_ids, kept_ids, stale, ops_rows)
+        graph = ScriptGraph(names, script_count, calls, da2_job_names, da2_jobs, ops_job_names, ops_jobs,
+                            attributes(self.compiled_by, "compiled_by"), attributes(self.source, "source"),
+                            attributes(self.last_run_by, "last_run_by"), attributes(self.origin, "origin"),
+                            callers, da2_job_scripts, ops_job_scripts)
+        graph._name_ids, graph._da2_job_ids, graph._ops_job_ids = name_ids, da2_job_ids, ops_job_ids
+        return graph
+
+    @property
+    def name_ids(self):
+        if self._name_ids is None:
+            self._name_ids = {name: node for node, name in enumerate(self.names)}
+        return self._name_ids
+
+    @property
+    def da2_job_ids(self):
+        if self._da2_job_ids is None:
+            self._da2_job_ids = {job: job_id for job_id, job in enumerate(self.da2_job_names)}
+        return self._da2_job_ids
+
+    @property
+    def ops_job_ids(self):
+        if self._ops_job_ids is None:
+            self._ops_job_ids = {job: job_id for job_id, job in enumerate(self.ops_job_names)}
+        return self._ops_job_ids
+
+    def __len__(self):
+        return self.script_count
+
+    def __contains__(self, name):
+        node = self.name_ids.get(name)
+        return node is not None and node < self.script_count
+
+    def is_placeholder(self, node):
+        return node >= self.script_count
+
+    def node_id(self, name):
+        """
+        Returns the id of a script or placeholder name, or None if the graph doesn't know it.
+        """
+        return self.name_ids.get(name)
+
+    def condensation(self):
+        """
+        Returns the graph_analysis.Condensation of the calls, computed on first use.
+        """
+        if self._condensation is None:
+            from graph_analysis import Condensation
+            self._condensation = Condensation(self.calls)
+        return self._condensation
+
+    def calls_of(self, name):
+        """
+        Returns the names of the programs a script calls directly.
+        """
+        node = self.name_ids[name]
+        return [self.names[target] for target in self.calls.neighbors(node)]
+
+    def callers_of(self, name):
+        """
+        Returns the names of the scripts that call a program directly.
+        """
+        node = self.name_ids[name]
+        return [self.names[source] for source in self.callers.neighbors(node)]
+
+    def da2_jobs_of(self, name):
+        node = self.name_ids[name]
+        return [self.da2_job_names[job] for job in self.da2_jobs.neighbors(node)] if node < self.script_count else []
+
+    def ops_jobs_of(self, name):
+        node = self.name_ids[name]
+        return [self.ops_job_names[job] for job in self.ops_jobs.neighbors(node)] if node < self.script_count else []
+
+    def scripts_view(self):
+        """
+        Returns a read-only mapping of script name -> {"da2_jobs", "ops_jobs", "calls"}, the
+        shape of the visualizer's scripts_dict, built on access.
+        """
+        return ScriptsView(self)
+
+    def to_scripts(self):
+        """
+        Returns the graph as a list of script objects in the format of get_scripts.
+        Scripts merged from several files (see get_scripts_from_files) keep their "origin".
+        """
+        scripts = []
+        for node in range(self.script_count):
+            script = {
+                "name": self.names[node],
+                "da2_jobs": [self.da2_job_names[job] for job in self.da2_jobs.neighbors(node)],
+                "ops_jobs": [self.ops_job_names[job] for job in self.ops_jobs.neighbors(node)],
+                "calls": [self.names[target] for target in self.calls.neighbors(node)],
+                "compiled_by": self.compiled_by[node],
+                "source": self.source[node],
+                "last_run_by": self.last_run_by[node]
+            }
+            if self.origin[node]:
+                script["origin"] = self.origin[node]
+            scripts.append(script)
+        return scripts
+
+def _patch_reversed(old_reversed, old_adjacency, old_names, old_ids, names, name_ids, kept_ids, stale, rows):
+    """
+    Patches a reversed adjacency (callers, or the scripts of each job) for ScriptGraph.patched.
+    old_adjacency is the forward adjacency it was reversed from, over the targets old_names
+    (old_ids by name); kept_ids maps each old script to its new id, stale lists the old
+    scripts that have none and rows holds the new forward rows of the scripts interned again.
+    Only the targets of the stale scripts' old rows and of the new rows get a new list of
+    sources.
+    """
+    added = {}
+    for node, row in rows.items():
+        for target in row:
+            added.setdefault(target, []).append(node)
+    for old_node in stale:
+        for target in old_adjacency.neighbors(old_node):
+            new_target = name_ids.get(old_names[target])
+            if new_target is not None:
+                added.setdefault(new_target, [])
+    patched_rows = {}
+    for target, nodes in added.items():
+        old_target = old_ids.get(names[target], -1)
+        kept = [kept_ids[source] for source in old_reversed.neighbors(old_target)] if old_target >= 0 else []
+        patched_rows[target] = sorted([node for node in kept if node >= 0] + nodes)
+    return old_reversed.patched(list(map(old_ids.get, names, repeat(-1))), kept_ids, patched_rows)
+
+class ScriptsView(Mapping):
+    """
+    Dict-like adapter over a ScriptGraph for code written against scripts_dict.
+    Only defined scripts are keys; placeholders are not.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, name):
+        graph = self._graph
+        node = graph.name_ids.get(name)
+        if node is None or node >= graph.script_count:
+            raise KeyError(name)
+        return {
+            "da2_jobs": [graph.da2_job_names[job] for job in graph.da2_jobs.neighbors(node)],
+            "ops_jobs": [graph.ops_job_names[job] for job in graph.ops_jobs.neighbors(node)],
+            "calls": [graph.names[target] for target in graph.calls.neighbors(node)]
+        }
+
+    def __iter__(self):
+        return iter(self._graph.names[:self._graph.script_count])
+
+    def __len__(self):
+        return self._graph.script_count
+
+    def __contains__(self, name):
+        return name in self._graph
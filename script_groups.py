@@ -0,0 +1,38 @@
+from array import array
+
+from script_graph import ID_TYPECODE
+
+# Group of the scripts that have no value for a grouping
+NO_GROUP = "(none)"
+
+def build_script_groups(graph):
+    """
+    Returns the groupings the visualizer page collapses long neighbour lists by:
+    "source" (the source prefix, see source_prefix), "da2" (the first DA2 job) and "compiler"
+    (compiled by). Each one is a group_scripts result.
+    """
+    da2_jobs = graph.da2_jobs
+    return {
+        "source": group_scripts(graph, lambda node: source_prefix(graph.source[node])),
+        "da2": group_scripts(graph, lambda node: graph.da2_job_names[da2_jobs.targets[da2_jobs.offsets[node]]]
+                             if da2_jobs.degree(node) else ""),
+        "compiler": group_scripts(graph, lambda node: graph.compiled_by[node])
+    }
+
+def group_scripts(graph, key_of):
+    """
+    Groups the scripts of the graph by key_of(node), with an empty key meaning NO_GROUP.
+    Returns {"names": the group names, sorted, "of": array of the group id of every script}.
+    """
+    keys = [key_of(node) or NO_GROUP for node in range(graph.script_count)]
+    names = sorted(set(keys))
+    group_ids = {name: group for group, name in enumerate(names)}
+    return {"names": names, "of": array(ID_TYPECODE, [group_ids[key] for key in keys])}
+
+def source_prefix(source):
+    """
+    Returns the part of a source path before its first ':', e.g. "cust_script" for
+    "cust_script:my_program.prg", or "" when it has none.
+    """
+    prefix, separator, _ = source.partition(":")
+    return prefix if separator else ""
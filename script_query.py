@@ -0,0 +1,129 @@
+"""
+Answers dependency questions about scripts and the jobs that run them from the command line.
+
+    python script_query.py EXPORT.dat MY_SCRIPT --depth 3
+    python script_query.py EXPORT.dat MY_SCRIPT --direction up
+    python script_query.py EXPORT.dat --cycles
+    python script_query.py EXPORT.dat --job NIGHTLY_LOAD --job OPS_REPORTS
+    python script_query.py EXPORT.dat MY_SCRIPT --direction up --affected-jobs
+    python script_query.py EXPORT.dat MY_SCRIPT --snapshot export.graph
+"""
+import argparse
+import sys
+
+import graph_cache
+from graph_analysis import affected_jobs, cone, downstream, find_cycles, group_by_depth, job_scripts, upstream
+from script_data import get_scripts, load_graph_snapshot, normalize_program_name, save_graph_snapshot
+from script_graph import ScriptGraph
+
+
+def print_cone(title, depths):
+    print(f"{title} ({len(depths)}):")
+    for depth, names in enumerate(group_by_depth(depths), start=1):
+        # Job depths can skip a level: the script itself may not be run by any job
+        if names:
+            print(f"  depth {depth}: {', '.join(names)}")
+
+
+def print_names(title, names):
+    print(f"{title} ({len(names)}):")
+    if names:
+        print(f"  {', '.join(names)}")
+
+
+def print_cycles(cycles):
+    print(f"Call cycles ({len(cycles)}):")
+    for cycle in cycles:
+        print(f"  {len(cycle)} scripts: {', '.join(cycle)}")
+
+
+def load_graph(dat_file, use_cache, cache_dir, snapshot_path=None):
+    """
+    Returns the ScriptGraph of the .dat file, from the snapshot when one is given and still
+    current, otherwise parsed (and saved to the snapshot for the next query).
+    """
+    if snapshot_path:
+        graph = load_graph_snapshot(snapshot_path, dat_file)
+        if graph is not None:
+            return graph
+    fingerprint = None
+    if snapshot_path:
+        # Taken before parsing, so a file rewritten meanwhile leaves the snapshot stale
+        try:
+            fingerprint = graph_cache.fingerprint_dat_file(dat_file)
+        except OSError as e:
+            print(f"Error checking {dat_file}: {e}")
+    scripts = get_scripts(dat_file, use_cache=use_cache, cache_dir=cache_dir)
+    graph = ScriptGraph.from_scripts(scripts)
+    del scripts
+    if snapshot_path:
+        save_graph_snapshot(graph, snapshot_path, dat_file, fingerprint)
+    return graph
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lists the scripts a script calls and is called by, and the jobs that run them.")
+    parser.add_argument("dat_file", help="the .dat export to read")
+    parser.add_argument("script", nargs="?", help="name of the script to look up")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="how many calls to follow (default: the whole cone, listed without depths)")
+    parser.add_argument("--direction", choices=("down", "up", "both"), default="both",
+                        help="down: scripts it calls, up: scripts that call it")
+    parser.add_argument("--cycles", action="store_true",
+                        help="list the recursive EXECUTE cycles of the whole graph")
+    parser.add_argument("--job", action="append", default=[],
+                        help="list the scripts a DA2 or OPS job runs, transitively (repeat for a set of jobs)")
+    parser.add_argument("--affected-jobs", action="store_true",
+                        help="list the DA2 and OPS jobs that run the script, directly or through its callers")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the parsed graph cache")
+    parser.add_argument("--cache-dir", help="directory for the parsed graph cache")
+    parser.add_argument("--snapshot",
+                        help="graph snapshot file to load instead of parsing, rewritten when the .dat file changed")
+    args = parser.parse_args(argv)
+    if not args.script and not args.cycles and not args.job:
+        parser.error("a script name, --job or --cycles is required")
+    if args.affected_jobs and not args.script:
+        parser.error("--affected-jobs needs a script name")
+
+    graph = load_graph(args.dat_file, not args.no_cache, args.cache_dir, args.snapshot)
+
+    if args.cycles:
+        print_cycles(find_cycles(graph))
+    if args.job:
+        da2_jobs = [job for job in args.job if job in graph.da2_job_ids]
+        ops_jobs = [job for job in args.job if job in graph.ops_job_ids]
+        missing = [job for job in args.job if job not in graph.da2_job_ids and job not in graph.ops_job_ids]
+        if missing:
+            print(f"Job not found: {', '.join(missing)}")
+            return 1
+        print_cone(f"Scripts run by {', '.join(args.job)}", job_scripts(graph, da2_jobs, ops_jobs, args.depth))
+    if not args.script:
+        return 0
+
+    name = normalize_program_name(args.script)
+    if graph.node_id(name) is None:
+        print(f"Script not found: {name}")
+        return 1
+
+    if args.depth is None:
+        # Whole cones walk the condensed DAG, where a cycle is one node; a script in a cycle
+        # is listed in its own cones
+        if args.direction in ("down", "both"):
+            print_names("Calls", cone(graph, name))
+        if args.direction in ("up", "both"):
+            print_names("Called by", cone(graph, name, reverse=True))
+    else:
+        if args.direction in ("down", "both"):
+            print_cone("Calls", downstream(graph, name, args.depth))
+        if args.direction in ("up", "both"):
+            print_cone("Called by", upstream(graph, name, args.depth))
+    if args.affected_jobs:
+        da2, ops = affected_jobs(graph, [name])
+        print_cone("DA2 jobs affected", da2)
+        print_cone("OPS jobs affected", ops)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# Keys are indexed by the distinct lowercase substrings of this length they contain
+GRAM_SIZE = 3
+
+def build_search_index(graph):
+    """
+    Returns the search index of the visualizer page for a ScriptGraph: one index each for
+    script names ("name") and the DA2 and OPS job names ("da2", "ops"). See index_keys.
+    """
+    return {
+        "name": index_keys(graph.names[:graph.script_count]),
+        "da2": index_keys(graph.da2_job_names, graph.da2_job_scripts, graph.names),
+        "ops": index_keys(graph.ops_job_names, graph.ops_job_scripts, graph.names)
+    }
+
+def update_search_index(index, old_graph, graph):
+    """
+    Returns the search index of graph given index, the one of old_graph. The index of a
+    namespace whose keys are the same in both graphs is reused: the "name" index as is, the
+    keys and grams of a job index with the scripts of each job listed again.
+    """
+    updated = {}
+    if _same_keys(old_graph.names[:old_graph.script_count], graph.names[:graph.script_count]):
+        updated["name"] = index["name"]
+    else:
+        updated["name"] = index_keys(graph.names[:graph.script_count])
+    for namespace, old_keys, keys, key_ids, key_scripts in (
+            ("da2", old_graph.da2_job_names, graph.da2_job_names, graph.da2_job_ids, graph.da2_job_scripts),
+            ("ops", old_graph.ops_job_names, graph.ops_job_names, graph.ops_job_ids, graph.ops_job_scripts)):
+        if _same_keys(old_keys, keys):
+            updated[namespace] = {
+                "keys": index[namespace]["keys"],
+                "grams": index[namespace]["grams"],
+                "scripts": [[graph.names[node] for node in key_scripts.neighbors(key_ids[key])]
+                            for key in index[namespace]["keys"]]
+            }
+        else:
+            updated[namespace] = index_keys(keys, key_scripts, graph.names)
+    return updated
+
+def _same_keys(old_keys, keys):
+    return len(old_keys) == len(keys) and (old_keys == keys or set(old_keys) == set(keys))
+
+def index_keys(keys, key_scripts=None, names=None):
+    """
+    Builds the index of one namespace of distinct keys:
+        "keys": the keys, sorted case-insensitively in UTF-16 order, the way the page compares
+                strings, so prefix matches are a binary search away
+        "grams": lowercase GRAM_SIZE-grams -> ids (positions in "keys") of the keys containing
+                 them, ascending and delta-encoded; a substring query only checks the keys in
+                 the shortest list among its grams
+        "scripts": for job keys, the names of the scripts of each key (key_scripts is the
+                   job -> script adjacency of the graph and names its node names)
+    """
+    order = sorted(range(len(keys)), key=lambda key_id: _sort_key(keys[key_id]))
+    sorted_keys = [keys[key_id] for key_id in order]
+
+    grams = {}
+    for key_id, key in enumerate(sorted_keys):
+        lower = key.lower()
+        # dict.fromkeys drops repeated grams in the order they occur, so the index comes out
+        # the same on every run (a set's order changes with the string hash seed)
+        for gram in dict.fromkeys(lower[i:i + GRAM_SIZE] for i in range(len(lower) - GRAM_SIZE + 1)):
+            ids = grams.get(gram)
+            if ids is None:
+                grams[gram] = [key_id]
+            else:
+                ids.append(key_id)
+
+    index = {"keys": sorted_keys, "grams": {gram: _delta_encode(ids) for gram, ids in grams.items()}}
+    if key_scripts is not None:
+        index["scripts"] = [[names[node] for node in key_scripts.neighbors(key_id)] for key_id in order]
+    return index
+
+def _sort_key(key):
+    return key.lower().encode("utf-16-be"), key.encode("utf-16-be")
+
+def _delta_encode(ids):
+    previous = 0
+    deltas = []
+    for key_id in ids:
+        deltas.append(key_id - previous)
+        previous = key_id
+    return deltas
+
+def gram_file(gram, file_count):
+    """
+    Returns which of file_count files holds the postings of a gram when an index is written
+    in pieces: a 31-based hash of its UTF-16 code units, modulo file_count. The page hashes
+    the grams of what is typed the same way, with Math.imul and charCodeAt.
+    """
+    data = gram.encode("utf-16-be")
+    hash_value = 0
+    for i in range(0, len(data), 2):
+        hash_value = (hash_value * 31 + (data[i] << 8 | data[i + 1])) & 0xFFFFFFFF
+    return hash_value % file_count
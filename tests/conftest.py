@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The tests compare the parsers with the baseline parser the benchmarks time them against
+sys.path.append(os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,127 @@
+import random
+import sys
+
+import pytest
+
+from graph_analysis import (Condensation, affected_jobs, cone, find_cycles, job_scripts,
+                            strongly_connected_components)
+from script_graph import Adjacency, ScriptGraph
+
+
+def script(name, calls=(), da2_jobs=(), ops_jobs=()):
+    return {"name": name, "da2_jobs": list(da2_jobs), "ops_jobs": list(ops_jobs), "calls": list(calls),
+            "compiled_by": "", "source": "", "last_run_by": ""}
+
+
+# a -> b -> c -> a is a cycle, d calls itself, e reaches the cycle and the placeholder x
+SCRIPTS = [
+    script("a", ["b"]),
+    script("b", ["c", "x"]),
+    script("c", ["a"]),
+    script("d", ["d", "a"]),
+    script("e", ["d", "x"]),
+    script("f"),
+]
+
+
+def closure(adjacency):
+    """
+    The nodes reachable from every node in one or more steps, by brute force.
+    """
+    reachable = [set(adjacency.neighbors(node)) for node in range(len(adjacency))]
+    changed = True
+    while changed:
+        changed = False
+        for nodes in reachable:
+            grown = nodes.union(*(reachable[node] for node in nodes))
+            if grown != nodes:
+                nodes |= grown
+                changed = True
+    return reachable
+
+
+def random_adjacency(seed, node_count=12):
+    rng = random.Random(seed)
+    return Adjacency.from_lists([rng.sample(range(node_count), rng.randint(0, 3)) for _ in range(node_count)])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_components_are_the_nodes_that_reach_each_other(seed):
+    adjacency = random_adjacency(seed)
+    reachable = closure(adjacency)
+    component_of, component_count = strongly_connected_components(adjacency)
+    assert sorted(set(component_of)) == list(range(component_count))
+    for node in range(len(adjacency)):
+        for other in range(len(adjacency)):
+            same = node == other or (other in reachable[node] and node in reachable[other])
+            assert (component_of[node] == component_of[other]) == same
+            # Calls point from a higher component id to a lower one
+            if other in adjacency.neighbors(node):
+                assert component_of[node] >= component_of[other]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_condensation_cone_matches_the_closure(seed):
+    adjacency = random_adjacency(seed)
+    reachable = closure(adjacency)
+    condensation = Condensation(adjacency)
+    reversed_adjacency = adjacency.reversed(len(adjacency))
+    reaching = closure(reversed_adjacency)
+    for node in range(len(adjacency)):
+        assert sorted(condensation.cone(node)) == sorted(reachable[node])
+        assert sorted(condensation.cone(node, reverse=True)) == sorted(reaching[node])
+
+
+def test_cone_and_cycles_of_a_script_graph():
+    graph = ScriptGraph.from_scripts(SCRIPTS)
+    assert sorted(cone(graph, "e")) == ["a", "b", "c", "d", "x"]
+    assert sorted(cone(graph, "a")) == ["a", "b", "c", "x"]
+    assert sorted(cone(graph, "a", reverse=True)) == ["a", "b", "c", "d", "e"]
+    assert cone(graph, "f") == []
+    assert find_cycles(graph) == [["a", "b", "c"], ["d"]]
+
+
+def test_cycles_of_the_same_size_come_in_file_order():
+    graph = ScriptGraph.from_scripts([script("a", ["b"]), script("p", ["p"]), script("b", ["a"]),
+                                      script("q", ["r"]), script("r", ["q"])])
+    assert find_cycles(graph) == [["a", "b"], ["q", "r"], ["p"]]
+
+
+def test_a_call_chain_deeper_than_the_recursion_limit():
+    length = sys.getrecursionlimit() * 5
+    scripts = [script(f"s{index}", [f"s{index + 1}"]) for index in range(length)]
+    scripts.append(script(f"s{length}", ["s0"]))
+    graph = ScriptGraph.from_scripts(scripts)
+    assert find_cycles(graph) == [[f"s{index}" for index in range(length + 1)]]
+
+    chain = ScriptGraph.from_scripts(scripts[:-1])
+    assert find_cycles(chain) == []
+    assert len(cone(chain, "s0")) == length
+    assert len(chain.condensation()) == length + 1
+
+
+# J1 runs a and e, J2 runs b, O1 runs d and O2 runs e; x is a placeholder
+JOB_SCRIPTS = [
+    script("a", ["b"], ["J1"]),
+    script("b", ["c", "x"], ["J2"]),
+    script("c", ["d"]),
+    script("d", [], [], ["O1"]),
+    script("e", ["c"], ["J1"], ["O2"]),
+]
+
+
+def test_job_scripts_are_the_scripts_a_job_runs_and_what_they_call():
+    graph = ScriptGraph.from_scripts(JOB_SCRIPTS)
+    assert job_scripts(graph, ["J1"]) == {"a": 1, "e": 1, "b": 2, "c": 2, "d": 3, "x": 3}
+    assert job_scripts(graph, ["J1"], max_depth=2) == {"a": 1, "e": 1, "b": 2, "c": 2}
+    assert job_scripts(graph, ["J1"], max_depth=1) == {"a": 1, "e": 1}
+    assert job_scripts(graph, ["J2"], ["O1"]) == {"b": 1, "d": 1, "c": 2, "x": 2}
+    assert job_scripts(graph, ops_jobs=["O1"]) == {"d": 1}
+
+
+def test_affected_jobs_keep_the_depth_of_their_nearest_script():
+    graph = ScriptGraph.from_scripts(JOB_SCRIPTS)
+    # d is run by O1 itself, c calls it, and b and e call c; a reaches J1 one call further than e
+    assert affected_jobs(graph, ["d"]) == ({"J2": 3, "J1": 3}, {"O1": 1, "O2": 3})
+    assert affected_jobs(graph, ["x"]) == ({"J2": 2, "J1": 3}, {})
+    assert affected_jobs(graph, ["a", "d"]) == ({"J1": 1, "J2": 3}, {"O1": 1, "O2": 3})
@@ -0,0 +1,90 @@
+import os
+
+import graph_cache
+import script_data
+from script_data import get_scripts
+
+EXPORT = b"<<DA2: J1 >>\nCREATE PROGRAM a go\n  EXECUTE b\nEND GO\nCREATE PROGRAM b go\nEND GO\n"
+
+
+def write_export(tmp_path, data, mtime_ns):
+    path = tmp_path / "export.dat"
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def fail_to_parse(path):
+    raise AssertionError(f"{path} was parsed again")
+
+
+def test_an_unchanged_file_is_served_from_the_cache(tmp_path, monkeypatch):
+    path = write_export(tmp_path, EXPORT, 10 ** 9)
+    cache_dir = str(tmp_path / "cache")
+    scripts = get_scripts(path, use_cache=True, cache_dir=cache_dir)
+    assert [script["name"] for script in scripts] == ["a", "b"]
+
+    monkeypatch.setattr(script_data, "parse_dat_file", fail_to_parse)
+    assert get_scripts(path, use_cache=True, cache_dir=cache_dir) == scripts
+    # Touched without a change: still a hit, and the new modification time is remembered
+    os.utime(path, ns=(2 * 10 ** 9, 2 * 10 ** 9))
+    assert graph_cache.load_cached_scripts(path, cache_dir) == scripts
+    entry = graph_cache._read_entry(graph_cache.cache_entry_path(path, cache_dir))
+    assert entry["fingerprint"]["mtime_ns"] == 2 * 10 ** 9
+
+
+def test_a_file_rewritten_with_the_same_size_misses_the_cache(tmp_path):
+    path = write_export(tmp_path, EXPORT, 10 ** 9)
+    cache_dir = str(tmp_path / "cache")
+    get_scripts(path, use_cache=True, cache_dir=cache_dir)
+
+    edited = EXPORT.replace(b"EXECUTE b", b"EXECUTE c")
+    assert len(edited) == len(EXPORT)
+    write_export(tmp_path, edited, 2 * 10 ** 9)
+    assert graph_cache.load_cached_scripts(path, cache_dir) is None
+    assert get_scripts(path, use_cache=True, cache_dir=cache_dir)[0]["calls"] == ["c"]
+    assert graph_cache.load_cached_scripts(path, cache_dir)[0]["calls"] == ["c"]
+
+
+def test_an_entry_of_another_cache_version_is_ignored(tmp_path, monkeypatch):
+    path = write_export(tmp_path, EXPORT, 10 ** 9)
+    cache_dir = str(tmp_path / "cache")
+    get_scripts(path, use_cache=True, cache_dir=cache_dir)
+    monkeypatch.setattr(graph_cache, "CACHE_VERSION", graph_cache.CACHE_VERSION + 1)
+    assert graph_cache.load_cached_scripts(path, cache_dir) is None
+
+
+def test_prune_removes_the_least_recently_used_entries(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    entries = []
+    for index in range(4):
+        entry = cache_dir / f"{index}{graph_cache.CACHE_SUFFIX}"
+        entry.write_bytes(b"x" * 100)
+        os.utime(entry, ns=((index + 1) * 10 ** 9, (index + 1) * 10 ** 9))
+        entries.append(str(entry))
+    segments = cache_dir / f"4{graph_cache.SEGMENTS_SUFFIX}"
+    segments.mkdir()
+    (segments / f"digest{graph_cache.SEGMENT_SUFFIX}").write_bytes(b"x" * 100)
+    os.utime(segments, ns=(10 ** 10, 10 ** 10))
+    (cache_dir / "unrelated.txt").write_bytes(b"x" * 1000)
+
+    # The segments directory counts as one entry of the size of its files
+    removed = graph_cache.prune_cache(str(cache_dir), max_bytes=250)
+    assert sorted(removed) == entries[:3]
+    assert sorted(os.listdir(cache_dir)) == sorted([os.path.basename(entries[3]), segments.name, "unrelated.txt"])
+    assert graph_cache.prune_cache(str(cache_dir), max_bytes=250) == []
+    assert graph_cache.prune_cache(str(cache_dir), max_bytes=0) == [str(segments), entries[3]]
+    assert graph_cache.prune_cache(str(tmp_path / "missing")) == []
+
+
+def test_fingerprint_is_current_until_the_content_changes(tmp_path):
+    path = write_export(tmp_path, EXPORT, 10 ** 9)
+    fingerprint = graph_cache.fingerprint_dat_file(path)
+    assert graph_cache.is_fingerprint_current(fingerprint, path)
+    os.utime(path, ns=(2 * 10 ** 9, 2 * 10 ** 9))
+    assert graph_cache.is_fingerprint_current(fingerprint, path)
+    write_export(tmp_path, EXPORT.replace(b"J1", b"J2"), 3 * 10 ** 9)
+    assert not graph_cache.is_fingerprint_current(fingerprint, path)
+    write_export(tmp_path, EXPORT + b"\n", 10 ** 9)
+    assert not graph_cache.is_fingerprint_current(fingerprint, path)
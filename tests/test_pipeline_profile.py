@@ -0,0 +1,65 @@
+import json
+import pstats
+import time
+
+import pytest
+
+import pipeline_profile
+from pipeline_profile import profile_stage, start_profiling, stop_profiling
+
+
+@pytest.fixture
+def profiling(tmp_path):
+    """
+    Starts profiling for a test and returns the paths of its report and cProfile stats.
+    """
+    report_path = tmp_path / "stages.jsonl"
+    profile_path = tmp_path / "run.prof"
+    start_profiling(str(report_path), str(profile_path))
+    yield report_path, profile_path
+    stop_profiling()
+
+
+def read_report(report_path):
+    return [json.loads(line) for line in report_path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_stages_without_profiling_get_counters_of_their_own():
+    assert pipeline_profile._active is None
+    with profile_stage("parse") as stage:
+        stage["blocks"] = 10
+    with profile_stage("clean") as stage:
+        assert stage == {}
+
+
+def test_every_stage_writes_a_record_with_its_counters(profiling):
+    report_path, profile_path = profiling
+    with profile_stage("parse") as stage:
+        time.sleep(0.01)
+        stage["blocks"] = 50
+        stage["bytes_read"] = 1000
+    with pytest.raises(ValueError):
+        with profile_stage("clean"):
+            raise ValueError("bad block")
+    stop_profiling()
+
+    parse, clean = read_report(report_path)
+    assert parse["stage"] == "parse" and clean["stage"] == "clean"
+    assert parse["wall_seconds"] >= 0.01 and parse["cpu_seconds"] >= 0
+    assert parse["blocks"] == 50 and parse["bytes_read"] == 1000
+    assert parse["blocks_per_second"] == pytest.approx(50 / parse["wall_seconds"])
+    assert parse["peak_rss_mb"] is None or parse["peak_rss_mb"] > 0
+    # A stage that fails is still recorded, without counters it never set
+    assert "blocks" not in clean and clean["started"] >= parse["started"]
+    assert pstats.Stats(str(profile_path)).total_calls > 0
+
+
+def test_stopping_turns_the_hooks_off(profiling):
+    report_path, _ = profiling
+    with profile_stage("parse"):
+        pass
+    stop_profiling()
+    assert pipeline_profile._active is None
+    with profile_stage("graph") as stage:
+        stage["blocks"] = 1
+    assert [record["stage"] for record in read_report(report_path)] == ["parse"]
@@ -0,0 +1,257 @@
+import os
+
+import pytest
+
+import graph_cache
+import script_data
+from bench_tokenizer import parse_two_pass
+from script_data import (_build_script, clean_scripts, load_graph_snapshot, parse_dat_file, parse_dat_file_parallel,
+                         save_graph_snapshot, update_scripts_incremental)
+from script_graph import ScriptGraph
+
+# .dat exports the parsers have to read exactly like the original line-by-line parser
+EXPORTS = {
+    "lf": (
+        b"<<COMPILED_BY: alice >>\n<<SOURCE: cust_script:a.prg >>\n<<DA2: J1, J2 >>\n<<OPS: N/A >>\n"
+        b"<<LAST_RUN_BY: bob >>\nCREATE PROGRAM a:dba go\n  EXECUTE b 'MINE'\n  execute \"c\" with replace\n"
+        b"  x = 1\nEND GO\n<<DA2: UNKNOWN >>\n<<OPS: O1 >>\nCREATE PROGRAM b go\n  EXECUTE a\nEND GO\n"
+    ),
+    "crlf": (
+        b"<<DA2: J1 >>\r\n<<OPS: O1, O2 >>\r\nCREATE PROGRAM a:dba go\r\n  EXECUTE b 'MINE'\r\nEND GO\r\n"
+        b"CREATE PROGRAM b go\r\n  EXECUTE \"c\"\r\nEND GO\r\n"
+    ),
+    "bare_cr": (
+        b"<<DA2: J1 >>\rCREATE PROGRAM a:dba go\r  EXECUTE b\rEND GO\r"
+        b"CREATE PROGRAM b go\n  junk\rEXECUTE c\rEND GO\n"
+    ),
+    "header_on_program_line": (
+        b"<<DA2: Z1 >> CREATE PROGRAM a go\n  EXECUTE b\nEND GO\n"
+        b"<<OPS: O1 >>\nCREATE PROGRAM b EXECUTE c\nEND GO EXECUTE d\n"
+    ),
+    "unclosed_blocks": (
+        b"<<DA2: J1 >>\nCREATE PROGRAM a go\n  EXECUTE b\n"
+        b"<<DA2: J2 >>\nCREATE PROGRAM b go\n  EXECUTE c\nEND GO\n"
+        b"CREATE PROGRAM c go\n  EXECUTE a\n"
+    ),
+    "drop_blocks": (
+        b"<<DA2: J1 >>\nDROP PROGRAM a go\nCREATE PROGRAM a:dba go\n  EXECUTE b\nEND GO\n"
+        b"CREATE PROGRAM b go\nEND GO\nDROP PROGRAM c go\nEND GO\n"
+        b"<<OPS: O1 >>\nDROP PROGRAM d go\nCREATE PROGRAM d go\n  EXECUTE a\nEND GO\n"
+    ),
+    "duplicates_and_stray_lines": (
+        b"  EXECUTE stray\nEND GO\n\nCREATE PROGRAM a go\n  EXECUTE b\n  EXECUTE b\nEND GO\n"
+        b"CREATE PROGRAM a go\n  EXECUTE c\nEND GO\n\xe9\xff not utf-8\n"
+    ),
+}
+
+
+def write_export(tmp_path, data, name="export.dat"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def without(scripts, key):
+    return [{name: value for name, value in script.items() if name != key} for script in scripts]
+
+
+@pytest.mark.parametrize("export", sorted(EXPORTS))
+def test_streaming_parser_matches_two_pass_parser(tmp_path, export):
+    path = write_export(tmp_path, EXPORTS[export])
+    assert parse_dat_file(path) == parse_two_pass(path)
+
+
+@pytest.mark.parametrize("export", sorted(EXPORTS))
+def test_parallel_parser_matches_two_pass_parser(tmp_path, export):
+    path = write_export(tmp_path, EXPORTS[export])
+    assert parse_dat_file_parallel(path, workers=2) == parse_two_pass(path)
+
+
+@pytest.mark.parametrize("export", sorted(EXPORTS))
+def test_incremental_parser_matches_two_pass_parser(tmp_path, monkeypatch, export):
+    # A segment per block, so every boundary the segmenter picks is exercised
+    monkeypatch.setattr(script_data, "INCREMENTAL_SEGMENT_BLOCKS", 1)
+    path = write_export(tmp_path, EXPORTS[export])
+    scripts, _ = update_scripts_incremental(path, str(tmp_path / "cache"))
+    assert without(scripts, "digest") == clean_scripts(parse_two_pass(path))
+
+
+def test_parallel_chunks_end_on_closing_end_go_lines(tmp_path):
+    data = b"".join(EXPORTS[export] for export in sorted(EXPORTS)) * 20
+    path = write_export(tmp_path, data)
+    ranges = script_data.find_dat_chunk_ranges(path, 4)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert parse_dat_file_parallel(path, workers=4) == parse_two_pass(path)
+
+
+def program(name, calls=(), da2="N/A"):
+    body = "".join(f"  EXECUTE {call} 'MINE'\n" for call in calls)
+    return f"<<DA2: {da2} >>\nCREATE PROGRAM {name}:dba go\n{body}END GO\n".encode("utf-8")
+
+
+def rewrite(path, blocks, mtime_ns):
+    with open(path, "wb") as file:
+        file.write(b"".join(blocks))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_incremental_reports_added_changed_and_removed_scripts(tmp_path, monkeypatch):
+    monkeypatch.setattr(script_data, "INCREMENTAL_SEGMENT_BLOCKS", 2)
+    path = str(tmp_path / "export.dat")
+    cache_dir = str(tmp_path / "cache")
+    blocks = [program(f"p{index}", [f"p{index + 1}"]) for index in range(40)]
+    rewrite(path, blocks, 10 ** 9)
+    scripts, changes = update_scripts_incremental(path, cache_dir)
+    assert len(scripts) == 40
+    assert changes["added"] == [f"p{index}" for index in range(40)]
+    assert changes["reparsed_blocks"] == 40
+
+    blocks[5] = program("p5", ["p7", "p8"])
+    blocks[20] = program("p20", ["p21"], da2="J1")
+    del blocks[30]
+    blocks.insert(10, program("new_script", ["p0"]))
+    rewrite(path, blocks, 2 * 10 ** 9)
+    scripts, changes = update_scripts_incremental(path, cache_dir)
+    assert changes["added"] == ["new_script"]
+    assert changes["changed"] == ["p5", "p20"]
+    assert changes["removed"] == ["p30"]
+    assert changes["reparsed_blocks"] == 3
+    assert changes["total_blocks"] == 40
+    assert without(scripts, "digest") == clean_scripts(parse_two_pass(path))
+
+
+def test_incremental_touch_without_changes_reparses_nothing(tmp_path):
+    path = str(tmp_path / "export.dat")
+    cache_dir = str(tmp_path / "cache")
+    blocks = [program(f"p{index}", [f"p{index + 1}"]) for index in range(10)]
+    rewrite(path, blocks, 10 ** 9)
+    first, _ = update_scripts_incremental(path, cache_dir)
+    rewrite(path, blocks, 2 * 10 ** 9)
+    scripts, changes = update_scripts_incremental(path, cache_dir)
+    assert (changes["added"], changes["changed"], changes["removed"]) == ([], [], [])
+    assert changes["reparsed_blocks"] == 0
+    assert scripts == first
+
+
+def test_incremental_state_rewrites_only_the_edited_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(script_data, "INCREMENTAL_SEGMENT_BLOCKS", 2)
+    path = str(tmp_path / "export.dat")
+    cache_dir = str(tmp_path / "cache")
+    blocks = [program(f"p{index}", [f"p{index + 1}"]) for index in range(40)]
+    rewrite(path, blocks, 10 ** 9)
+    update_scripts_incremental(path, cache_dir)
+    segments_dir = graph_cache._segments_dir(graph_cache.cache_entry_path(path, cache_dir, graph_cache.BLOCK_STATE_SUFFIX))
+    before = {name: os.stat(os.path.join(segments_dir, name)).st_ino for name in os.listdir(segments_dir)}
+
+    blocks[20] = program("p20", ["p21"], da2="J1")
+    rewrite(path, blocks, 2 * 10 ** 9)
+    update_scripts_incremental(path, cache_dir)
+    after = {name: os.stat(os.path.join(segments_dir, name)).st_ino for name in os.listdir(segments_dir)}
+    assert len(before) > 2
+    assert len(set(before) - set(after)) == len(set(after) - set(before)) == 1
+    assert all(before[name] == after[name] for name in set(before) & set(after))
+
+
+def test_incremental_reparses_a_segment_missing_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(script_data, "INCREMENTAL_SEGMENT_BLOCKS", 2)
+    path = str(tmp_path / "export.dat")
+    cache_dir = str(tmp_path / "cache")
+    blocks = [program(f"p{index}", [f"p{index + 1}"]) for index in range(20)]
+    rewrite(path, blocks, 10 ** 9)
+    first, _ = update_scripts_incremental(path, cache_dir)
+
+    # As a new process sees it, with one segment file lost
+    graph_cache._segment_memo.clear()
+    segments_dir = graph_cache._segments_dir(graph_cache.cache_entry_path(path, cache_dir, graph_cache.BLOCK_STATE_SUFFIX))
+    os.remove(os.path.join(segments_dir, sorted(os.listdir(segments_dir))[0]))
+    scripts, changes = update_scripts_incremental(path, cache_dir)
+    assert without(scripts, "digest") == without(first, "digest")
+    assert changes["reparsed_blocks"] == 20
+
+
+def test_incremental_reports_a_duplicate_that_now_comes_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(script_data, "INCREMENTAL_SEGMENT_BLOCKS", 1)
+    path = str(tmp_path / "export.dat")
+    cache_dir = str(tmp_path / "cache")
+    first_a, second_a = program("a", ["b"]), program("a", ["c"])
+    rewrite(path, [first_a, program("b"), second_a], 10 ** 9)
+    update_scripts_incremental(path, cache_dir)
+    rewrite(path, [second_a, program("b"), first_a], 2 * 10 ** 9)
+    scripts, changes = update_scripts_incremental(path, cache_dir)
+    assert changes["changed"] == ["a"]
+    assert without(scripts, "digest") == clean_scripts(parse_two_pass(path))
+
+
+def test_merged_files_match_the_concatenated_file(tmp_path):
+    data = b"".join(EXPORTS[export] for export in sorted(EXPORTS) if export != "bare_cr") * 3
+    whole = write_export(tmp_path, data, "whole.dat")
+    # Cut on block boundaries, the way separate exports of parts of one system would be
+    boundaries = [0] + [end for _, end in script_data.find_dat_chunk_ranges(whole, 2)]
+    parts = [write_export(tmp_path, data[start:end], f"part{index:02d}.dat")
+             for index, (start, end) in enumerate(zip(boundaries, boundaries[1:]))]
+    assert len(parts) > 2
+
+    merged = script_data.get_scripts_from_files(parts, "first", workers=2)
+    assert all(script["origin"] in parts for script in merged)
+    assert without(merged, "origin") == clean_scripts(parse_two_pass(whole))
+    assert script_data.get_scripts_from_files([str(tmp_path / "part*.dat")], "first", workers=1) == merged
+
+
+def merge_inputs(tmp_path):
+    """
+    Two exports that both define b: the older dev.dat and prod.dat, given in that order.
+    """
+    dev = write_export(tmp_path, b"", "dev.dat")
+    prod = write_export(tmp_path, b"", "prod.dat")
+    os.utime(dev, ns=(2 * 10 ** 9, 2 * 10 ** 9))
+    os.utime(prod, ns=(3 * 10 ** 9, 3 * 10 ** 9))
+    dev_scripts = [_build_script("a", ["b"], "", "", "J1", "", ""),
+                   _build_script("b", ["c", "d"], "", "", "J1", "", "")]
+    prod_scripts = [_build_script("b", ["d", "e"], "", "", "J2", "O1", ""),
+                    _build_script("f", [], "", "", "", "", "")]
+    return [(dev, dev_scripts), (prod, prod_scripts)]
+
+
+@pytest.mark.parametrize("precedence, kept", [("first", "dev"), ("last", "prod"), ("newest", "prod")])
+def test_merge_keeps_the_script_of_the_file_the_precedence_picks(tmp_path, precedence, kept):
+    file_scripts = merge_inputs(tmp_path)
+    merged = script_data.merge_scripts(file_scripts, precedence)
+    assert [script["name"] for script in merged] == ["a", "b", "f"]
+    path, scripts = file_scripts[0] if kept == "dev" else file_scripts[1]
+    assert merged[1] == dict(next(script for script in scripts if script["name"] == "b"), origin=path)
+    assert [script["origin"] for script in merged] == [file_scripts[0][0], path, file_scripts[1][0]]
+
+
+def test_merge_newest_goes_by_modification_time_not_by_order(tmp_path):
+    file_scripts = merge_inputs(tmp_path)
+    prod = file_scripts[1][0]
+    os.utime(prod, ns=(10 ** 9, 10 ** 9))
+    assert script_data.merge_scripts(file_scripts, "newest")[1]["calls"] == ["c", "d"]
+    assert script_data.merge_scripts(file_scripts[::-1], "newest")[0]["calls"] == ["c", "d"]
+
+
+def test_merge_unions_calls_and_jobs_into_the_first_definition(tmp_path, capsys):
+    file_scripts = merge_inputs(tmp_path)
+    merged = script_data.merge_scripts(file_scripts, "merge")
+    assert merged[1] == dict(file_scripts[0][1][1], calls=["c", "d", "e"], da2_jobs=["J1", "J2"], ops_jobs=["O1"],
+                             origin=file_scripts[0][0])
+    # The inputs are left as they were
+    assert file_scripts[0][1][1]["calls"] == ["c", "d"]
+    assert "1 program definitions were duplicated" in capsys.readouterr().out
+
+
+def test_snapshot_of_a_file_rewritten_while_parsing_is_stale(tmp_path):
+    path = str(tmp_path / "export.dat")
+    snapshot_path = str(tmp_path / "export.graph")
+    rewrite(path, [program("a", ["b"])], 10 ** 9)
+    fingerprint = graph_cache.fingerprint_dat_file(path)
+    graph = ScriptGraph.from_scripts(clean_scripts(parse_dat_file(path)))
+    rewrite(path, [program("a", ["b", "c"])], 2 * 10 ** 9)
+    save_graph_snapshot(graph, snapshot_path, path, fingerprint)
+    assert load_graph_snapshot(snapshot_path, path) is None
+
+    fingerprint = graph_cache.fingerprint_dat_file(path)
+    save_graph_snapshot(ScriptGraph.from_scripts(clean_scripts(parse_dat_file(path))), snapshot_path, path, fingerprint)
+    assert list(load_graph_snapshot(snapshot_path, path).names) == ["a", "b", "c"]
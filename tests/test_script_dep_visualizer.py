@@ -0,0 +1,109 @@
+import filecmp
+import os
+
+import pytest
+
+import script_dep_visualizer
+from script_data import clean_scripts, parse_dat_file, update_scripts_incremental
+from script_dep_visualizer import build_graph_page, main, write_data_files
+from script_graph import ScriptGraph
+
+EXPORT = (
+    b"<<COMPILED_BY: alice >>\n<<SOURCE: cust_script:a.prg >>\n<<DA2: J1, J2 >>\n<<OPS: O1 >>\n"
+    b"CREATE PROGRAM a:dba go\n  EXECUTE b\n  EXECUTE missing\nEND GO\n"
+    b"<<DA2: J2 >>\nCREATE PROGRAM b go\n  EXECUTE c\nEND GO\n"
+    b"<<OPS: O2 >>\nCREATE PROGRAM c go\n  EXECUTE a\nEND GO\n"
+    b"CREATE PROGRAM d go\n  EXECUTE a\n  EXECUTE e\nEND GO\n"
+    b"CREATE PROGRAM e go\nEND GO\n"
+)
+
+
+def load_graph(tmp_path):
+    path = tmp_path / "export.dat"
+    path.write_bytes(EXPORT)
+    return ScriptGraph.from_scripts(clean_scripts(parse_dat_file(str(path))))
+
+
+def file_states(directory):
+    """
+    Returns {path: (inode, mtime_ns)} of every file under directory: a file written again,
+    or replaced by a new one, changes its entry.
+    """
+    states = {}
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            stat = os.stat(os.path.join(root, file_name))
+            states[os.path.join(root, file_name)] = (stat.st_ino, stat.st_mtime_ns)
+    return states
+
+
+@pytest.mark.parametrize("shard_data", [False, True])
+def test_regenerating_an_unchanged_graph_rewrites_nothing(tmp_path, shard_data):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    output_path = str(output_dir / "page.html")
+    build_graph_page(load_graph(tmp_path), output_path, shard_data=shard_data, shard_size=2, layout="layered")
+    before = file_states(output_dir)
+    assert len(before) == (1 if not shard_data else len(os.listdir(output_dir / "page_data")) + 1)
+
+    # A graph parsed again from the same export, as watch does on a re-export
+    build_graph_page(load_graph(tmp_path), output_path, shard_data=shard_data, shard_size=2, layout="layered")
+    assert file_states(output_dir) == before
+
+
+def test_write_data_files_reports_only_the_files_it_wrote(tmp_path):
+    data_dir = str(tmp_path / "page_data")
+    graph = load_graph(tmp_path)
+    written = []
+    manifest = write_data_files(graph, data_dir, [["a", "b", "c"]], shard_size=2, written=written)
+    assert sorted(written) == sorted(os.listdir(data_dir))
+    assert manifest["shardFiles"] == ["shard-00000.js", "shard-00001.js", "shard-00002.js"]
+
+    written = []
+    assert write_data_files(load_graph(tmp_path), data_dir, [["a", "b", "c"]], shard_size=2, written=written) == manifest
+    assert written == []
+
+
+@pytest.mark.parametrize("layout", ["physics", "layered"])
+def test_a_patched_graph_writes_what_a_fresh_build_writes(tmp_path, monkeypatch, layout):
+    export = tmp_path / "export.dat"
+    export.write_bytes(EXPORT)
+    cache_dir = str(tmp_path / "cache")
+    (tmp_path / "patched").mkdir()
+    (tmp_path / "fresh").mkdir()
+    patched_path = str(tmp_path / "patched" / "page.html")
+    fresh_path = str(tmp_path / "fresh" / "page.html")
+    state = {}
+    scripts, _ = update_scripts_incremental(str(export), cache_dir)
+    build_graph_page(ScriptGraph.from_scripts(scripts), patched_path, shard_data=True, shard_size=2,
+                     layout=layout, state=state)
+
+    # e now calls d back, which closes a cycle; a and b are untouched
+    export.write_bytes(EXPORT.replace(b"CREATE PROGRAM e go\n", b"CREATE PROGRAM e go\n  EXECUTE d\n"))
+    scripts, changes = update_scripts_incremental(str(export), cache_dir)
+    changed = changes["added"] + changes["changed"] + changes["removed"]
+    assert changed == ["e"]
+    serialized = []
+    write_data_file = script_dep_visualizer._write_data_file
+    monkeypatch.setattr(script_dep_visualizer, "_write_data_file",
+                        lambda data_dir, file_name, payload: serialized.append(file_name) or
+                        write_data_file(data_dir, file_name, payload))
+    build_graph_page(state["graph"].patched(scripts, changed), patched_path, shard_data=True, shard_size=2,
+                     layout=layout, state=state, changed=changed)
+    assert {"shard-00001.js", "shard-00002.js", "cycles.js"} <= set(serialized)
+    if layout == "physics":
+        # The layered layout may move every script; without it, a and b keep their shard
+        assert "shard-00000.js" not in serialized and "search-name.js" not in serialized
+
+    fresh_graph = ScriptGraph.from_scripts(clean_scripts(parse_dat_file(str(export))))
+    build_graph_page(fresh_graph, fresh_path, shard_data=True, shard_size=2, layout=layout)
+    assert filecmp.cmp(patched_path, fresh_path, shallow=False)
+    data_files = sorted(os.listdir(tmp_path / "fresh" / "page_data"))
+    assert sorted(os.listdir(tmp_path / "patched" / "page_data")) == data_files
+    assert filecmp.cmpfiles(tmp_path / "patched" / "page_data", tmp_path / "fresh" / "page_data",
+                            data_files, shallow=False)[0] == data_files
+
+
+def test_incremental_needs_the_cache():
+    with pytest.raises(SystemExit):
+        main(["export.dat", "--incremental", "--no-cache"])
@@ -0,0 +1,68 @@
+import pytest
+
+from script_graph import ScriptGraph
+
+
+def script(name, calls=(), da2_jobs=(), ops_jobs=(), source=""):
+    return {"name": name, "da2_jobs": list(da2_jobs), "ops_jobs": list(ops_jobs), "calls": list(calls),
+            "compiled_by": "", "source": source, "last_run_by": ""}
+
+
+def assert_same_graph(graph, expected):
+    for attribute in ("names", "script_count", "da2_job_names", "ops_job_names",
+                      "compiled_by", "source", "last_run_by", "origin"):
+        assert getattr(graph, attribute) == getattr(expected, attribute), attribute
+    for attribute in ("calls", "callers", "da2_jobs", "ops_jobs", "da2_job_scripts", "ops_job_scripts"):
+        adjacency, expected_adjacency = getattr(graph, attribute), getattr(expected, attribute)
+        assert (adjacency.offsets, adjacency.targets) == (expected_adjacency.offsets, expected_adjacency.targets), attribute
+
+
+SCRIPTS = [
+    script("a", ["b", "x"], ["J1"]),
+    script("b", ["c"], ["J1", "J2"], ["O1"]),
+    script("c", ["a", "y"], source="cust:c.prg"),
+    script("d", ["a", "x"], [], ["O1"]),
+]
+
+
+@pytest.mark.parametrize("edit", [
+    # A script calls other scripts and a new placeholder
+    lambda scripts: (scripts[:1] + [script("b", ["d", "z"], ["J2"])] + scripts[2:], {"b"}),
+    # A placeholder gets defined in the middle of the file
+    lambda scripts: (scripts[:2] + [script("x", ["a"], ["J3"])] + scripts[2:], {"x"}),
+    # A script that is still called is removed and becomes a placeholder
+    lambda scripts: ([scripts[0]] + scripts[2:], {"b"}),
+    # The last caller of a placeholder drops it, and a job goes with it
+    lambda scripts: (scripts[:2] + [script("c", ["a"])] + scripts[3:], {"c"}),
+    # A script moves without changing
+    lambda scripts: (scripts[1:3] + [scripts[0]] + scripts[3:], set()),
+    # Nothing changed
+    lambda scripts: (scripts, set()),
+])
+def test_patched_graph_matches_a_graph_built_from_scratch(edit):
+    scripts, changed = edit(list(SCRIPTS))
+    assert_same_graph(ScriptGraph.from_scripts(SCRIPTS).patched(scripts, changed), ScriptGraph.from_scripts(scripts))
+
+
+def test_graph_round_trips_to_the_scripts_it_was_built_from():
+    scripts = SCRIPTS + [dict(script("e", ["a"]), origin="prod.dat")]
+    assert ScriptGraph.from_scripts(scripts).to_scripts() == scripts
+
+
+def test_graph_keeps_the_first_script_of_a_name_and_adds_placeholders_after_the_scripts():
+    graph = ScriptGraph.from_scripts(SCRIPTS + [script("a", ["d"])])
+    assert graph.to_scripts() == SCRIPTS
+    assert graph.names == ["a", "b", "c", "d", "x", "y"]
+    assert graph.script_count == 4
+    assert graph.callers_of("x") == ["a", "d"]
+    assert graph.da2_jobs_of("x") == [] and graph.ops_jobs_of("x") == []
+
+
+def test_scripts_view_looks_up_defined_scripts_only():
+    view = ScriptGraph.from_scripts(SCRIPTS).scripts_view()
+    assert list(view) == ["a", "b", "c", "d"] and len(view) == 4
+    assert view["b"] == {"da2_jobs": ["J1", "J2"], "ops_jobs": ["O1"], "calls": ["c"]}
+    assert "a" in view and "x" not in view and "missing" not in view
+    with pytest.raises(KeyError):
+        view["x"]
+    assert view.get("missing") is None
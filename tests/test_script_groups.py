@@ -0,0 +1,49 @@
+from script_graph import ScriptGraph
+from script_groups import NO_GROUP, build_script_groups, group_scripts, source_prefix
+
+
+def script(name, calls=(), da2_jobs=(), compiled_by="", source=""):
+    return {"name": name, "da2_jobs": list(da2_jobs), "ops_jobs": [], "calls": list(calls),
+            "compiled_by": compiled_by, "source": source, "last_run_by": ""}
+
+
+SCRIPTS = [
+    script("a", ["x"], ["NIGHTLY", "WEEKLY"], "alice", "cust_script:a.prg"),
+    script("b", [], ["WEEKLY"], "bob", "ccluserdir:b.prg"),
+    script("c", [], [], "alice", "no_prefix.prg"),
+    script("d", ["a"], ["NIGHTLY"], "", "cust_script:d.prg"),
+]
+
+
+def members(groups):
+    """
+    {group name: the script ids in it}, to compare a grouping without its id numbering.
+    """
+    by_name = {name: [] for name in groups["names"]}
+    for node, group in enumerate(groups["of"]):
+        by_name[groups["names"][group]].append(node)
+    return by_name
+
+
+def test_scripts_are_bucketed_by_source_prefix_first_da2_job_and_compiler():
+    groupings = build_script_groups(ScriptGraph.from_scripts(SCRIPTS))
+    assert set(groupings) == {"source", "da2", "compiler"}
+    assert members(groupings["source"]) == {NO_GROUP: [2], "ccluserdir": [1], "cust_script": [0, 3]}
+    assert members(groupings["da2"]) == {NO_GROUP: [2], "NIGHTLY": [0, 3], "WEEKLY": [1]}
+    assert members(groupings["compiler"]) == {NO_GROUP: [3], "alice": [0, 2], "bob": [1]}
+
+
+def test_groups_are_numbered_in_name_order_for_scripts_only():
+    graph = ScriptGraph.from_scripts(SCRIPTS)
+    groups = group_scripts(graph, lambda node: graph.names[node].upper() if node % 2 else "")
+    assert groups["names"] == [NO_GROUP, "B", "D"]
+    assert list(groups["of"]) == [0, 1, 0, 2]
+    # Placeholders are never grouped
+    assert len(groups["of"]) == graph.script_count < len(graph.names)
+
+
+def test_source_prefix():
+    assert source_prefix("cust_script:my_program.prg") == "cust_script"
+    assert source_prefix("a:b:c") == "a"
+    assert source_prefix("no_prefix.prg") == ""
+    assert source_prefix("") == ""
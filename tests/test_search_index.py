@@ -0,0 +1,77 @@
+import pytest
+
+from search_index import GRAM_SIZE, build_search_index, gram_file, index_keys
+from script_graph import ScriptGraph
+
+
+def script(name, calls=(), da2_jobs=(), ops_jobs=()):
+    return {"name": name, "da2_jobs": list(da2_jobs), "ops_jobs": list(ops_jobs), "calls": list(calls),
+            "compiled_by": "", "source": "", "last_run_by": ""}
+
+
+# U+FF5A sorts after U+1F600 in UTF-16, where the emoji is a surrogate pair, but before it by code point
+KEYS = ["beta_report", "Alpha", "ALPHA_LOAD", "alpha", "\U0001F600_job", "ｚ_job", "éclair", "ab"]
+
+
+def decode(deltas):
+    ids = []
+    for delta in deltas:
+        ids.append(delta + (ids[-1] if ids else 0))
+    return ids
+
+
+def search(index, needle):
+    """
+    A substring query the way the page's worker runs it: check the keys in the shortest
+    postings list among the needle's grams.
+    """
+    needle = needle.lower()
+    postings = [index["grams"].get(needle[i:i + GRAM_SIZE]) for i in range(len(needle) - GRAM_SIZE + 1)]
+    if any(ids is None for ids in postings):
+        return []
+    return [key_id for key_id in decode(min(postings, key=len)) if needle in index["keys"][key_id].lower()]
+
+
+def test_keys_are_sorted_case_insensitively_in_utf16_order():
+    index = index_keys(KEYS)
+    assert index["keys"] == ["ab", "Alpha", "alpha", "ALPHA_LOAD", "beta_report", "éclair",
+                             "\U0001F600_job", "ｚ_job"]
+    assert "scripts" not in index
+
+
+def test_grams_list_every_key_containing_them():
+    index = index_keys(KEYS)
+    lower_keys = [key.lower() for key in index["keys"]]
+    grams = {key[i:i + GRAM_SIZE] for key in lower_keys for i in range(len(key) - GRAM_SIZE + 1)}
+    assert set(index["grams"]) == grams
+    for gram, deltas in index["grams"].items():
+        assert decode(deltas) == [key_id for key_id, key in enumerate(lower_keys) if gram in key]
+
+
+@pytest.mark.parametrize("needle", ["alpha", "ALP", "_job", "pha_lo", "report", "zzz", "a_l"])
+def test_substring_queries_find_the_same_keys_as_a_scan(needle):
+    index = index_keys(KEYS)
+    assert search(index, needle) == [key_id for key_id, key in enumerate(index["keys"])
+                                     if needle.lower() in key.lower()]
+
+
+def test_search_index_of_a_graph_lists_the_scripts_of_each_job():
+    graph = ScriptGraph.from_scripts([
+        script("load_b", ["x"], ["NIGHTLY"], ["ops_1"]),
+        script("Load_a", [], ["nightly", "NIGHTLY"]),
+        script("report", ["load_b"], [], ["ops_1"]),
+    ])
+    index = build_search_index(graph)
+    assert index["name"]["keys"] == ["Load_a", "load_b", "report"]
+    # Keys that only differ in case sort by their UTF-16 code units
+    assert index["da2"]["keys"] == ["NIGHTLY", "nightly"]
+    assert index["da2"]["scripts"] == [["load_b", "Load_a"], ["Load_a"]]
+    assert index["ops"] == index_keys(["ops_1"], graph.ops_job_scripts, graph.names)
+    assert index["ops"]["scripts"] == [["load_b", "report"]]
+
+
+def test_gram_file_hashes_utf16_code_units():
+    assert gram_file("abc", 7) == ((97 * 31 + 98) * 31 + 99) % 7
+    assert gram_file("\U0001F600a", 1000) == ((0xD83D * 31 + 0xDE00) * 31 + 97) % 1000
+    assert gram_file("abc", 1) == 0
+    assert {gram_file(gram, 4) for gram in ("abc", "bcd", "cde", "def", "efg", "fgh")} <= set(range(4))